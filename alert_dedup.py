@@ -0,0 +1,230 @@
+import os
+import math
+import json
+import struct
+import hashlib
+import logging
+from signature_cursor import write_json_atomic
+from metrics import METRICS
+
+# ==================== Alert Deduplication ====================
+# Remembers which (signature, log index) matches were already alerted, so a transaction
+# that is read again (overlapping windows, --before_sig / test signature runs, the stream
+# and the poller both seeing it, a restart) never plays a sound or sends an email twice:
+#   - the most recent `capacity` keys live in a ring buffer (exact),
+#   - keys pushed out of the ring can go into an optional Bloom filter for the long tail.
+#     It rotates between two generations of `bloom_capacity` keys each, so memory stays
+#     bounded; a false positive (rate ~bloom_error_rate) silences a genuinely new match,
+#     which is why it is disabled by default.
+# The ring and counters are persisted atomically to a JSON file (the Bloom filter next to
+# it as `<path>.bloom`), so restarts do not re-alert either. Several processes (the stream
+# and the poller) can share one file: whenever it changed on disk, the keys written by the
+# others are merged in before filtering and before saving, so nobody clobbers them.
+# =============================================================
+
+BLOOM_HEADER = struct.Struct("<QQQ")
+
+
+class BloomFilter:
+    def __init__(self, capacity, error_rate=1e-4):
+        self.capacity = max(1, capacity)
+        self.bits = max(64, math.ceil(-self.capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.bits / self.capacity * math.log(2)))
+        self.array = bytearray((self.bits + 7) // 8)
+        self.count = 0
+
+    def _positions(self, key):
+        # Double hashing over one 128-bit digest
+        digest = hashlib.blake2b(key.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return [(h1 + i * h2) % self.bits for i in range(self.hashes)]
+
+    def add(self, key):
+        for position in self._positions(key):
+            self.array[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, key):
+        return all(self.array[position >> 3] & (1 << (position & 7)) for position in self._positions(key))
+
+    def to_bytes(self):
+        return BLOOM_HEADER.pack(self.bits, self.hashes, self.count) + bytes(self.array)
+
+    @classmethod
+    def from_bytes(cls, capacity, data):
+        bits, hashes, count = BLOOM_HEADER.unpack_from(data)
+        bloom = cls.__new__(cls)
+        bloom.capacity, bloom.bits, bloom.hashes, bloom.count = max(1, capacity), bits, hashes, count
+        bloom.array = bytearray(data[BLOOM_HEADER.size:BLOOM_HEADER.size + (bits + 7) // 8])
+        return bloom
+
+
+def alert_key(match):
+    return f"{match['signature']}:{match.get('log_index', match.get('log'))}"
+
+
+class AlertDeduplicator:
+    def __init__(self, path=None, capacity=10000, bloom_capacity=0, bloom_error_rate=1e-4):
+        self.path = path or None
+        self.capacity = max(1, capacity)
+        self.bloom_capacity = bloom_capacity
+        self.bloom_error_rate = bloom_error_rate
+        self.counters = {"alerted": 0, "suppressed": 0}
+        self._ring = [None] * self.capacity
+        self._next = 0
+        self._keys = set()
+        # Newest generation first
+        self._blooms = []
+        self._bloom_dirty = False
+        # (mtime, size) of the file as last read or written, to notice other writers
+        self._disk_state = None
+        if self.path:
+            self._load()
+
+    # ---------- queries ----------
+    def seen(self, key):
+        return key in self._keys or any(key in bloom for bloom in self._blooms)
+
+    def filter(self, matches):
+        """
+        The matches whose (signature, log index) was never alerted. Several matches of one
+        call may share a key (one log line hitting several terms); they are all kept.
+        """
+        self.refresh()
+        fresh = [match for match in matches if not self.seen(alert_key(match))]
+        suppressed = len(matches) - len(fresh)
+        if suppressed:
+            self.counters["suppressed"] += suppressed
+            METRICS.inc("alerts_suppressed_total", value=suppressed)
+            logging.info(f"Suppressed {suppressed} already alerted matches ({self.counters['suppressed']} so far).")
+        return fresh
+
+    def stats(self):
+        return {**self.counters, "remembered": len(self._keys),
+                "bloom_keys": sum(bloom.count for bloom in self._blooms)}
+
+    # ---------- updates ----------
+    def add(self, matches):
+        """
+        Records the matches as alerted and persists the store.
+        """
+        self.refresh()
+        added = 0
+        for key in dict.fromkeys(alert_key(match) for match in matches):
+            if key not in self._keys:
+                self._remember(key)
+                added += 1
+        self.counters["alerted"] += added
+        METRICS.inc("alerts_total", value=added)
+        self.save()
+
+    def _remember(self, key):
+        evicted = self._ring[self._next]
+        if evicted is not None:
+            self._keys.discard(evicted)
+            self._retire(evicted)
+        self._ring[self._next] = key
+        self._keys.add(key)
+        self._next = (self._next + 1) % self.capacity
+
+    def _retire(self, key):
+        if not self.bloom_capacity:
+            return
+        if not self._blooms or self._blooms[0].count >= self.bloom_capacity:
+            self._blooms = [BloomFilter(self.bloom_capacity, self.bloom_error_rate)] + self._blooms[:1]
+        self._blooms[0].add(key)
+        self._bloom_dirty = True
+
+    def ordered_keys(self):
+        """
+        Remembered keys, oldest first.
+        """
+        return [key for key in self._ring[self._next:] + self._ring[:self._next] if key is not None]
+
+    # ---------- persistence ----------
+    def _stat(self):
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def refresh(self):
+        """
+        Merges in the keys another process saved to the same file since it was last read or written.
+        """
+        if not self.path:
+            return
+        state = self._stat()
+        if state is None or state == self._disk_state:
+            return
+        data = self._read()
+        self._disk_state = state
+        if data is None:
+            return
+        for key in data.get("keys", []):
+            if key not in self._keys:
+                self._remember(key)
+
+    def save(self):
+        if not self.path:
+            return
+        self.refresh()
+        try:
+            write_json_atomic(self.path, {"keys": self.ordered_keys(), "counters": self.counters}, prefix=".alerted-")
+            self._disk_state = self._stat()
+            if self._bloom_dirty:
+                self._save_blooms()
+                self._bloom_dirty = False
+        except OSError as e:
+            logging.error(f"Could not persist the alert dedup store {self.path}: {e}")
+
+    def _save_blooms(self):
+        tmp_path = f"{self.path}.bloom.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(struct.pack("<Q", len(self._blooms)))
+            for bloom in self._blooms:
+                data = bloom.to_bytes()
+                f.write(struct.pack("<Q", len(data)) + data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, f"{self.path}.bloom")
+
+    def _read(self):
+        try:
+            with open(self.path, "r") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logging.error(f"Could not read the alert dedup store {self.path}: {e}")
+            return None
+
+    def _load(self):
+        self._disk_state = self._stat()
+        data = self._read()
+        if data is None:
+            return
+        if self.bloom_capacity:
+            self._load_blooms()
+        # A smaller capacity than last time pushes the oldest keys into the Bloom filter
+        for key in data.get("keys", []):
+            if key not in self._keys:
+                self._remember(key)
+        self.counters.update(data.get("counters", {}))
+
+    def _load_blooms(self):
+        try:
+            with open(f"{self.path}.bloom", "rb") as f:
+                data = f.read()
+            (count,), offset = struct.unpack_from("<Q", data), 8
+            for _ in range(count):
+                (size,) = struct.unpack_from("<Q", data, offset)
+                self._blooms.append(BloomFilter.from_bytes(self.bloom_capacity, data[offset + 8:offset + 8 + size]))
+                offset += 8 + size
+        except FileNotFoundError:
+            pass
+        except (OSError, struct.error) as e:
+            logging.error(f"Ignoring unreadable Bloom filter {self.path}.bloom: {e}")
+            self._blooms = []
@@ -0,0 +1,311 @@
+import time
+import asyncio
+import logging
+import argparse
+from datetime import datetime, timezone
+from solders.pubkey import Pubkey
+from solders.signature import Signature
+
+import config
+from f2_inspect_transactions import inspect_transactions
+from f3_search_logs import extract_transaction_records
+from drift_events import decode_fill_events
+from signature_cursor import write_json_atomic, SignatureCursorStore
+# The monitor's builders, so backfills share its cache, transaction log and limits
+from builders import (build_rate_limiter, build_endpoint_pool, shared_client, build_transaction_cache,
+                      build_transaction_sink, build_fill_store)
+
+# ==================== Historical Backfill ====================
+# Pulls an account's full history (or everything back to a slot or date):
+#   - a producer pages getSignaturesForAddress 1000 signatures at a time, newest first,
+#   - a few consumers fetch the transactions of earlier pages while paging continues
+#     (at most `pages_in_flight` pages are queued, so paging never runs far ahead),
+#   - after each page the checkpoint moves to the oldest signature of the longest run of
+#     finished pages, so an interrupted run resumes without gaps,
+#   - transactions the node does not return are retried a few times; the ones still missing
+#     are kept in the checkpoint and fetched again first when the backfill runs next.
+# Throughput (transactions per second) is logged as it goes.
+# =============================================================
+
+class BackfillCheckpoint(SignatureCursorStore):
+    """
+    Per-account backfill progress: the oldest fully processed signature plus running totals.
+    Unlike the live cursor it only ever moves back in time.
+    """
+    def _flush(self):
+        write_json_atomic(self.path, self._cursors, prefix=".backfill-")
+
+    def save(self, account, state):
+        self._cursors[str(account)] = state
+        self._flush()
+
+
+def parse_until_date(value):
+    """
+    ISO date or datetime (UTC unless it carries an offset) -> unix timestamp.
+    """
+    if not value:
+        return None
+    moment = datetime.fromisoformat(value)
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return int(moment.timestamp())
+
+
+def is_past_bound(entry, until_slot=None, until_time=None):
+    if until_slot is not None and entry.slot < until_slot:
+        return True
+    if until_time is not None and entry.block_time is not None and entry.block_time < until_time:
+        return True
+    return False
+
+
+async def fetch_signature_page(client, account, before, limit, attempts=3):
+    for attempt in range(1, attempts + 1):
+        try:
+            response = await client.get_signatures_for_address(account, before=before, limit=limit)
+            return response.value
+        except Exception as e:
+            if attempt == attempts:
+                raise
+            logging.warning(f"Signature page before {str(before)[:15]} failed (attempt {attempt}): {e}")
+            await asyncio.sleep(attempt)
+
+
+async def backfill_account(client, account, checkpoint, until_slot=None, until_time=None, page_limit=1000,
+                           pages_in_flight=4, workers=5, batch_size=0, cache=None, limiter=None, sink=None,
+                           on_transactions=None, include_failed=False, report_seconds=10, fetch_attempts=3):
+    """
+    Backfills `account` from its checkpoint (or the newest signature) back to `until_slot` /
+    `until_time` (inclusive), or to the start of its history. `on_transactions` is called with
+    the transaction records of every finished page. Signatures whose transaction is still not
+    returned after `fetch_attempts` tries are recorded in the checkpoint ("missing") and
+    retried first on the next run. Returns the run's totals.
+    """
+    account = str(account)
+    account_pubkey = Pubkey.from_string(account)
+    state = checkpoint.get(account) or {"before": None, "slot": None, "block_time": None,
+                                       "pages": 0, "signatures": 0, "transactions": 0, "exhausted": False}
+    state.setdefault("missing", [])
+
+    async def fetch_records(wanted):
+        # Transaction records of `wanted` plus the signatures still missing after fetch_attempts tries
+        records, missing = [], list(wanted)
+        for attempt in range(1, fetch_attempts + 1):
+            if attempt > 1:
+                logging.warning(f"Backfill: {len(missing)} transactions could not be fetched, retrying (attempt {attempt}).")
+                await asyncio.sleep(attempt)
+            transactions = await inspect_transactions(
+                missing, workers=workers, client=client, batch_size=batch_size, cache=cache, limiter=limiter,
+                on_transaction=sink.write if sink is not None else None
+            )
+            fetched = extract_transaction_records(transactions)
+            records.extend(fetched)
+            found = {record['signature'] for record in fetched}
+            missing = [signature for signature in missing if signature not in found]
+            if not missing:
+                break
+        return records, missing
+
+    if state["missing"]:
+        # Fetch what earlier runs could not retrieve before going further back
+        logging.info(f"Backfill for {account}: retrying {len(state['missing'])} previously missing transactions.")
+        records, missing = await fetch_records(state["missing"])
+        if on_transactions is not None and records:
+            on_transactions(records)
+        state["transactions"] += len(records)
+        state["missing"] = missing
+        checkpoint.save(account, state)
+        if missing:
+            logging.warning(f"Backfill for {account}: {len(missing)} transactions are still missing; kept in the checkpoint.")
+
+    if state["exhausted"]:
+        logging.info(f"Backfill for {account} already reached the start of its history.")
+        return {"pages": 0, "signatures": 0, "transactions": 0, "seconds": 0.0, "tx_per_second": 0.0}
+    if state["before"]:
+        logging.info(f"Resuming backfill for {account} before {state['before'][:15]} (slot {state['slot']}).")
+
+    queue = asyncio.Queue(maxsize=max(1, pages_in_flight))
+    finished = {}
+    failures = []
+    run = {"pages": 0, "signatures": 0, "transactions": 0, "next_commit": 0}
+    started = time.monotonic()
+    last_report = started
+
+    def commit():
+        # Only advance over a contiguous run of finished pages, so a resume never skips one
+        while run["next_commit"] in finished:
+            page_state, seen, fetched, missing = finished.pop(run["next_commit"])
+            state.update(page_state)
+            state["missing"] = state["missing"] + missing
+            state["pages"] += 1
+            state["signatures"] += seen
+            state["transactions"] += fetched
+            run["next_commit"] += 1
+        checkpoint.save(account, state)
+
+    def report(final=False):
+        elapsed = max(time.monotonic() - started, 1e-9)
+        rate = run["transactions"] / elapsed
+        logging.info(f"Backfill {account[:8]}{' done' if final else ''}: {run['pages']} pages, "
+                     f"{run['signatures']} signatures, {run['transactions']} transactions in {elapsed:.1f}s "
+                     f"({rate:.1f} tx/s); checkpoint slot {state['slot']}.")
+        return rate
+
+    async def producer():
+        before = Signature.from_string(state["before"]) if state["before"] else None
+        seq = 0
+        while not failures:
+            page = await fetch_signature_page(client, account_pubkey, before, page_limit)
+            in_bound = [entry for entry in page if not is_past_bound(entry, until_slot, until_time)]
+            reached_bound = len(in_bound) < len(page)
+            exhausted = len(page) < page_limit and not reached_bound
+            if in_bound:
+                oldest = in_bound[-1]
+                wanted = [str(entry.signature) for entry in in_bound if include_failed or entry.err is None]
+                await queue.put((seq, wanted, len(in_bound), {
+                    "before": str(oldest.signature), "slot": oldest.slot, "block_time": oldest.block_time,
+                    "exhausted": exhausted,
+                }))
+                seq += 1
+                before = oldest.signature
+            elif exhausted:
+                state["exhausted"] = True
+            if reached_bound or exhausted or not in_bound:
+                return
+
+    async def consumer():
+        nonlocal last_report
+        while True:
+            seq, wanted, seen, page_state = await queue.get()
+            try:
+                records, missing = await fetch_records(wanted) if wanted else ([], [])
+                if missing:
+                    # Kept in the checkpoint so the next run fetches them again
+                    logging.warning(f"Backfill page {seq}: {len(missing)} transactions could not be fetched; "
+                                    f"recording them in the checkpoint.")
+                if on_transactions is not None and records:
+                    on_transactions(records)
+
+                run["pages"] += 1
+                run["signatures"] += seen
+                run["transactions"] += len(records)
+                finished[seq] = (page_state, seen, len(records), missing)
+                commit()
+                if time.monotonic() - last_report >= report_seconds:
+                    last_report = time.monotonic()
+                    report()
+            except Exception as e:
+                # The page stays unfinished, so the checkpoint cannot move past it
+                logging.error(f"Backfill page {seq} failed: {e}")
+                failures.append(e)
+            finally:
+                queue.task_done()
+
+    consumers = [asyncio.create_task(consumer()) for _ in range(max(1, pages_in_flight))]
+    try:
+        await producer()
+        await queue.join()
+        if failures:
+            raise failures[0]
+    finally:
+        for task in consumers:
+            task.cancel()
+        await asyncio.gather(*consumers, return_exceptions=True)
+        commit()
+
+    rate = report(final=True)
+    return {"pages": run["pages"], "signatures": run["signatures"], "transactions": run["transactions"],
+            "seconds": time.monotonic() - started, "tx_per_second": rate}
+
+
+def store_fills(store, account, totals):
+    """
+    on_transactions callback: decodes the page's fills and writes them to the fill store in one batch.
+    """
+    def on_transactions(records):
+        fills = decode_fill_events(records, accounts=[account])
+        store.upsert_fills(fills, account=account)
+        totals["fills"] += sum(1 for fill in fills if fill.kind == "fill")
+        totals["reverts"] += sum(1 for fill in fills if fill.kind == "revert")
+    return on_transactions
+
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(description="Backfill the full transaction history of Solana accounts.")
+    parser.add_argument("--accounts", type=str, default=config.HARDCODED_ACCOUNT,
+                        help="Comma-separated accounts to backfill (default HARDCODED_ACCOUNT).")
+    parser.add_argument("--until_slot", type=int, default=None, help="Stop at this slot (inclusive).")
+    parser.add_argument("--until_date", type=str, default="",
+                        help="Stop at this date, e.g. 2024-06-01 or 2024-06-01T12:00:00 (UTC).")
+    parser.add_argument("--rpc_override", type=str, default="https://api.mainnet-beta.solana.com",
+                        help="RPC endpoint to use.")
+    parser.add_argument("--rpc_pool", type=str, default="", help="Comma-separated extra RPC endpoints.")
+    parser.add_argument("--hedge", action='store_true', help="Hedge slow requests to the runner-up endpoint.")
+    parser.add_argument("--workers", type=int, default=5, help="Concurrent transaction fetches per page.")
+    parser.add_argument("--batch_size", type=int, default=0, help="Fetch transactions in JSON-RPC batches of this size.")
+    parser.add_argument("--rps", type=float, default=config.RPC_RATE_PER_SECOND,
+                        help="Shared RPC rate limit in requests per second (0 disables the limiter).")
+    parser.add_argument("--pages_in_flight", type=int, default=config.BACKFILL_PAGES_IN_FLIGHT,
+                        help="Signature pages whose transactions are fetched while paging continues.")
+    parser.add_argument("--include_failed", action='store_true', help="Also fetch transactions that failed on chain.")
+    parser.add_argument("--checkpoint", type=str, default=config.BACKFILL_CHECKPOINT_PATH,
+                        help="Checkpoint file used to resume interrupted runs.")
+    parser.add_argument("--restart", action='store_true', help="Ignore the checkpoint and start from the newest signature.")
+    return parser.parse_args()
+
+
+async def backfill_runner(args):
+    checkpoint = BackfillCheckpoint(args.checkpoint)
+    accounts = [a.strip() for a in args.accounts.split(",") if a.strip()]
+    until_time = parse_until_date(args.until_date)
+    limiter = build_rate_limiter(args)
+    cache = build_transaction_cache()
+    sink = build_transaction_sink()
+    store = build_fill_store()
+    totals = {"fills": 0, "reverts": 0}
+    try:
+        async with build_endpoint_pool(args) as pool:
+            client = shared_client(pool, limiter)
+            for account in accounts:
+                if args.restart:
+                    checkpoint.reset(account)
+                await backfill_account(
+                    client, account, checkpoint,
+                    until_slot=args.until_slot,
+                    until_time=until_time,
+                    pages_in_flight=args.pages_in_flight,
+                    workers=args.workers,
+                    batch_size=args.batch_size,
+                    cache=cache,
+                    limiter=limiter,
+                    sink=sink,
+                    on_transactions=store_fills(store, account, totals),
+                    include_failed=args.include_failed
+                )
+            logging.info(f"Stored {totals['fills']} fills and {totals['reverts']} reverts in {store.path}.")
+            logging.info(f"Endpoint pool: {pool.stats()}")
+    finally:
+        sink.close()
+        store.close()
+
+
+def main():
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    args = parse_arguments()
+    try:
+        asyncio.run(backfill_runner(args))
+    except KeyboardInterrupt:
+        logging.info("Backfill interrupted; rerun the same command to resume from the checkpoint.")
+
+
+if __name__ == "__main__":
+    main()
+
+# ==================== Usage ====================
+# Everything since 1 June 2024 for the default account:
+# python backfill.py --until_date 2024-06-01
+#
+# Full history of two accounts through a batched, pooled connection:
+# python backfill.py --accounts "Acc1,Acc2" --batch_size 50 --rpc_pool "https://other-rpc"
+# =================================================
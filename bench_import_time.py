@@ -0,0 +1,72 @@
+import re
+import sys
+import argparse
+import subprocess
+
+# ==================== Benchmark: import time ====================
+# Imports each entry module in a fresh interpreter with `python -X importtime`, parses the
+# per-module timings from stderr and reports the cumulative import time (best of a few
+# runs) and the heaviest modules. The monitor path must not load the analytics stack:
+# the run fails if an entry module imports anything it is not allowed to, or takes longer
+# than --budget_ms.
+# Usage: python bench_import_time.py --repeat 5 --budget_ms 600
+# ================================================================
+
+LINE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+# Entry module -> top-level packages it must not import
+ENTRY_POINTS = {
+    "main": ("anchorpy", "driftpy", "pandas", "numpy", "tqdm", "websockets"),
+    "backfill": ("anchorpy", "driftpy", "pandas", "numpy", "tqdm"),
+    "helpers": ("anchorpy", "driftpy", "pandas", "numpy", "tqdm"),
+    "market_recorder": ("anchorpy", "driftpy"),
+}
+
+
+def import_times(module):
+    """
+    {module: (self µs, cumulative µs, depth)} for everything `module` imports, in a fresh interpreter.
+    """
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                            capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{result.stderr[-2000:]}")
+    times = {}
+    for line in result.stderr.splitlines():
+        match = LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, name = match.groups()
+            times[name] = (int(self_us), int(cumulative_us), len(indent) // 2)
+    return times
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure and police the import time of the entry modules.")
+    parser.add_argument("--modules", type=str, default=",".join(ENTRY_POINTS), help="Comma-separated entry modules.")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--top", type=int, default=8, help="Heaviest modules to list per entry module.")
+    parser.add_argument("--budget_ms", type=float, default=None, help="Fail if an entry module takes longer.")
+    args = parser.parse_args()
+
+    failures = []
+    for module in [m.strip() for m in args.modules.split(",") if m.strip()]:
+        runs = [import_times(module) for _ in range(args.repeat)]
+        best = min(runs, key=lambda times: times[module][1])
+        total_ms = best[module][1] / 1e3
+        print(f"{module}: {total_ms:7.1f} ms cumulative (best of {args.repeat}), {len(best)} modules")
+        heaviest = sorted(best.items(), key=lambda item: item[1][0], reverse=True)[:args.top]
+        for name, (self_us, cumulative_us, _) in heaviest:
+            print(f"    {name:<45} self {self_us / 1e3:6.1f} ms  cumulative {cumulative_us / 1e3:7.1f} ms")
+
+        forbidden = sorted({name.split(".")[0] for name in best} & set(ENTRY_POINTS.get(module, ())))
+        if forbidden:
+            failures.append(f"{module} imports {', '.join(forbidden)}")
+        if args.budget_ms is not None and total_ms > args.budget_ms:
+            failures.append(f"{module} takes {total_ms:.1f} ms (budget {args.budget_ms:.0f} ms)")
+
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+import time
+import random
+import logging
+import argparse
+from log_rules import compile_rules, program_line
+
+# ==================== Benchmark: compiled log rules vs per-rule loop ====================
+# Evaluates growing rule sets (--rules) against one batch of synthetic Drift transactions:
+#   - per-rule loop: every log line against every rule (what search_logs used to do),
+#   - compiled: RuleSet.evaluate over the whole batch in one pass,
+# checks that both return the same matches and reports compile time and us per transaction.
+# Usage: python bench_log_rules.py --rules 10,100,500,1000 --transactions 200 --log_lines 40
+# ========================================================================================
+
+DRIFT_PROGRAM_ID = "dRiftyHA39MWEi3m9aunc5MzRF1JYuBsbn6VPcn33UH"
+INSTRUCTIONS = ["FillPerpOrder", "PlacePerpOrder", "PlaceAndTakePerpOrder", "CancelOrder", "SettlePnl", "Deposit",
+                "Withdraw", "FillSpotOrder", "PlaceSpotOrder", "TriggerOrder", "UpdateFundingRate", "LiquidatePerp",
+                "SettleFundingPayment", "UpdateAmms"]
+
+
+def synthetic_records(transactions, log_lines, rng):
+    """
+    Transaction records (as extract_transaction_record returns them) with Drift-like logs.
+    """
+    records = []
+    for i in range(transactions):
+        instruction = rng.choice(INSTRUCTIONS)
+        logs = [
+            "Program ComputeBudget111111111111111111111111111111 invoke [1]",
+            "Program ComputeBudget111111111111111111111111111111 success",
+            f"Program {DRIFT_PROGRAM_ID} invoke [1]",
+            f"Program log: Instruction: {instruction}",
+            f"Program log: base_asset_amount={rng.randrange(10 ** 12)} price={rng.randrange(10 ** 9)}",
+        ]
+        if instruction == "FillPerpOrder" and rng.random() < 0.1:
+            logs.append("Program log: RevertFill")
+        logs += [f"Program data: {rng.randbytes(90).hex()}" for _ in range(max(0, log_lines - len(logs) - 2))]
+        logs += [f"Program {DRIFT_PROGRAM_ID} consumed {rng.randrange(400000)} of 1400000 compute units",
+                 f"Program {DRIFT_PROGRAM_ID} success"]
+        records.append({"slot": 250000000 + i, "signature": f"sig{i}", "block_time": 1700000000 + i,
+                        "err": None, "log_messages": logs})
+    return records
+
+
+def synthetic_rules(count, rng):
+    """
+    `count` rules: mostly term sets (a few of them on real instruction names), some regexes,
+    program filters and required terms.
+    """
+    rules = ["FillPerpOrder", "RevertFill"]
+    while len(rules) < count:
+        i = len(rules)
+        kind = rng.random()
+        if kind < 0.1:
+            rules.append({"name": f"regex-{i}", "regex": [rf"base_asset_amount=\d{{{rng.randint(9, 13)}}}\b"],
+                          "programs": [DRIFT_PROGRAM_ID]})
+        elif kind < 0.15:
+            rules.append({"name": f"program-{i}", "programs": [f"Prog{i}{'1' * 30}"]})
+        elif kind < 0.25:
+            rules.append({"name": f"require-{i}", "terms": [f"Instruction: {rng.choice(INSTRUCTIONS)}"],
+                          "require": [f"Program {DRIFT_PROGRAM_ID} success"]})
+        else:
+            rules.append({"name": f"terms-{i}", "terms": [f"Instruction: Custom{i}x{j}" for j in range(rng.randint(1, 3))]})
+    return rules
+
+
+def per_rule_loop(records, rules):
+    """
+    Reference evaluation: every rule against every log line.
+    """
+    prepared = [(rule, rule.terms or (() if rule.regex else tuple(map(program_line, rule.programs))))
+                for rule in rules.rules]
+    results = []
+    for record in records:
+        logs = record['log_messages']
+        for log_index, log in enumerate(logs):
+            for rule, line_terms in prepared:
+                term = next((t for t in line_terms if t in log), None)
+                if term is None:
+                    matched = next(filter(None, (pattern.search(log) for pattern in rule.regex)), None)
+                    if matched is None:
+                        continue
+                    term = matched.group()
+                if rule.programs and not any(program_line(p) in line for p in rule.programs for line in logs):
+                    continue
+                if not all(any(t in line for line in logs) for t in rule.require):
+                    continue
+                results.append((record['signature'], log_index, rule.name, term))
+    return results
+
+
+def best_of(fn, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - started)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the compiled log rule engine against a per-rule loop.")
+    parser.add_argument("--rules", type=str, default="10,100,500,1000", help="Comma-separated rule set sizes.")
+    parser.add_argument("--transactions", type=int, default=200)
+    parser.add_argument("--log_lines", type=int, default=40)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    # RuleSet logs its compile time; the table below reports it
+    logging.getLogger().setLevel(logging.WARNING)
+    rng = random.Random(args.seed)
+    records = synthetic_records(args.transactions, args.log_lines, rng)
+    n = len(records)
+    print(f"{n} transactions x {args.log_lines} log lines (best of {args.repeat})")
+    for size in (int(s) for s in args.rules.split(",") if s.strip()):
+        specs = synthetic_rules(size, rng)
+        started = time.perf_counter()
+        rules = compile_rules(specs)
+        compile_seconds = time.perf_counter() - started
+        loop_time, expected = best_of(lambda: per_rule_loop(records, rules), args.repeat)
+        compiled_time, matches = best_of(lambda: rules.evaluate(records), args.repeat)
+        got = [(m['signature'], m['log_index'], m['rule'], m['found_term']) for m in matches]
+        fired = len({m['rule'] for m in matches})
+        print(f"{size:5d} rules ({len(rules.literals):5d} literals): compile {compile_seconds * 1e3:7.1f} ms, "
+              f"per-rule loop {loop_time * 1e6 / n:9.1f} us/tx, compiled {compiled_time * 1e6 / n:7.1f} us/tx "
+              f"({loop_time / compiled_time:6.1f}x), {len(matches)} matches from {fired} rules"
+              f"{'' if got == expected else '  MISMATCH'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+import os
+import time
+import random
+import asyncio
+import argparse
+import tempfile
+import pandas as pd
+from driftpy.accounts import DataAndSlot
+from bench_user_stats import offline_drift_client
+from bench_serialize_markets import synthetic_markets
+from helpers import serialize_perp_markets, serialize_spot_markets
+from market_recorder import MarketRecorder, read_market_history
+
+# ==================== Benchmark: market history recorder ====================
+# Records synthetic markets whose reserves, funding, TWAPs and open interest drift a
+# little every snapshot, then:
+#   - checks every numeric, flag and time column read back matches serialize_perp_markets /
+#     serialize_spot_markets of the same snapshot exactly,
+#   - compares the bytes on disk with the per-snapshot DataFrames' memory footprint,
+#   - times a full read against a one-hour, three-column, one-market read.
+# Usage: python bench_market_recorder.py --snapshots 2000 --perp_markets 30 --spot_markets 20
+# ============================================================================
+
+MOVING = {
+    "amm": ["base_asset_reserve", "quote_asset_reserve", "sqrt_k", "cumulative_funding_rate_long",
+            "cumulative_funding_rate_short", "last_funding_rate", "base_asset_amount_long",
+            "base_asset_amount_short", "last_mark_price_twap", "last_bid_price_twap", "last_ask_price_twap"],
+    "historical_oracle_data": ["last_oracle_price", "last_oracle_price_twap", "last_oracle_price_twap5min"],
+    "spot": ["deposit_balance", "borrow_balance", "cumulative_deposit_interest", "cumulative_borrow_interest",
+             "utilization_twap"],
+}
+
+
+def step(markets, rng, ts_seconds):
+    for market in markets:
+        if hasattr(market, "amm"):
+            for field in MOVING["amm"]:
+                setattr(market.amm, field, getattr(market.amm, field) + rng.randrange(-5000, 5000))
+            for field in MOVING["historical_oracle_data"]:
+                data = market.amm.historical_oracle_data
+                setattr(data, field, getattr(data, field) + rng.randrange(-50, 50))
+            market.amm.last_mark_price_twap_ts = ts_seconds
+        else:
+            for field in MOVING["spot"]:
+                setattr(market, field, getattr(market, field) + rng.randrange(0, 5000))
+            market.historical_oracle_data.last_oracle_price_twap_ts = ts_seconds
+
+
+def comparable(frame):
+    return frame[[c for c in frame.columns if frame[c].dtype != object]]
+
+
+async def record(args, directory, rng):
+    drift_client = offline_drift_client()
+    perps = synthetic_markets("PerpMarket", args.perp_markets, rng)
+    spots = synthetic_markets("SpotMarket", args.spot_markets, rng)
+    drift_client.account_subscriber.cache = {"perp_markets": [DataAndSlot(0, m) for m in perps],
+                                             "spot_markets": [DataAndSlot(0, m) for m in spots],
+                                             "oracle_price_data": {}, "state": None}
+    recorder = MarketRecorder(drift_client, directory, chunk_snapshots=args.chunk_snapshots, refresh=False)
+    expected = {"perp": [], "spot": []}
+    in_memory = 0
+    start_ms = 1_717_243_200_000  # 2024-06-01T12:00Z
+    started = time.perf_counter()
+    for i in range(args.snapshots):
+        ts = start_ms + i * args.interval * 1000
+        step(perps + spots, rng, ts // 1000)
+        for entry in drift_client.account_subscriber.cache["perp_markets"] + drift_client.account_subscriber.cache["spot_markets"]:
+            entry.slot = 270_000_000 + i * 25
+        await recorder.snapshot(ts)
+        if i % args.check_every == 0:
+            perp_frame, spot_frame = serialize_perp_markets(perps), serialize_spot_markets(spots)
+            in_memory += (perp_frame.memory_usage(deep=True).sum() + spot_frame.memory_usage(deep=True).sum()) * args.check_every
+            expected["perp"].append((ts, perp_frame))
+            expected["spot"].append((ts, spot_frame))
+    recorder.flush()
+    return time.perf_counter() - started, expected, in_memory
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the market history recorder.")
+    parser.add_argument("--snapshots", type=int, default=2000)
+    parser.add_argument("--perp_markets", type=int, default=30)
+    parser.add_argument("--spot_markets", type=int, default=20)
+    parser.add_argument("--interval", type=int, default=10)
+    parser.add_argument("--chunk_snapshots", type=int, default=360)
+    parser.add_argument("--check_every", type=int, default=100, help="Compare every n-th snapshot with the serializers.")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    with tempfile.TemporaryDirectory() as directory:
+        record_time, expected, in_memory = asyncio.run(record(args, directory, rng))
+        on_disk = sum(os.path.getsize(os.path.join(root, name)) for root, _, names in os.walk(directory) for name in names)
+        print(f"{args.snapshots} snapshots of {args.perp_markets} perp + {args.spot_markets} spot markets recorded in "
+              f"{record_time:.2f} s; {on_disk / 1e6:.1f} MB on disk vs {in_memory / 1e6:.1f} MB as serialized DataFrames "
+              f"({in_memory / on_disk:.1f}x smaller)")
+
+        for kind, key in [("perp", "market.market_index"), ("spot", "spot_market.market_index")]:
+            started = time.perf_counter()
+            history = read_market_history(directory, kind)
+            full_time = time.perf_counter() - started
+            for ts, frame in expected[kind]:
+                got = history[history["ts"] == pd.Timestamp(ts, unit="ms", tz="UTC")].reset_index(drop=True)
+                want = comparable(frame)
+                pd.testing.assert_frame_equal(got[want.columns], want, check_exact=True)
+
+            start = pd.Timestamp(1_717_243_200_000 + args.interval * 1000 * args.snapshots // 2, unit="ms", tz="UTC")
+            columns = [f"{key.split('.')[0]}.{c}" for c in
+                       (["amm.last_funding_rate", "amm.base_asset_reserve", "amm.last_mark_price_twap"] if kind == "perp"
+                        else ["deposit_balance", "borrow_balance", "utilization_twap"])]
+            started = time.perf_counter()
+            window = read_market_history(directory, kind, start=start, end=start + pd.Timedelta(hours=1),
+                                         columns=columns, markets=[1])
+            window_time = time.perf_counter() - started
+            print(f"{kind}: full read {len(history)} rows x {history.shape[1]} columns {full_time * 1e3:8.1f} ms "
+                  f"(spot checks identical); 1 h x 3 columns x 1 market {len(window)} rows {window_time * 1e3:6.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
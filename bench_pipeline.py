@@ -0,0 +1,111 @@
+import os
+import time
+import asyncio
+import logging
+import argparse
+import tempfile
+import statistics
+from argparse import Namespace
+
+import config
+from main import run_cycle
+from endpoint_pool import EndpointPool
+from signature_cursor import SignatureCursorStore
+from cycle_pipeline import CyclePipeline
+from rpc_replay_server import FixtureStore, ReplayServer
+from bench_rpc_replay import write_synthetic_fixtures
+
+# ==================== Benchmark: pipelined vs sequential cycles ====================
+# Catches up on --sizes new signatures against the local JSON-RPC stand-in, once with
+# run_cycle (the --sequential path) and once with CyclePipeline, and reports when the
+# alerts went out, measured from the start of the poll:
+#   - first alert, median alert and last alert (every synthetic transaction is a Drift fill),
+#   - so alert latency that grows with the batch size shows up as a growing first/median alert.
+# Usage: python bench_pipeline.py --sizes 50,200,500 --latency_ms 30 --workers 10
+# ===================================================================================
+
+
+class AlertClock:
+    # Records when each match was handed over for notification
+    def __init__(self):
+        self.started = None
+        self.alerts = []
+
+    def submit(self, matches):
+        now = time.perf_counter()
+        self.alerts.extend(now - self.started for _ in {match['signature'] for match in matches})
+
+    def report(self, label, size):
+        alerts = self.alerts or [float("nan")]
+        print(f"{label:<10} {size:5d} signatures: first alert {alerts[0] * 1e3:8.1f} ms, "
+              f"median {statistics.median(alerts) * 1e3:8.1f} ms, last {alerts[-1] * 1e3:8.1f} ms "
+              f"({len(self.alerts)} alerted transactions)")
+
+
+def cursor_behind(directory, name, history, size):
+    store = SignatureCursorStore(os.path.join(directory, f"{name}.json"))
+    entry = history[min(size, len(history) - 1)]
+    store.advance(config.HARDCODED_ACCOUNT, entry["signature"], entry["slot"])
+    return store
+
+
+async def sequential(args, pool, history, size, directory):
+    clock = AlertClock()
+    cycle_args = Namespace(before_sig="", include_test_sigs=False, workers=args.workers, batch_size=0, metrics_json="",
+                           commitment=None)
+    cursor_store = cursor_behind(directory, f"sequential-{size}", history, size)
+    clock.started = time.perf_counter()
+    await run_cycle(cycle_args, cursor_store, client=pool, dispatcher=clock)
+    clock.report("sequential", size)
+
+
+async def pipelined(args, pool, history, size, directory):
+    clock = AlertClock()
+    cursor_store = cursor_behind(directory, f"pipelined-{size}", history, size)
+    pipeline = CyclePipeline(config.HARDCODED_ACCOUNT, cursor_store, pool, config.LOG_SEARCH_TERMS, clock.submit,
+                             interval_seconds=3600, workers=args.workers)
+    clock.started = time.perf_counter()
+    task = asyncio.create_task(pipeline.run_forever())
+    while pipeline.counters["batches"] < 1 and not task.done():
+        await asyncio.sleep(0.005)
+    task.cancel()
+    await asyncio.gather(task, return_exceptions=True)
+    clock.report("pipelined", size)
+
+
+async def run(args, directory):
+    fixtures = os.path.join(directory, "fixtures.ndjson")
+    write_synthetic_fixtures(fixtures, config.HARDCODED_ACCOUNT, max(args.sizes) + 1, args.log_lines)
+    store = FixtureStore(fixtures)
+    history = store.signatures[config.HARDCODED_ACCOUNT]
+    server = ReplayServer(store, args.latency_ms, args.jitter_ms, seed=args.seed)
+    url = await server.start()
+    print(f"Replaying on {url} (latency {args.latency_ms:.0f} +/- {args.jitter_ms:.0f} ms, {args.workers} workers)")
+    try:
+        async with EndpointPool([url]) as pool:
+            for size in args.sizes:
+                await sequential(args, pool, history, size, directory)
+                await pipelined(args, pool, history, size, directory)
+    finally:
+        await server.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare alert latency of the pipelined and sequential cycles.")
+    parser.add_argument("--sizes", type=str, default="50,200,500", help="Comma-separated numbers of new signatures.")
+    parser.add_argument("--workers", type=int, default=10)
+    parser.add_argument("--log_lines", type=int, default=40)
+    parser.add_argument("--latency_ms", type=float, default=30.0)
+    parser.add_argument("--jitter_ms", type=float, default=10.0)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+    args.sizes = [int(s) for s in args.sizes.split(",") if s.strip()]
+
+    # The monitor logs every fetched transaction; keep the report readable
+    logging.getLogger().setLevel(logging.WARNING)
+    with tempfile.TemporaryDirectory() as directory:
+        asyncio.run(run(args, directory))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+import os
+import math
+import json
+import time
+import asyncio
+import logging
+import argparse
+import tempfile
+import statistics
+from argparse import Namespace
+from solders.signature import Signature
+
+import config
+from main import run_cycle
+from metrics import METRICS
+from endpoint_pool import EndpointPool
+from rate_limiter import AdaptiveRateLimiter
+from signature_cursor import SignatureCursorStore
+from f2_inspect_transactions import inspect_transactions
+from f3_search_logs import search_logs, extract_transaction_records
+from rpc_replay_server import FixtureStore, ReplayServer
+from bench_search_logs import synthetic_transaction_json
+
+# ==================== Benchmark: end to end against replayed RPC ====================
+# Runs the monitor's hot paths against the local JSON-RPC stand-in (rpc_replay_server.py)
+# instead of mainnet, so results are repeatable and need no network:
+#   - run_cycle latency catching up on --cycle_signatures new signatures (min / median / p95),
+#     and the median time of each of its stages (from metrics.METRICS),
+#   - inspect_transactions throughput (transactions per second) for each worker count,
+#   - search_logs cost per transaction on the fetched transactions.
+# Fixtures are recorded ones (--fixtures, recorded for HARDCODED_ACCOUNT) or synthetic
+# Drift fills. Latency, jitter and error injection are the server's.
+# Usage: python bench_rpc_replay.py --transactions 500 --latency_ms 50 --jitter_ms 20 --workers 1,5,10,20
+# ====================================================================================
+
+
+class CountingDispatcher:
+    # Stands in for NotificationDispatcher: counts matches instead of playing sounds and sending email
+    def __init__(self):
+        self.matches = 0
+
+    def submit(self, matches):
+        self.matches += len(matches)
+
+
+def write_synthetic_fixtures(path, account, count, log_lines):
+    signatures = []
+    with open(path, "w") as f:
+        for i in range(count):
+            signature, slot = str(Signature.new_unique()), 250_000_000 + i
+            transaction = synthetic_transaction_json(log_lines, signature, slot, 1_700_000_000 + i)
+            f.write(json.dumps({"method": "getTransaction", "params": [signature], "result": transaction}) + "\n")
+            signatures.append({"signature": signature, "slot": slot, "err": None, "memo": None,
+                               "blockTime": 1_700_000_000 + i, "confirmationStatus": "finalized"})
+        f.write(json.dumps({"method": "getSignaturesForAddress", "params": [account],
+                            "result": list(reversed(signatures))}) + "\n")
+
+
+def percentile(values, share):
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(share * len(ordered)) - 1)]
+
+
+def build_limiter(args):
+    if not args.rps:
+        return None
+    return AdaptiveRateLimiter(rate=args.rps, initial_concurrency=config.RPC_MAX_CONCURRENCY,
+                               max_concurrency=config.RPC_MAX_CONCURRENCY, latency_target=config.RPC_LATENCY_TARGET)
+
+
+async def run(args, directory):
+    fixtures = args.fixtures
+    if not fixtures:
+        fixtures = os.path.join(directory, "fixtures.ndjson")
+        write_synthetic_fixtures(fixtures, config.HARDCODED_ACCOUNT, args.transactions, args.log_lines)
+    store = FixtureStore(fixtures)
+    history = store.signatures.get(config.HARDCODED_ACCOUNT)
+    if not history:
+        raise SystemExit(f"{fixtures} has no getSignaturesForAddress history for HARDCODED_ACCOUNT.")
+
+    server = ReplayServer(store, args.latency_ms, args.jitter_ms, args.error_rate, args.error_kind, seed=args.seed)
+    url = await server.start()
+    print(f"Replaying {len(store.transactions)} transactions / {len(history)} signatures on {url} "
+          f"(latency {args.latency_ms:.0f} +/- {args.jitter_ms:.0f} ms, error rate {args.error_rate:.1%} {args.error_kind})")
+    try:
+        async with EndpointPool([url]) as pool:
+            # Cycle latency: each cycle starts from a cursor `cycle_signatures` behind the newest signature
+            cursor_entry = history[min(args.cycle_signatures, len(history) - 1)]
+            cycle_args = Namespace(before_sig="", include_test_sigs=False, workers=max(args.worker_counts),
+                                   batch_size=args.batch_size, metrics_json="", commitment=None)
+            dispatcher = CountingDispatcher()
+            durations, stages = [], {}
+            for i in range(args.cycles):
+                cursor_store = SignatureCursorStore(os.path.join(directory, f"cursor-{i}.json"))
+                cursor_store.advance(config.HARDCODED_ACCOUNT, cursor_entry["signature"], cursor_entry["slot"])
+                started = time.perf_counter()
+                await run_cycle(cycle_args, cursor_store, limiter=build_limiter(args), client=pool, dispatcher=dispatcher)
+                durations.append(time.perf_counter() - started)
+                for stage, seconds in METRICS.last_cycle["stages"].items():
+                    stages.setdefault(stage, []).append(seconds)
+            print(f"run_cycle, {args.cycle_signatures} new signatures, {cycle_args.workers} workers, "
+                  f"batch {args.batch_size or 'off'} ({args.cycles} cycles): min {min(durations) * 1e3:7.1f} ms, "
+                  f"median {statistics.median(durations) * 1e3:7.1f} ms, p95 {percentile(durations, 0.95) * 1e3:7.1f} ms "
+                  f"({dispatcher.matches} matches)")
+            print("    median per stage: " + ", ".join(f"{stage} {statistics.median(seconds) * 1e3:.1f} ms"
+                                                      for stage, seconds in stages.items()))
+
+            # inspect_transactions throughput per worker count
+            signatures = [entry["signature"] for entry in history[:args.transactions]]
+            transactions = []
+            for workers in args.worker_counts:
+                started = time.perf_counter()
+                transactions = await inspect_transactions(signatures, workers=workers, client=pool, limiter=build_limiter(args))
+                elapsed = time.perf_counter() - started
+                print(f"inspect_transactions, {workers:3d} workers: {len(transactions)}/{len(signatures)} transactions "
+                      f"in {elapsed:6.2f} s = {len(transactions) / elapsed:8.1f} tx/s")
+
+            # search_logs cost per transaction
+            best = float("inf")
+            for _ in range(args.repeat):
+                started = time.perf_counter()
+                matches = search_logs(extract_transaction_records(transactions), config.LOG_SEARCH_TERMS)
+                best = min(best, time.perf_counter() - started)
+            print(f"search_logs: {best * 1e6 / max(1, len(transactions)):8.1f} us/tx over {len(transactions)} "
+                  f"transactions ({len(matches)} matches, best of {args.repeat})")
+    finally:
+        await server.stop()
+    print(f"Server: {server.counters}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark run_cycle, inspect_transactions and search_logs offline.")
+    parser.add_argument("--fixtures", type=str, default="", help="Recorded fixture file (default: synthetic fixtures).")
+    parser.add_argument("--transactions", type=int, default=500, help="Synthetic transactions / transactions inspected.")
+    parser.add_argument("--log_lines", type=int, default=40)
+    parser.add_argument("--cycle_signatures", type=int, default=100, help="New signatures per measured cycle.")
+    parser.add_argument("--cycles", type=int, default=5)
+    parser.add_argument("--workers", type=str, default="1,2,5,10,20", help="Comma-separated worker counts.")
+    parser.add_argument("--batch_size", type=int, default=0, help="JSON-RPC batch size for the measured cycles.")
+    parser.add_argument("--rps", type=float, default=0, help="Go through an AdaptiveRateLimiter at this rate (0: none).")
+    parser.add_argument("--latency_ms", type=float, default=50.0)
+    parser.add_argument("--jitter_ms", type=float, default=20.0)
+    parser.add_argument("--error_rate", type=float, default=0.0)
+    parser.add_argument("--error_kind", type=str, default="429", choices=("429", "500", "rpc"))
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+    args.worker_counts = [int(w) for w in args.workers.split(",") if w.strip()]
+
+    # The monitor logs every fetched transaction; keep the report readable
+    logging.getLogger().setLevel(logging.WARNING)
+    with tempfile.TemporaryDirectory() as directory:
+        asyncio.run(run(args, directory))
+
+
+if __name__ == "__main__":
+    main()
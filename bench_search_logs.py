@@ -0,0 +1,98 @@
+import json
+import time
+import argparse
+from solders.rpc.responses import GetTransactionResp
+from solders.signature import Signature
+from solders.pubkey import Pubkey
+from config import LOG_SEARCH_TERMS
+from f3_search_logs import search_logs, extract_transaction_records
+
+# ==================== Benchmark: search_logs per-transaction cost ====================
+# Compares the legacy json.dumps + regex path against the typed extraction path on
+# synthetic getTransaction responses shaped like Drift fills.
+# Usage: python bench_search_logs.py --transactions 2000 --log_lines 40
+# =====================================================================================
+
+def synthetic_transaction_json(log_lines, signature=None, slot=250000000, block_time=1700000000):
+    """
+    A getTransaction result (JSON-RPC "result" object) shaped like a Drift fill.
+    """
+    logs = [
+        "Program ComputeBudget111111111111111111111111111111 invoke [1]",
+        "Program dRiftyHA39MWEi3m9aunc5MzRF1JYuBsbn6VPcn33UH invoke [1]",
+        "Program log: Instruction: FillPerpOrder",
+        'Program log: order "filled" with quotes',
+    ]
+    logs += [f"Program data: {'A' * 120}{i}" for i in range(max(0, log_lines - len(logs)))]
+    return {
+        "slot": slot,
+        "blockTime": block_time,
+        "version": 0,
+        "transaction": {
+            "signatures": [signature or str(Signature.new_unique())],
+            "message": {
+                "accountKeys": [str(Pubkey.new_unique()) for _ in range(12)],
+                "header": {"numRequiredSignatures": 1, "numReadonlySignedAccounts": 0, "numReadonlyUnsignedAccounts": 4},
+                "recentBlockhash": str(Pubkey.new_unique()),
+                "instructions": [{"programIdIndex": 1, "accounts": list(range(12)), "data": "3Bxs4h24hBtQy9rw", "stackHeight": None}],
+                "addressTableLookups": [],
+            },
+        },
+        "meta": {
+            "err": None,
+            "status": {"Ok": None},
+            "fee": 5000,
+            "preBalances": [0] * 12,
+            "postBalances": [0] * 12,
+            "innerInstructions": [],
+            "logMessages": logs,
+            "preTokenBalances": [],
+            "postTokenBalances": [],
+            "rewards": [],
+            "loadedAddresses": {"writable": [], "readonly": []},
+            "computeUnitsConsumed": 120000,
+        },
+    }
+
+
+def synthetic_transaction(log_lines):
+    raw = {"jsonrpc": "2.0", "id": 1, "result": synthetic_transaction_json(log_lines)}
+    return GetTransactionResp.from_json(json.dumps(raw)).value
+
+
+def time_path(fn, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark search_logs: regex round trip vs typed extraction.")
+    parser.add_argument("--transactions", type=int, default=1000)
+    parser.add_argument("--log_lines", type=int, default=40)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    transactions = [synthetic_transaction(args.log_lines) for _ in range(args.transactions)]
+
+    regex_time, regex_matches = time_path(
+        lambda: search_logs([json.dumps(tx, default=str) for tx in transactions], LOG_SEARCH_TERMS), args.repeat
+    )
+    typed_time, typed_matches = time_path(
+        lambda: search_logs(extract_transaction_records(transactions), LOG_SEARCH_TERMS), args.repeat
+    )
+
+    n = len(transactions)
+    print(f"{n} transactions x {args.log_lines} log lines (best of {args.repeat})")
+    print(f"regex path: {regex_time * 1e6 / n:9.1f} us/tx  ({len(regex_matches)} matches, "
+          f"{sum(m['signature'] is None for m in regex_matches)} without signature)")
+    print(f"typed path: {typed_time * 1e6 / n:9.1f} us/tx  ({len(typed_matches)} matches, "
+          f"{sum(m['signature'] is None for m in typed_matches)} without signature)")
+    print(f"speedup:    {regex_time / typed_time:9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
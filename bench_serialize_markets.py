@@ -0,0 +1,89 @@
+import time
+import random
+import argparse
+import pandas as pd
+from bench_user_stats import offline_drift_client, blank_account
+from helpers import (human_amm_df, human_market_df, AMM_DIVISORS, PERP_MARKET_SECTIONS, SPOT_MARKET_SECTIONS,
+                     serialize_perp_markets, serialize_spot_markets)
+
+# ==================== Benchmark: market serialization ====================
+# Compares the per-market path (pd.json_normalize + human_*_df per nested section, then a
+# concat per market and across markets) with the bulk serializers on synthetic markets,
+# and checks both produce exactly the same frame.
+# Usage: python bench_serialize_markets.py --perp_markets 40 --spot_markets 30
+# =========================================================================
+
+ENUM_FIELDS = {'status', 'contract_type', 'contract_tier', 'oracle_source', 'asset_tier'}
+
+
+def randomize(obj, rng):
+    for key, value in list(obj.__dict__.items()):
+        if isinstance(value, bool) or key in ENUM_FIELDS:
+            continue
+        if isinstance(value, int):
+            setattr(obj, key, rng.randrange(1_600_000_000, 1_800_000_000) if key.endswith('_ts') else rng.randrange(2 ** 40))
+        elif hasattr(value, '__dict__') and not hasattr(value, 'to_json'):
+            randomize(value, rng)
+
+
+def synthetic_markets(name, count, rng):
+    drift_client = offline_drift_client()
+    markets = []
+    for i in range(count):
+        market = blank_account(drift_client, name)
+        randomize(market, rng)
+        market.market_index = i
+        if name == "SpotMarket":
+            market.decimals = rng.choice([6, 8, 9])
+        markets.append(market)
+    return markets
+
+
+def per_market_frame(market, sections):
+    parts = []
+    for prefix, path, dropped, divisors in sections:
+        obj = market
+        for attr in path:
+            obj = getattr(obj, attr)
+        df = pd.json_normalize(obj.__dict__).drop(list(dropped), axis=1)
+        df = df.pipe(human_amm_df if divisors is AMM_DIVISORS else human_market_df)
+        df.columns = [prefix + col for col in df.columns]
+        parts.append(df)
+    return pd.concat(parts, axis=1)
+
+
+def time_path(fn, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark market serialization: per market vs bulk.")
+    parser.add_argument("--perp_markets", type=int, default=40)
+    parser.add_argument("--spot_markets", type=int, default=30)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    for label, name, count, sections, bulk in [
+        ("perp", "PerpMarket", args.perp_markets, PERP_MARKET_SECTIONS, serialize_perp_markets),
+        ("spot", "SpotMarket", args.spot_markets, SPOT_MARKET_SECTIONS, serialize_spot_markets),
+    ]:
+        markets = synthetic_markets(name, count, rng)
+        loop_time, loop_frame = time_path(
+            lambda: pd.concat([per_market_frame(m, sections) for m in markets], ignore_index=True), args.repeat
+        )
+        bulk_time, bulk_frame = time_path(lambda: bulk(markets), args.repeat)
+        pd.testing.assert_frame_equal(loop_frame, bulk_frame, check_exact=True)
+        print(f"{count} {label} markets x {bulk_frame.shape[1]} columns (best of {args.repeat}): "
+              f"per market {loop_time * 1e3:8.1f} ms, bulk {bulk_time * 1e3:6.1f} ms, "
+              f"speedup {loop_time / bulk_time:5.1f}x, identical")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+import time
+import base64
+import random
+import asyncio
+import logging
+import argparse
+import pandas as pd
+from anchorpy import ProgramAccount
+from solana.rpc.async_api import AsyncClient
+
+from helpers import all_user_stats
+from user_snapshot import fetch_user_snapshot, decode_accounts
+from rpc_replay_server import FixtureStore, ReplayServer
+from bench_user_stats import offline_drift_client, synthetic_cache, synthetic_user
+
+# ==================== Benchmark: batched user snapshots ====================
+# Serves --users synthetic Drift User accounts from the local JSON-RPC stand-in and loads
+# them twice:
+#   - per account: getAccountInfo + anchorpy decode, one user after the other,
+#   - snapshot: user_snapshot.fetch_user_snapshot (chunked getMultipleAccounts, compiled decode),
+# reports wall time, HTTP round trips and decode time, and checks that both return the same
+# accounts and the same all_user_stats frame.
+# Usage: python bench_user_snapshot.py --users 120 --latency_ms 50 --jitter_ms 10
+# ===========================================================================
+
+DRIFT_PROGRAM_ID = "dRiftyHA39MWEi3m9aunc5MzRF1JYuBsbn6VPcn33UH"
+SLOT = 250_000_000
+
+
+def account_json(data):
+    return {"data": [base64.b64encode(data).decode(), "base64"], "executable": False, "lamports": 35_290_880,
+            "owner": DRIFT_PROGRAM_ID, "rentEpoch": 18_446_744_073_709_551_615, "space": len(data)}
+
+
+def encode_users(coder, users):
+    layout, discriminator = coder._accounts_layout["User"], coder.acc_name_to_discriminator["User"]
+    return [discriminator + layout.build(user.account) for user in users]
+
+
+def fixture_store(users, datas):
+    store = FixtureStore()
+    store.add("getMultipleAccounts", [[str(user.public_key) for user in users], {"encoding": "base64"}],
+              {"context": {"slot": SLOT}, "value": [account_json(data) for data in datas]})
+    return store
+
+
+async def per_account(client, coder, pubkeys):
+    users, decode_seconds = [], 0.0
+    for pubkey in pubkeys:
+        response = await client.get_account_info(pubkey)
+        started = time.perf_counter()
+        users.append(ProgramAccount(pubkey, coder.decode(response.value.data)))
+        decode_seconds += time.perf_counter() - started
+    return users, decode_seconds
+
+
+async def run(args):
+    rng = random.Random(args.seed)
+    drift_client = offline_drift_client()
+    coder = drift_client.program.coder.accounts
+    cache = synthetic_cache(drift_client, rng, args.perp_markets)
+    users = [synthetic_user(drift_client, rng, args.perp_markets) for _ in range(args.users)]
+    pubkeys = [user.public_key for user in users]
+    datas = encode_users(coder, users)
+
+    server = ReplayServer(fixture_store(users, datas), args.latency_ms, args.jitter_ms, seed=args.seed)
+    url = await server.start()
+    print(f"{len(users)} User accounts on {url} (latency {args.latency_ms:.0f} +/- {args.jitter_ms:.0f} ms)")
+    try:
+        async with AsyncClient(url) as client:
+            requests = server.counters["http_requests"]
+            started = time.perf_counter()
+            expected, decode_seconds = await per_account(client, coder, pubkeys)
+            elapsed = time.perf_counter() - started
+            print(f"per account: {elapsed * 1e3:8.1f} ms, {server.counters['http_requests'] - requests:4d} requests, "
+                  f"decode {decode_seconds * 1e3 / len(users):6.2f} ms/user")
+
+            requests = server.counters["http_requests"]
+            started = time.perf_counter()
+            snapshot = await fetch_user_snapshot(client, pubkeys, coder=coder, chunk_size=args.chunk_size)
+            elapsed = time.perf_counter() - started
+            started = time.perf_counter()
+            decode_accounts(datas, coder=coder)
+            decode_seconds = time.perf_counter() - started
+            print(f"snapshot:    {elapsed * 1e3:8.1f} ms, {server.counters['http_requests'] - requests:4d} requests "
+                  f"in {snapshot.round_trips} round trip(s) at slot {snapshot.slot}, "
+                  f"decode {decode_seconds * 1e3 / len(users):6.2f} ms/user")
+    finally:
+        await server.stop()
+
+    same = [(u.public_key, u.account) for u in expected] == [(u.public_key, u.account) for u in snapshot.users]
+    expected_frame, _ = await all_user_stats(expected, drift_client, pure_cache=cache)
+    frame, _ = await all_user_stats(snapshot.users, drift_client, pure_cache=cache)
+    pd.testing.assert_frame_equal(expected_frame, frame, check_exact=True)
+    print(f"accounts {'identical' if same else 'MISMATCH'}, all_user_stats frames identical")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare per-account loads with batched user snapshots.")
+    parser.add_argument("--users", type=int, default=120)
+    parser.add_argument("--chunk_size", type=int, default=100)
+    parser.add_argument("--perp_markets", type=int, default=12)
+    parser.add_argument("--latency_ms", type=float, default=50.0)
+    parser.add_argument("--jitter_ms", type=float, default=10.0)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    logging.getLogger().setLevel(logging.WARNING)
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
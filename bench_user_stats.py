@@ -0,0 +1,168 @@
+import time
+import random
+import asyncio
+import argparse
+import pandas as pd
+from anchorpy import Wallet, ProgramAccount
+from solana.rpc.async_api import AsyncClient
+from solders.pubkey import Pubkey
+from driftpy.accounts import DataAndSlot
+from driftpy.drift_client import DriftClient, AccountSubscriptionConfig
+from driftpy.types import OraclePriceData, MarketStatus, ContractType, SpotBalanceType
+from helpers import all_user_stats
+from scenario_sweep import shock_grid, sweep_scenarios
+
+# ==================== Benchmark: all_user_stats ====================
+# Compares the per-user DriftUser path against the batched margin engine on synthetic
+# markets, oracles and users (decoded from zeroed accounts, then filled in), checks that
+# both return exactly the same frame, and reports the time per call. Then sweeps an
+# oracle-shock grid through scenario_sweep and checks it against all_user_stats per scenario.
+# Usage: python bench_user_stats.py --users 150 --repeat 5 --grid_markets 10 --grid_shocks 10
+# ===================================================================
+
+ACCOUNT_SIZES = {"PerpMarket": 1208, "SpotMarket": 768, "User": 4368}
+SPOT_DECIMALS = [6, 9, 6, 8, 6, 9]
+
+
+def offline_drift_client():
+    # Never connects: every account comes from the cache built below
+    return DriftClient(AsyncClient("http://127.0.0.1:1"), Wallet.dummy(), "mainnet",
+                       account_subscription=AccountSubscriptionConfig("cached"))
+
+
+def blank_account(drift_client, name):
+    coder = drift_client.program.coder.accounts
+    return coder.decode(coder.acc_name_to_discriminator[name] + bytes(ACCOUNT_SIZES[name]))
+
+
+def oracle(price):
+    return DataAndSlot(0, OraclePriceData(price=price, slot=0, confidence=0, twap=price, twap_confidence=0,
+                                          has_sufficient_number_of_data_points=True))
+
+
+def synthetic_cache(drift_client, rng, perp_markets):
+    oracles, spots, perps = {}, [], []
+    for i, decimals in enumerate(SPOT_DECIMALS):
+        market = blank_account(drift_client, "SpotMarket")
+        market.market_index = i
+        market.decimals = decimals
+        market.oracle = Pubkey.new_unique()
+        market.cumulative_deposit_interest = 10 ** 10 + rng.randrange(10 ** 8)
+        market.cumulative_borrow_interest = 10 ** 10 + rng.randrange(10 ** 9)
+        market.initial_asset_weight = 10000 if i == 0 else rng.choice([8000, 7500, 9000])
+        market.initial_liability_weight = 10000 if i == 0 else rng.choice([12000, 12500, 11000])
+        market.imf_factor = 0 if i == 0 else rng.choice([0, 200, 1000])
+        if i == 3:
+            market.scale_initial_asset_weight_start = 50_000 * 10 ** 6
+            market.deposit_balance = 10 ** 15
+        oracles[str(market.oracle)] = oracle(10 ** 6 if i == 0 else rng.randrange(10 ** 6, 200 * 10 ** 6))
+        spots.append(DataAndSlot(0, market))
+
+    for i in range(perp_markets):
+        market = blank_account(drift_client, "PerpMarket")
+        market.market_index = i
+        market.amm.oracle = Pubkey.new_unique()
+        market.status = MarketStatus.Settlement() if i == 5 else MarketStatus.Active()
+        market.expiry_price = rng.randrange(10 ** 6, 10 ** 8)
+        market.contract_type = ContractType.Prediction() if i == 7 else ContractType.Perpetual()
+        market.imf_factor = rng.choice([0, 100, 500])
+        market.amm.order_step_size = 10 ** 7
+        market.amm.sqrt_k = 10 ** 15
+        market.margin_ratio_initial = rng.choice([1000, 500, 2000])
+        market.amm.cumulative_funding_rate_long = rng.randrange(-10 ** 12, 10 ** 12)
+        market.amm.cumulative_funding_rate_short = rng.randrange(-10 ** 12, 10 ** 12)
+        price = rng.randrange(10 ** 4, 10 ** 6) if i == 7 else rng.randrange(10 ** 5, 10 ** 11)
+        oracles[str(market.amm.oracle)] = oracle(price)
+        perps.append(DataAndSlot(0, market))
+
+    return {"spot_markets": spots, "perp_markets": perps, "oracle_price_data": oracles, "state": None}
+
+
+def synthetic_user(drift_client, rng, perp_markets, odd=False):
+    user = blank_account(drift_client, "User")
+    user.max_margin_ratio = rng.choice([0, 0, 0, 2000])
+    for position, market_index in zip(user.perp_positions, rng.sample(range(perp_markets), 8)):
+        if rng.random() < 0.4:
+            continue
+        position.market_index = market_index
+        position.base_asset_amount = rng.randrange(-10 ** 13, 10 ** 13)
+        position.quote_asset_amount = rng.randrange(-10 ** 11, 10 ** 11)
+        position.last_cumulative_funding_rate = rng.randrange(-10 ** 12, 10 ** 12)
+        if rng.random() < 0.3:
+            position.open_orders = rng.randrange(1, 4)
+            position.open_bids = rng.randrange(0, 10 ** 12)
+            position.open_asks = -rng.randrange(0, 10 ** 12)
+    for position, market_index in zip(user.spot_positions, range(len(SPOT_DECIMALS))):
+        if rng.random() < 0.3:
+            continue
+        position.market_index = market_index
+        position.scaled_balance = rng.randrange(1, 10 ** 16)
+        position.balance_type = SpotBalanceType.Borrow() if rng.random() < 0.3 else SpotBalanceType.Deposit()
+        position.open_orders = rng.choice([0, 0, 1])
+    if odd:
+        # Exercised through the per-user fallback
+        user.perp_positions[0].lp_shares = 10 ** 9
+        user.spot_positions[1].open_bids = 10 ** 9
+    return ProgramAccount(Pubkey.new_unique(), user)
+
+
+async def time_path(users, drift_client, cache, repeat, **kwargs):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result, _ = await all_user_stats(users, drift_client, pure_cache=cache, **kwargs)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+async def run(args):
+    rng = random.Random(args.seed)
+    drift_client = offline_drift_client()
+    cache = synthetic_cache(drift_client, rng, args.perp_markets)
+    users = [synthetic_user(drift_client, rng, args.perp_markets) for _ in range(args.users)]
+
+    for label, kwargs in [("", {}), (" (oracles x0.7)", {"oracle_distort": 0.7}), (" (market 2 upnl)", {"only_one_index": 2})]:
+        loop_time, loop_frame = await time_path(users, drift_client, cache, args.repeat, batched=False, **kwargs)
+        batch_time, batch_frame = await time_path(users, drift_client, cache, args.repeat, batched=True, **kwargs)
+        pd.testing.assert_frame_equal(loop_frame, batch_frame, check_exact=True)
+        print(f"{len(users)} users{label} (best of {args.repeat}): per-user {loop_time * 1e3:8.2f} ms, "
+              f"batched {batch_time * 1e3:8.2f} ms, speedup {loop_time / batch_time:5.1f}x, identical")
+
+    # Users the batch does not model go through the per-user path, in place
+    mixed = users + [synthetic_user(drift_client, rng, args.perp_markets, odd=True) for _ in range(5)]
+    rng.shuffle(mixed)
+    _, loop_frame = await time_path(mixed, drift_client, cache, 1, batched=False)
+    _, batch_frame = await time_path(mixed, drift_client, cache, 1, batched=True)
+    pd.testing.assert_frame_equal(loop_frame, batch_frame, check_exact=True)
+    print(f"{len(mixed)} users incl. 5 LP/open-spot-order users: identical")
+
+    grid = shock_grid(range(args.grid_markets), [0.5 + i / args.grid_shocks for i in range(args.grid_shocks)])
+    start = time.perf_counter()
+    expected = [(await all_user_stats(users, drift_client, oracle_distort=distortion, pure_cache=cache,
+                                      only_one_index=market))[0] for market, distortion in grid]
+    loop_time = time.perf_counter() - start
+    start = time.perf_counter()
+    swept = sweep_scenarios(drift_client, users, grid, base_cache=cache, processes=args.processes)
+    sweep_time = time.perf_counter() - start
+    for scenario, frame in enumerate(expected):
+        got = swept.xs(scenario, level="scenario").drop(columns=["market", "distortion"])
+        pd.testing.assert_frame_equal(frame.set_axis(got.index), got, check_exact=True)
+    print(f"{len(grid)} scenarios x {len(users)} users: all_user_stats loop {loop_time:6.2f} s, "
+          f"sweep_scenarios {sweep_time:6.2f} s ({args.processes or 'all'} processes), identical")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark all_user_stats: per-user DriftUser loop vs batched engine.")
+    parser.add_argument("--users", type=int, default=150)
+    parser.add_argument("--perp_markets", type=int, default=24)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--grid_markets", type=int, default=10)
+    parser.add_argument("--grid_shocks", type=int, default=10)
+    parser.add_argument("--processes", type=int, default=None, help="Sweep worker processes (default: CPU count).")
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
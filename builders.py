@@ -0,0 +1,44 @@
+import os
+import config
+from fill_store import FillStore
+from transaction_cache import TransactionCache
+from transaction_sink import TransactionSink
+from rate_limiter import AdaptiveRateLimiter, RateLimitedClient
+from endpoint_pool import EndpointPool
+
+# ==================== Shared Builders ====================
+# The config-driven pieces every entry point (main.py, backfill.py) sets up the same way,
+# so they share one cache, transaction log, fill store and RPC limits. Importing this
+# module has no side effects (no logging setup, no argument parsing).
+# =========================================================
+
+def build_transaction_cache():
+    return TransactionCache(config.TX_CACHE_MAX_ITEMS, config.TX_CACHE_DIR, config.TX_CACHE_MAX_BYTES)
+
+
+def build_transaction_sink():
+    return TransactionSink(config.TX_LOG_DIR, config.TX_LOG_SEGMENT_BYTES, config.TX_LOG_SEGMENT_SECONDS, config.TX_LOG_COMPRESS)
+
+
+def build_fill_store():
+    return FillStore(config.FILL_STORE_PATH)
+
+
+def build_rate_limiter(args):
+    if not args.rps:
+        return None
+    return AdaptiveRateLimiter(
+        rate=args.rps,
+        initial_concurrency=min(args.workers, config.RPC_MAX_CONCURRENCY),
+        max_concurrency=config.RPC_MAX_CONCURRENCY,
+        latency_target=config.RPC_LATENCY_TARGET
+    )
+
+
+def build_endpoint_pool(args):
+    urls = [args.rpc_override, os.environ.get('HELIUS_RPC_URL')] + args.rpc_pool.split(",")
+    return EndpointPool([u.strip() for u in urls if u and u.strip()], hedge=args.hedge)
+
+
+def shared_client(pool, limiter):
+    return RateLimitedClient(pool, limiter) if limiter is not None else pool
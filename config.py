@@ -7,6 +7,88 @@ FREQUENCY_SECONDS = 600
 # Ensure you copy your subaccount Public address
 HARDCODED_ACCOUNT = "A5oadvsuiMmnRTmN2p8U4hMxU3a91GLSTCsWeGsjNZpL"
 
+# ==================== Commitment Configuration ====================
+# "confirmed" alerts ~13 s earlier and re-verifies every alert at finalized (retracting it if the
+# transaction is dropped); "finalized" only ever looks at finalized transactions
+ALERT_COMMITMENT = "confirmed"
+# How often alerted, not yet finalized transactions are re-checked, and how long until they count as dropped
+FINALITY_CHECK_SECONDS = 5
+FINALITY_TIMEOUT_SECONDS = 120
+# Signatures whose transaction is not available yet are retried (persisted here) up to this many times
+PENDING_SIGNATURES_PATH = "pending_signatures.json"
+# Same, for the multi-account watcher (its entries also remember which accounts they belong to)
+WATCHER_PENDING_SIGNATURES_PATH = "pending_signatures_watcher.json"
+PENDING_MAX_ATTEMPTS = 8
+# Skip transactions older than this many seconds without fetching them (0 keeps everything)
+SIGNATURE_MAX_AGE_SECONDS = 0
+
+# ==================== Pipeline Configuration ====================
+# Polled batches allowed to wait for inspection before the poller blocks (backpressure)
+PIPELINE_MAX_PENDING_BATCHES = 2
+
+# ==================== Signature Cursor Configuration ====================
+# File that remembers the last processed signature per account between restarts
+CURSOR_STORE_PATH = "signature_cursor.json"
+# Maximum number of signatures processed in one cycle when catching up after downtime (oldest first;
+# the rest follow in later cycles)
+CURSOR_MAX_CATCHUP = 10000
+
+# ==================== RPC Rate Limit Configuration ====================
+# Shared token bucket for every RPC call (requests per second; Helius free tier allows ~10)
+RPC_RATE_PER_SECOND = 10
+# Upper bound for the auto-tuned number of in-flight RPC calls
+RPC_MAX_CONCURRENCY = 16
+# Responses slower than this (seconds) count as a congestion signal
+RPC_LATENCY_TARGET = 2.0
+
+# ==================== Transaction Cache Configuration ====================
+# Finalized transactions are cached in memory (LRU) and on disk, keyed by signature
+TX_CACHE_MAX_ITEMS = 2048
+# Directory of the on-disk tier; set to None to keep the cache in memory only
+TX_CACHE_DIR = "tx_cache"
+TX_CACHE_MAX_BYTES = 256 * 1024 * 1024
+
+# ==================== Transaction Log Configuration ====================
+# Every fetched transaction is appended to NDJSON segments in this directory
+TX_LOG_DIR = "transaction_log"
+# A segment is closed (and gzip-compressed if enabled) once it reaches this size or age
+TX_LOG_SEGMENT_BYTES = 64 * 1024 * 1024
+TX_LOG_SEGMENT_SECONDS = 24 * 3600
+TX_LOG_COMPRESS = True
+
+# ==================== Historical Backfill Configuration ====================
+# Progress of `python backfill.py` per account, so an interrupted run resumes where it stopped
+BACKFILL_CHECKPOINT_PATH = "backfill_checkpoint.json"
+# Signature pages (1000 each) whose transactions are fetched concurrently while paging continues
+BACKFILL_PAGES_IN_FLIGHT = 4
+
+# ==================== Alert Dedup Configuration ====================
+# Every alerted (signature, log index) is remembered here, so it never alerts twice (also across restarts)
+ALERT_DEDUP_PATH = "alerted_signatures.json"
+# Exact memory of the most recent alerted matches
+ALERT_DEDUP_CAPACITY = 10000
+# Older matches can go into a Bloom filter (two generations of this many keys; 0 disables it).
+# A false positive silences a new match, at roughly ALERT_DEDUP_BLOOM_ERROR_RATE.
+ALERT_DEDUP_BLOOM_CAPACITY = 0
+ALERT_DEDUP_BLOOM_ERROR_RATE = 1e-4
+
+# ==================== Fill Store Configuration ====================
+# SQLite file (WAL mode) holding every matched log line and decoded Drift fill
+FILL_STORE_PATH = "fills.sqlite"
+
+# ==================== Market History Configuration ====================
+# `python market_recorder.py` snapshots every perp and spot market into this column store
+MARKET_HISTORY_DIR = "market_history"
+# Seconds between snapshots, and snapshots buffered (in memory and spill.ndjson) before a chunk is written
+MARKET_SNAPSHOT_SECONDS = 10
+MARKET_HISTORY_CHUNK_SNAPSHOTS = 360
+
+# ==================== Metrics Configuration ====================
+# Port for the Prometheus endpoint (http://127.0.0.1:<port>/metrics); 0 disables it
+METRICS_PORT = 0
+# NDJSON file receiving a JSON summary of every cycle; empty disables it
+METRICS_JSON_PATH = ""
+
 # Some specific signatures for testing (set some signatures where of trades in which you got filled; through Drift UI you can pick them under ""TRADES""")                                                                              # DELETE DELETE DELETE DELETE DELETE DELETE DELETE
 TEST_SIGNATURES = [                                                                                                        
     "5v5byP2bk3D2Y52c5R8MH4QwoZ4xppfRkXdZCvfF1XkW513RdG29sqUbFPpxwkF2UVy82F6FCpB5AhSNgviLs1tX",                        
@@ -16,7 +98,26 @@ TEST_SIGNATURES = [
 # Define the words or phrases to search for within log messages; Program names for getting filled are:
 LOG_SEARCH_TERMS = ["FillPerpOrder", "RevertFill"]
 
+# More rules next to LOG_SEARCH_TERMS (each term is a rule of its own), all compiled into one matcher (log_rules.py).
+# A rule is a search term or a dict with a "name" and any of "terms", "regex", "programs", "require" and "accounts", e.g.
+#   {"name": "drift-fills", "regex": [r"Instruction: Fill(Perp|Spot)Order"], "programs": ["dRiftyHA39MWEi3m9aunc5MzRF1JYuBsbn6VPcn33UH"]}
+LOG_RULES = []
+# Per-account overrides, {account: [rule, ...]}: a rule named like a global one replaces it for that account,
+# and {"name": ..., "enabled": False} turns it off there
+LOG_RULE_OVERRIDES = {}
+
 # Define Email settings
 EMAIL_SUBJECT = "New Transaction Detected"
 EMAIL_BODY = "A new transaction has been detected for the tracked account."
-RECEIVER_EMAIL = "put your email@something.com"
\ No newline at end of file
+RECEIVER_EMAIL = "put your email@something.com"
+
+# SMTP server used for alerts (point it at a local stand-in, e.g. port 1025 without SSL, for testing)
+SMTP_HOST = "smtp.gmail.com"
+SMTP_PORT = 465
+SMTP_USE_SSL = True
+
+# ==================== Notification Configuration ====================
+# Matches arriving within this many seconds of the first one are sent as a single digest email
+NOTIFY_COALESCE_SECONDS = 30
+# Set to False to disable the sound alert (e.g. on a headless server)
+NOTIFY_PLAY_SOUND = True
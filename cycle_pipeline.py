@@ -0,0 +1,280 @@
+import time
+import asyncio
+import logging
+from f1_get_signatures import fetch_new_signatures
+from f2_inspect_transactions import inspect_transactions
+from f3_search_logs import search_logs, extract_transaction_record
+from drift_events import decode_fill_events, attach_fills
+from metrics import METRICS
+from finality import prefilter_signatures
+from log_rules import as_rule_set, fired_rules
+
+# ==================== Pipelined Cycle Scheduler ====================
+# Replaces "run a whole cycle, then sleep FREQUENCY_SECONDS" with three concurrent stages
+# joined by queues:
+#   poll    -> fires on a fixed cadence (FixedRateTicker) and hands each delta of new
+#              signatures downstream as a batch, minus the ones prefilter_signatures rules
+#              out and plus the pending ones that are due again (finality.RetryQueue). It
+#              polls from an in-flight watermark, so the next poll overlaps the current
+#              inspection without fetching the same signatures twice,
+#   inspect -> fetches the batch's transactions; every transaction is searched as soon as
+#              it arrives and its matches go straight to the notify stage, so the first
+#              alert does not wait for the rest of the batch,
+#   notify  -> decodes fills, reports matches (coalescing whatever is queued into one
+#              report) and advances the persisted cursor once a batch is fully handled.
+# The batch queue is bounded (max_pending): when inspection falls behind, the poller blocks
+# on it and skips the ticks it missed instead of piling up work. If inspecting a batch
+# fails, queued batches are dropped and polling rewinds to the last inspected batch.
+# ===================================================================
+
+
+class FixedRateTicker:
+    """
+    Ticks every `period` seconds from its creation, whatever the work in between took.
+    Ticks that were missed entirely are skipped (and counted) rather than fired in a burst.
+    """
+    def __init__(self, period):
+        self.period = period
+        self.missed = 0
+        self._next = time.monotonic()
+
+    def remaining(self):
+        return max(0.0, self._next + self.period - time.monotonic())
+
+    async def wait(self):
+        self._next += self.period
+        now = time.monotonic()
+        if now > self._next:
+            behind = int((now - self._next) // self.period) + 1
+            self.missed += behind
+            self._next += behind * self.period
+            logging.warning(f"Fell {behind} tick(s) behind the {self.period}s cadence; skipping them.")
+        await asyncio.sleep(self._next - now)
+
+
+class InFlightCursor:
+    """
+    Cursor view used by the poller: signatures already handed downstream count as seen,
+    while the persisted store only advances once a batch has been fully handled.
+    """
+    def __init__(self, store):
+        self.store = store
+        self.polled = {}
+        self.inspected = {}
+
+    def get(self, account):
+        account = str(account)
+        return self.polled.get(account) or self.inspected.get(account) or self.store.get(account)
+
+    def advance(self, account, signature, slot):
+        self.polled[str(account)] = {"signature": str(signature), "slot": slot}
+
+    def settle(self, account, signature, slot):
+        self.inspected[str(account)] = {"signature": str(signature), "slot": slot}
+
+    def rewind(self):
+        self.polled.clear()
+
+
+class Batch:
+    def __init__(self, generation, signatures, fetch, cycle, retries=()):
+        self.generation = generation
+        # New signatures (they move the cursor), the entries to actually fetch and which of
+        # those are claimed RetryQueue entries
+        self.signatures = signatures
+        self.fetch = fetch
+        self.retries = list(retries)
+        self.statuses = {entry['signature']: entry.get('confirmationStatus') for entry in fetch}
+        self.cycle = cycle
+        self.queued = time.perf_counter()
+        self.matches = 0
+        self.rules_fired = {}
+
+
+class CyclePipeline:
+    def __init__(self, account, cursor_store, client, search_terms, on_matches, interval_seconds=600, workers=5,
+                 batch_size=0, cache=None, limiter=None, sink=None, max_pending=2, max_catchup=10000, metrics_json=None,
+                 commitment=None, retry_queue=None, max_age_seconds=0):
+        self.account = str(account)
+        self.cursor_store = cursor_store
+        self.client = client
+        # Search terms or rules, compiled once
+        self.search_terms = as_rule_set(search_terms)
+        self.on_matches = on_matches
+        self.interval_seconds = interval_seconds
+        self.workers = workers
+        self.batch_size = batch_size
+        self.cache = cache
+        self.limiter = limiter
+        self.sink = sink
+        self.max_pending = max(1, max_pending)
+        self.max_catchup = max_catchup
+        self.metrics_json = metrics_json or None
+        self.commitment = commitment
+        self.retry_queue = retry_queue
+        self.max_age_seconds = max_age_seconds
+        self.poll_cursor = InFlightCursor(cursor_store)
+        self.ticker = None
+        self.counters = {"polls": 0, "batches": 0, "transactions": 0, "matches": 0, "rewinds": 0}
+        self._generation = 0
+        self._batches = None
+        self._notify = None
+
+    async def run_forever(self):
+        self._batches = asyncio.Queue(maxsize=self.max_pending)
+        self._notify = asyncio.Queue()
+        self.ticker = FixedRateTicker(self.interval_seconds)
+        tasks = [asyncio.create_task(stage()) for stage in (self._poll, self._inspect, self._report)]
+        try:
+            await asyncio.gather(*tasks)
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    def stats(self):
+        return {**self.counters, "missed_ticks": self.ticker.missed if self.ticker else 0,
+                "pending_batches": self._batches.qsize() if self._batches else 0}
+
+    # ---------- poll ----------
+    async def _poll(self):
+        while True:
+            generation = self._generation
+            cycle = METRICS.new_cycle()
+            self.counters["polls"] += 1
+            with METRICS.stage("fetch_signatures", cycle):
+                new_signatures = await fetch_new_signatures(self.client, self.account, self.poll_cursor,
+                                                            max_catchup=self.max_catchup, commitment=self.commitment)
+            to_fetch, skipped = prefilter_signatures(new_signatures, self.max_age_seconds)
+            retries = self.retry_queue.due() if self.retry_queue is not None else []
+            METRICS.note("signatures", len(new_signatures), cycle)
+            METRICS.note("skipped", sum(skipped.values()), cycle)
+            METRICS.note("retries", len(retries), cycle)
+            if (new_signatures or retries) and generation == self._generation:
+                if new_signatures:
+                    newest = new_signatures[-1]
+                    self.poll_cursor.advance(self.account, newest['signature'], newest['slot'])
+                # Blocks while max_pending batches wait for inspection (backpressure)
+                await self._batches.put(Batch(generation, new_signatures, retries + to_fetch, cycle, retries))
+                METRICS.set("pipeline_pending_batches", self._batches.qsize())
+            else:
+                self._release(retries)
+                METRICS.end_cycle(self.metrics_json, cycle)
+            logging.info(f"Next poll in {self.ticker.remaining():.1f} seconds; pipeline: {self.stats()}")
+            await self.ticker.wait()
+
+    # ---------- inspect ----------
+    async def _inspect(self):
+        while True:
+            batch = await self._batches.get()
+            METRICS.set("pipeline_pending_batches", self._batches.qsize())
+            if batch.generation != self._generation:
+                self._release(batch.retries)
+                continue
+            METRICS.add_stage("queue_wait", time.perf_counter() - batch.queued, batch.cycle)
+            if not batch.fetch:
+                # Every new signature was filtered out; only the cursor moves
+                self._notify.put_nowait((batch, None, None))
+                continue
+            search_seconds = 0.0
+            found = set()
+
+            def on_transaction(transaction):
+                nonlocal search_seconds
+                if self.sink is not None:
+                    self.sink.write(transaction)
+                started = time.perf_counter()
+                record = extract_transaction_record(transaction)
+                found.add(record['signature'])
+                matches = search_logs([record], self.search_terms, account=self.account)
+                search_seconds += time.perf_counter() - started
+                if matches:
+                    for match in matches:
+                        match['confirmation_status'] = batch.statuses.get(record['signature'])
+                    self._notify.put_nowait((batch, record, matches))
+
+            try:
+                with METRICS.stage("inspect_transactions", batch.cycle):
+                    transactions = await inspect_transactions(
+                        [entry['signature'] for entry in batch.fetch], workers=self.workers, client=self.client,
+                        batch_size=self.batch_size, cache=self.cache, limiter=self.limiter, on_transaction=on_transaction,
+                        commitment=self.commitment
+                    )
+            except Exception as e:
+                logging.error(f"Inspecting a batch of {len(batch.fetch)} signatures failed: {e}; rewinding to the cursor.")
+                self._release(batch.retries)
+                self._rewind()
+                METRICS.end_cycle(self.metrics_json, batch.cycle)
+                continue
+            if self.retry_queue is not None:
+                # Signatures whose transaction is not available yet are retried in later batches
+                self.retry_queue.update(batch.fetch, found)
+            if batch.signatures:
+                newest = batch.signatures[-1]
+                self.poll_cursor.settle(self.account, newest['signature'], newest['slot'])
+            METRICS.add_stage("search_logs", search_seconds, batch.cycle)
+            METRICS.note("transactions", len(transactions), batch.cycle)
+            self.counters["transactions"] += len(transactions)
+            # Marks the end of the batch for the notify stage
+            self._notify.put_nowait((batch, None, None))
+
+    def _rewind(self):
+        self._generation += 1
+        self.counters["rewinds"] += 1
+        self.poll_cursor.rewind()
+        while not self._batches.empty():
+            # Dropped batches give their retry claims back, so those signatures do not stall
+            self._release(self._batches.get_nowait().retries)
+
+    def _release(self, retries):
+        if self.retry_queue is not None and retries:
+            self.retry_queue.release(retries)
+
+    # ---------- notify ----------
+    async def _report(self):
+        while True:
+            items = [await self._notify.get()]
+            # Whatever else is already queued goes out in the same report
+            while not self._notify.empty() and items[-1][1] is not None:
+                items.append(self._notify.get_nowait())
+
+            found = [(batch, record, matches) for batch, record, matches in items if record is not None]
+            if found:
+                try:
+                    self._deliver(found)
+                except Exception as e:
+                    logging.error(f"Reporting the matches of {len(found)} transactions failed: {e}")
+
+            batch, record, _ = items[-1]
+            if record is None:
+                self._finish(batch)
+
+    def _deliver(self, found):
+        cycle = found[0][0].cycle
+        with METRICS.stage("decode_fills", cycle):
+            fills = decode_fill_events([record for _, record, _ in found], accounts=[self.account])
+            matching_logs = [match for _, _, matches in found for match in matches]
+            attach_fills(matching_logs, fills)
+            for match in matching_logs:
+                match['account'] = self.account
+        for batch, _, matches in found:
+            batch.matches += len(matches)
+            for rule, count in fired_rules(matches).items():
+                batch.rules_fired[rule] = batch.rules_fired.get(rule, 0) + count
+        self.counters["matches"] += len(matching_logs)
+        with METRICS.stage("notify", cycle):
+            self.on_matches(matching_logs)
+
+    def _finish(self, batch):
+        # Batches finish in order, so the persisted cursor only moves past fully handled signatures
+        if batch.signatures:
+            newest = batch.signatures[-1]
+            try:
+                self.cursor_store.advance(self.account, newest['signature'], newest['slot'])
+            except OSError as e:
+                logging.error(f"Could not persist the cursor for {self.account}: {e}")
+        self.counters["batches"] += 1
+        METRICS.note("matches", batch.matches, batch.cycle)
+        METRICS.note("rules_fired", batch.rules_fired, batch.cycle)
+        summary = METRICS.end_cycle(self.metrics_json, batch.cycle)
+        logging.info(f"Batch metrics: {summary}")
@@ -0,0 +1,279 @@
+import os
+import base64
+import binascii
+import logging
+import functools
+import importlib.util
+from dataclasses import dataclass, asdict
+from typing import Optional
+
+# ==================== Drift Event Decoder ====================
+# Turns the Drift program's `Program data:` log lines into typed records.
+# The IDL shipped with driftpy is loaded and compiled into an anchorpy EventCoder once
+# per process. Only lines emitted while the Drift program is the executing program
+# (not a CPI callee) are decoded, and only OrderActionRecord fills are fully parsed;
+# every other event is skipped on its 8-byte discriminator.
+# RevertFill has no event of its own, so its records come from the instruction log line.
+# =============================================================
+
+DRIFT_PROGRAM_ID = "dRiftyHA39MWEi3m9aunc5MzRF1JYuBsbn6VPcn33UH"
+PROGRAM_DATA = "Program data: "
+REVERT_FILL_LOG = "Program log: Instruction: RevertFill"
+
+BASE_PRECISION = 10 ** 9
+QUOTE_PRECISION = 10 ** 6
+PRICE_PRECISION = 10 ** 6
+
+
+@dataclass
+class FillRecord:
+    kind: str  # "fill" or "revert"
+    signature: Optional[str]
+    slot: Optional[int]
+    block_time: Optional[int]
+    log_index: int
+    market_type: Optional[str] = None  # "perp" or "spot"
+    market_index: Optional[int] = None
+    explanation: Optional[str] = None
+    ts: Optional[int] = None
+    fill_record_id: Optional[int] = None
+    base_asset_amount: Optional[int] = None  # raw, BASE_PRECISION for perps, token decimals for spot
+    quote_asset_amount: Optional[int] = None  # raw, QUOTE_PRECISION
+    oracle_price: Optional[int] = None  # raw, PRICE_PRECISION
+    taker: Optional[str] = None
+    taker_order_id: Optional[int] = None
+    taker_direction: Optional[str] = None
+    taker_fee: Optional[int] = None
+    maker: Optional[str] = None
+    maker_order_id: Optional[int] = None
+    maker_direction: Optional[str] = None
+    maker_fee: Optional[int] = None
+    filler: Optional[str] = None
+    role: Optional[str] = None  # "taker", "maker" or "filler" when one of our accounts is involved
+
+    @property
+    def is_ours(self):
+        return self.role is not None
+
+    @property
+    def base_amount(self):
+        if self.base_asset_amount is None or self.market_type != "perp":
+            return None
+        return self.base_asset_amount / BASE_PRECISION
+
+    @property
+    def quote_amount(self):
+        return None if self.quote_asset_amount is None else self.quote_asset_amount / QUOTE_PRECISION
+
+    @property
+    def price(self):
+        """
+        Average fill price in quote per base unit (perp markets only).
+        """
+        if not self.base_asset_amount or self.market_type != "perp":
+            return None
+        return self.quote_amount / self.base_amount
+
+    def describe(self):
+        if self.kind == "revert":
+            return f"RevertFill (log #{self.log_index})"
+        side = f"{self.taker_direction or '?'} taker {short(self.taker)} vs maker {short(self.maker)}"
+        if self.price is not None:
+            size = f"{self.base_amount:g} @ {self.price:,.4f} (${self.quote_amount:,.2f})"
+        else:
+            size = f"{self.base_asset_amount} base for ${self.quote_amount or 0:,.2f}"
+        ours = f" [ours: {self.role}]" if self.is_ours else ""
+        return f"Fill {self.market_type}-{self.market_index} {size}, {side}{ours}"
+
+    def to_dict(self):
+        return {**asdict(self), "price": self.price, "base_amount": self.base_amount,
+                "quote_amount": self.quote_amount, "is_ours": self.is_ours}
+
+
+def short(pubkey):
+    return f"{pubkey[:6]}..{pubkey[-4:]}" if pubkey else "-"
+
+
+# ---------- IDL / coder (loaded once) ----------
+def drift_idl_path():
+    # Locate driftpy's IDL without importing driftpy itself
+    spec = importlib.util.find_spec("driftpy")
+    if spec is None or not spec.submodule_search_locations:
+        raise ImportError("driftpy is required to decode Drift events.")
+    return os.path.join(list(spec.submodule_search_locations)[0], "idl", "drift.json")
+
+
+@functools.lru_cache(maxsize=None)
+def load_event_coder():
+    """
+    Parses the Drift IDL and builds the anchorpy EventCoder. Cached for the process lifetime.
+    """
+    from anchorpy import Idl
+    from anchorpy.coder.event import EventCoder
+
+    with open(drift_idl_path(), "r") as f:
+        idl = Idl.from_json(f.read())
+    coder = EventCoder(idl)
+    logging.info(f"Loaded Drift IDL with {len(coder.layouts)} event layouts.")
+    return coder
+
+
+@functools.lru_cache(maxsize=None)
+def _order_action_layout():
+    coder = load_event_coder()
+    discriminator = next(d for d, name in coder.discriminators.items() if name == "OrderActionRecord")
+    actions = next(t for t in coder.idl.types if t.name == "OrderAction").ty.variants
+    return discriminator, coder.layouts["OrderActionRecord"], [v.name for v in actions]
+
+
+def _variant(value):
+    # anchorpy enums decode to one class per variant (OrderAction.Fill(), MarketType.Perp(), ...)
+    return None if value is None else type(value).__name__
+
+
+def _pubkey(value):
+    return None if value is None else str(value)
+
+
+# ---------- log walking ----------
+def drift_program_data(log_messages, program_id=DRIFT_PROGRAM_ID):
+    """
+    Yields (log_index, line) for every log line emitted while `program_id` is executing.
+    """
+    stack = []
+    for i, log in enumerate(log_messages):
+        if log.startswith("Log truncated"):
+            break
+        if log.startswith("Program ") and not log.startswith(("Program log:", "Program data:", "Program return:")):
+            parts = log.split(" ", 3)
+            status = parts[2] if len(parts) >= 3 else ""
+            if status == "invoke":
+                stack.append(parts[1])
+                continue
+            if status == "success" or status.startswith("failed"):
+                if stack:
+                    stack.pop()
+                continue
+        if stack and stack[-1] == program_id:
+            yield i, log
+
+
+def decode_transaction_fills(record, accounts=(), actions=("Fill",)):
+    """
+    Decodes the fills (OrderActionRecord with an action in `actions`) and RevertFill
+    instructions of one transaction record from f3_search_logs.extract_transaction_record.
+    Decoding only enriches alerts: if it cannot run at all (driftpy missing, IDL mismatch),
+    the error is logged and no fills are returned; a log line that fails is skipped alone.
+    """
+    if record.get("err") is not None or not record.get("log_messages"):
+        return []
+    coder = _load_layout()
+    if coder is None:
+        return []
+    return _decode_transaction_fills(record, accounts, actions, coder)
+
+
+def _load_layout():
+    try:
+        return _order_action_layout()
+    except Exception as e:
+        logging.error(f"Could not load the Drift event layout; fills are not decoded: {e}")
+        return None
+
+
+def _decode_transaction_fills(record, accounts, actions, coder):
+    if record.get("err") is not None or not record.get("log_messages"):
+        return []
+    accounts = accounts if isinstance(accounts, (set, frozenset)) else set(accounts)
+
+    fills = []
+    for log_index, log in drift_program_data(record["log_messages"]):
+        try:
+            fill = _decode_log(record, log_index, log, accounts, actions, coder)
+        except Exception as e:
+            # A malformed line (another program's data, a truncated log) costs only itself
+            logging.warning(f"Could not decode log line {log_index} of {record.get('signature')}: {e}")
+            continue
+        if fill is not None:
+            fills.append(fill)
+    return fills
+
+
+def _decode_log(record, log_index, log, accounts, actions, coder):
+    discriminator, layout, action_names = coder
+    if log.startswith(REVERT_FILL_LOG):
+        return FillRecord("revert", record.get("signature"), record.get("slot"), record.get("block_time"), log_index)
+    if not log.startswith(PROGRAM_DATA):
+        return None
+    try:
+        data = base64.b64decode(log[len(PROGRAM_DATA):])
+    except binascii.Error:
+        return None
+    # Cheap pre-checks before the full parse: event type, then the action byte (after the i64 ts)
+    if data[:8] != discriminator or len(data) < 17:
+        return None
+    if data[16] >= len(action_names) or action_names[data[16]] not in actions:
+        return None
+    event = layout.parse(data[8:])
+    if _variant(event.action) not in actions:
+        return None
+
+    fill = FillRecord(
+        kind="fill",
+        signature=record.get("signature"),
+        slot=record.get("slot"),
+        block_time=record.get("block_time"),
+        log_index=log_index,
+        market_type=_variant(event.market_type).lower(),
+        market_index=event.market_index,
+        explanation=_variant(event.action_explanation),
+        ts=event.ts,
+        fill_record_id=event.fill_record_id,
+        base_asset_amount=event.base_asset_amount_filled,
+        quote_asset_amount=event.quote_asset_amount_filled,
+        oracle_price=event.oracle_price,
+        taker=_pubkey(event.taker),
+        taker_order_id=event.taker_order_id,
+        taker_direction=_variant(event.taker_order_direction),
+        taker_fee=event.taker_fee,
+        maker=_pubkey(event.maker),
+        maker_order_id=event.maker_order_id,
+        maker_direction=_variant(event.maker_order_direction),
+        maker_fee=event.maker_fee,
+        filler=_pubkey(event.filler),
+    )
+    for role in ("taker", "maker", "filler"):
+        if getattr(fill, role) in accounts:
+            fill.role = role
+            break
+    return fill
+
+
+def decode_fill_events(records, accounts=(), actions=("Fill",)):
+    """
+    Batch decode: every fill and revert across `records` (transaction records, in order).
+    Returns [] (and logs) if the layout cannot be loaded, so it never blocks the alerts.
+    """
+    records = [record for record in records if record.get("err") is None and record.get("log_messages")]
+    if not records:
+        return []
+    coder = _load_layout()
+    if coder is None:
+        return []
+    accounts = set(accounts)
+    fills = []
+    for record in records:
+        fills.extend(_decode_transaction_fills(record, accounts, actions, coder))
+    return fills
+
+
+def attach_fills(matches, fills):
+    """
+    Adds a 'fills' list (the decoded records of the same transaction) to every match.
+    """
+    by_signature = {}
+    for fill in fills:
+        by_signature.setdefault(fill.signature, []).append(fill)
+    for match in matches:
+        match['fills'] = by_signature.get(match.get('signature'), [])
+    return matches
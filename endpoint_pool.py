@@ -0,0 +1,162 @@
+import time
+import random
+import asyncio
+import logging
+from collections import deque
+from solana.rpc.async_api import AsyncClient
+from metrics import METRICS
+
+# ==================== RPC Endpoint Pool ====================
+# One pool of RPC endpoints shared by signature polling and transaction inspection.
+# Each endpoint keeps EWMA latency and error scores; every call goes to the best
+# scoring endpoint and fails over to the next one. Optionally, if the chosen
+# endpoint has not answered after its recent p95 latency, a hedged duplicate is
+# sent to the runner-up and whichever answers first wins.
+# The pool quacks like an AsyncClient for the RPC methods it forwards.
+# ===========================================================
+
+class Endpoint:
+    def __init__(self, url, timeout, alpha):
+        self.url = url
+        self.client = AsyncClient(url, timeout=timeout)
+        self.alpha = alpha
+        self.latency_ewma = None
+        self.error_ewma = 0.0
+        self.samples = deque(maxlen=200)
+        self.counters = {"requests": 0, "errors": 0, "hedges": 0, "hedge_wins": 0}
+
+    def record(self, latency=None, error=False):
+        self.counters["requests"] += 1
+        self.error_ewma = (1 - self.alpha) * self.error_ewma + self.alpha * (1.0 if error else 0.0)
+        if error:
+            self.counters["errors"] += 1
+        elif latency is not None:
+            self.samples.append(latency)
+            self.latency_ewma = latency if self.latency_ewma is None else (1 - self.alpha) * self.latency_ewma + self.alpha * latency
+
+    def score(self):
+        """
+        Lower is better. Untried endpoints score 0 so they get sampled first.
+        """
+        if self.latency_ewma is None:
+            return 0.0
+        return self.latency_ewma * (1 + 20 * self.error_ewma)
+
+    def p95(self, default):
+        if len(self.samples) < 20:
+            return default
+        ordered = sorted(self.samples)
+        return ordered[int(0.95 * (len(ordered) - 1))]
+
+    def stats(self):
+        return {
+            **self.counters,
+            "latency_ewma": round(self.latency_ewma, 4) if self.latency_ewma is not None else None,
+            "error_ewma": round(self.error_ewma, 4),
+            "p95": round(self.p95(0.0), 4),
+        }
+
+
+class EndpointPool:
+    def __init__(self, urls, timeout=30, alpha=0.2, hedge=False, hedge_default_delay=0.5,
+                 hedge_min_delay=0.02, explore=0.05):
+        urls = list(dict.fromkeys(u for u in urls if u))
+        if not urls:
+            raise ValueError("EndpointPool needs at least one RPC URL.")
+        self.endpoints = [Endpoint(u, timeout, alpha) for u in urls]
+        self.hedge = hedge and len(self.endpoints) > 1
+        self.hedge_default_delay = hedge_default_delay
+        self.hedge_min_delay = hedge_min_delay
+        self.explore = explore
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    async def close(self):
+        for endpoint in self.endpoints:
+            await endpoint.client.close()
+
+    @property
+    def commitment(self):
+        return self.endpoints[0].client.commitment
+
+    def ranked(self):
+        ranked = sorted(self.endpoints, key=lambda e: e.score())
+        # Occasionally promote another endpoint so a recovered one gets re-scored
+        if len(ranked) > 1 and random.random() < self.explore:
+            i = random.randrange(1, len(ranked))
+            ranked[0], ranked[i] = ranked[i], ranked[0]
+        return ranked
+
+    def best_url(self):
+        return min(self.endpoints, key=lambda e: e.score()).url
+
+    async def _attempt(self, endpoint, method, args, kwargs):
+        started = time.monotonic()
+        try:
+            result = await getattr(endpoint.client, method)(*args, **kwargs)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            endpoint.record(error=True)
+            METRICS.rpc(method, endpoint.url, time.monotonic() - started, e)
+            raise
+        endpoint.record(time.monotonic() - started)
+        METRICS.rpc(method, endpoint.url, time.monotonic() - started)
+        return result
+
+    async def _hedged(self, primary, secondary, method, args, kwargs):
+        delay = max(self.hedge_min_delay, primary.p95(self.hedge_default_delay))
+        first = asyncio.create_task(self._attempt(primary, method, args, kwargs))
+        done, _ = await asyncio.wait({first}, timeout=delay)
+        if done:
+            return first.result()
+
+        primary.counters["hedges"] += 1
+        second = asyncio.create_task(self._attempt(secondary, method, args, kwargs))
+        pending = {first, second}
+        error = None
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is second:
+                            secondary.counters["hedge_wins"] += 1
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def call(self, method, *args, **kwargs):
+        ranked = self.ranked()
+        primary = ranked[0]
+        try:
+            if self.hedge:
+                return await self._hedged(primary, ranked[1], method, args, kwargs)
+            return await self._attempt(primary, method, args, kwargs)
+        except Exception as e:
+            if len(ranked) < 2:
+                raise
+            # Fail over to the next endpoint once
+            fallback = ranked[2] if self.hedge and len(ranked) > 2 else ranked[1]
+            logging.warning(f"{method} failed on {primary.url} ({e}); failing over to {fallback.url}")
+            return await self._attempt(fallback, method, args, kwargs)
+
+    def __getattr__(self, name):
+        # Forward AsyncClient RPC methods (get_transaction, get_signatures_for_address, ...) through call()
+        if name.startswith("_") or not asyncio.iscoroutinefunction(getattr(AsyncClient, name, None)):
+            raise AttributeError(name)
+
+        async def routed(*args, **kwargs):
+            return await self.call(name, *args, **kwargs)
+        routed.__name__ = name
+        return routed
+
+    def stats(self):
+        return {e.url: e.stats() for e in self.endpoints}
@@ -4,6 +4,8 @@ from solders.pubkey import Pubkey
 from solana.rpc.async_api import AsyncClient
 from solders.signature import Signature
 from transaction_fetch import transaction_history_for_account
+from rate_limiter import RateLimitedClient
+from metrics import MeteredClient
 
 
 
@@ -11,7 +13,7 @@ from transaction_fetch import transaction_history_for_account
 # Get the latest 10 signatures or the given HARDCODED account
 # ====================================================================
 
-async def fetch_last_10_signatures(args):
+async def fetch_last_10_signatures(args, limiter=None):
     try:
         account_pubkey = Pubkey.from_string(HARDCODED_ACCOUNT)
     except ValueError:
@@ -26,6 +28,9 @@ async def fetch_last_10_signatures(args):
     logging.info("Fetching transaction history...")
 
     async with AsyncClient(args.rpc_override) as connection:
+        connection = MeteredClient(connection, args.rpc_override)
+        if limiter is not None:
+            connection = RateLimitedClient(connection, limiter)
         try:
             signatures_data = await transaction_history_for_account(
                 connection,
@@ -53,4 +58,78 @@ async def fetch_last_10_signatures(args):
                 else:
                     logging.warning(f"{idx}. Signature field not found in the transaction data.")
 
-            return signatures_list
\ No newline at end of file
+            return signatures_list
+
+
+# ==================== Function 1b: Get New Signatures ====================
+# Get every signature newer than the stored cursor for the given account
+# =========================================================================
+
+async def fetch_new_signatures(connection, account, cursor_store, page_limit=1000, bootstrap_limit=10, max_catchup=10000,
+                               commitment=None):
+    """
+    Pages back from the newest signature until the account's cursor is reached and returns
+    only the unseen signatures, oldest first, as the raw getSignaturesForAddress entries.
+    After downtime, at most the `max_catchup` OLDEST unseen signatures are returned, so the
+    cursor moves through the gap over several cycles instead of jumping over it.
+    Accounts without a cursor start from their latest `bootstrap_limit` signatures.
+    With commitment="confirmed", signatures show up before they are finalized.
+    The cursor is NOT advanced here; call `cursor_store.advance` once the delta is processed.
+    """
+    try:
+        account_pubkey = Pubkey.from_string(str(account))
+    except ValueError:
+        logging.error(f"Invalid account public key: {account}")
+        return []
+
+    cursor = cursor_store.get(account)
+    if cursor:
+        until_sig = Signature.from_string(cursor["signature"])
+        limit, max_limit = page_limit, max_catchup
+        logging.info(f"Fetching signatures for {account} newer than {cursor['signature'][:15]} (slot {cursor['slot']})")
+    else:
+        until_sig = None
+        limit, max_limit = bootstrap_limit, bootstrap_limit
+        logging.info(f"No cursor for {account}; bootstrapping from the last {bootstrap_limit} signatures.")
+
+    try:
+        signatures_data = await transaction_history_for_account(
+            connection,
+            account_pubkey,
+            None,
+            limit,
+            MAX_LIMIT=max_limit,
+            until_sig=until_sig,
+            commitment=commitment
+        )
+    except Exception as e:
+        logging.error(f"Error fetching transaction history for {account}: {e}")
+        return []
+
+    if cursor and len(signatures_data) >= max_catchup:
+        # Keep paging (signatures only) from the oldest fetched one down to the cursor, then
+        # hand back the oldest max_catchup; the newer ones follow in the next cycles
+        try:
+            while signatures_data:
+                older = await transaction_history_for_account(
+                    connection,
+                    account_pubkey,
+                    signatures_data[-1]['signature'],
+                    limit,
+                    MAX_LIMIT=max_catchup,
+                    until_sig=until_sig,
+                    commitment=commitment
+                )
+                signatures_data.extend(older)
+                if len(older) < max_catchup:
+                    break
+        except Exception as e:
+            logging.error(f"Error paging the catch-up gap for {account}: {e}")
+            return []
+        logging.warning(f"Catch-up for {account} found {len(signatures_data)} signatures after the cursor; "
+                        f"processing the oldest {max_catchup} now and the rest in later cycles.")
+        signatures_data = signatures_data[-max_catchup:]
+
+    logging.info(f"{len(signatures_data)} new signatures for {account}.")
+    # getSignaturesForAddress returns newest first; process in chronological order
+    return list(reversed(signatures_data))
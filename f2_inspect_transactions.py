@@ -3,66 +3,166 @@ import asyncio
 import logging
 from solana.rpc.async_api import AsyncClient
 from solana.rpc.types import TxOpts
+from solana.rpc.commitment import Finalized, Confirmed
+from solders.commitment_config import CommitmentLevel
 from solana.transaction import Signature
+from rpc_batch import BatchTransactionFetcher
+from rate_limiter import RateLimitedClient
+from metrics import METRICS, MeteredClient, error_outcome
 
 # ==================== Function 2: Collect Signatures Data ===============
 # ========================================================================
 
-async def inspect_transactions(signatures, workers=5):
+async def finalized_slot(client, rpc_url):
+    """
+    The cluster's latest finalized slot, or None if it cannot be read.
+    """
+    try:
+        if client is not None:
+            return (await client.get_slot(commitment=Finalized)).value
+        async with AsyncClient(rpc_url) as own_client:
+            return (await own_client.get_slot(commitment=Finalized)).value
+    except Exception as e:
+        logging.warning(f"Could not read the finalized slot: {e}")
+        return None
+
+
+async def inspect_transactions(signatures, workers=5, client=None, batch_size=0, cache=None, limiter=None,
+                               on_transaction=None, commitment=None):
     """
     Fetch and collect transaction details for each signature using a queue with multiple workers.
     Retries up to 3 times for each transaction in case of an error.
+    If `client` is given, all workers share that AsyncClient (and its connection pool)
+    instead of opening one each.
+    If `batch_size` is set, signatures are instead fetched `batch_size` at a time in
+    JSON-RPC batch requests over one keep-alive connection.
+    If `cache` (a TransactionCache) is given, cached transactions are not fetched again
+    and newly fetched finalized ones are stored.
+    If `limiter` (an AdaptiveRateLimiter) is given, every call goes through it: it owns
+    retries/backoff and tunes concurrency, so up to limiter.max_concurrency workers are started.
+    `on_transaction` is called with every transaction as soon as it is available (e.g. a TransactionSink.write).
+    `commitment` ("confirmed" or "finalized") defaults to the client's. Only finalized transactions are
+    cached: at "confirmed", the ones at or below the cluster's finalized slot (read once per call).
     """
     # Your custom RPC endpoint for fetching transaction details
     rpc_url = os.environ.get('HELIUS_RPC_URL')
     transaction_details_list = []
 
+    def collect(transaction_details):
+        transaction_details_list.append(transaction_details)
+        if on_transaction is not None:
+            try:
+                on_transaction(transaction_details)
+            except Exception as e:
+                logging.error(f"on_transaction callback failed: {e}")
+
+    if cache is not None:
+        misses = []
+        for sig in signatures:
+            cached = cache.get(sig)
+            if cached is not None:
+                collect(cached)
+            else:
+                misses.append(sig)
+        logging.info(f"{len(signatures) - len(misses)} of {len(signatures)} transactions served from cache.")
+        signatures = misses
+        if not signatures:
+            return transaction_details_list
+
+    # Decided per transaction: anything at or below the finalized slot is final whatever it was fetched at
+    root = None
+    if cache is not None and (commitment or getattr(client, 'commitment', None)) != Finalized:
+        root = await finalized_slot(client, rpc_url)
+
+    def is_final(transaction_details, fetched_finalized):
+        return fetched_finalized or (root is not None and transaction_details.slot <= root)
+
+    if batch_size:
+        # Send batches to the pool's best endpoint when inspecting through an EndpointPool
+        if client is not None and hasattr(client, 'best_url'):
+            rpc_url = client.best_url()
+        logging.info(f"Starting batched transaction inspection ({batch_size} per request)...")
+        level = CommitmentLevel.Confirmed if commitment == Confirmed else CommitmentLevel.Finalized
+        async with BatchTransactionFetcher(rpc_url, batch_size=batch_size, commitment=level, limiter=limiter) as fetcher:
+            for sig_str, transaction_details in await fetcher.fetch(signatures):
+                if transaction_details:
+                    collect(transaction_details)
+                    if cache is not None:
+                        cache.put(sig_str, transaction_details, finalized=is_final(transaction_details, fetcher.finalized))
+                else:
+                    logging.warning(f"Transaction {sig_str[:15]} not found or not finalized.")
+        logging.info("Completed inspecting transactions.")
+        return transaction_details_list
+
     logging.info("Starting transaction inspection with multiple workers...")
 
+    # With a limiter, retries and concurrency are handled by the limiter
+    max_attempts = 1 if limiter is not None else 3
+    if limiter is not None:
+        workers = max(workers, limiter.max_concurrency)
+        if client is not None and not isinstance(client, RateLimitedClient):
+            client = RateLimitedClient(client, limiter)
+
     # Initialize the queue and enqueue all signatures
     queue = asyncio.Queue()
     for sig in signatures:
         await queue.put(sig)
+    METRICS.queue_depth(queue.qsize())
 
     async def worker(worker_id):
-        async with AsyncClient(rpc_url) as client:
-            while not queue.empty():
-                sig_str = await queue.get()
-                try:
-                    # Convert the transaction signature string to a Signature object
-                    transaction_signature = Signature.from_string(sig_str)
-                except ValueError:
-                    logging.error(f"[Worker {worker_id}] Invalid signature format: {sig_str}")
-                    queue.task_done()
-                    continue
-
-                attempt = 0
-                success = False
-                while attempt < 3 and not success:
-                    attempt += 1
-                    try:
-                        response = await client.get_transaction(
-                            transaction_signature,
-                            encoding="json",
-                            max_supported_transaction_version=0  # Specify the supported transaction version
-                        )
-
-                        transaction_details = response.value
-
-                        if transaction_details:
-                            logging.info(f"[Worker {worker_id}] Transaction {sig_str[:15]} details fetched successfully.")
-                            transaction_details_list.append(transaction_details)
-                        else:
-                            logging.warning(f"[Worker {worker_id}] Transaction {sig_str[:15]} not found or not finalized.")
-                        success = True  # Mark as success to exit the retry loop
-                    except Exception as e:
-                        logging.error(f"[Worker {worker_id}] Error fetching transaction {sig_str}, attempt {attempt}: {e}")
-                        if attempt < 3:
-                            logging.info(f"[Worker {worker_id}] Retrying transaction {sig_str} (attempt {attempt + 1})")
-                            await asyncio.sleep(1)  # Optional: Wait a bit before retrying
-                        else:
-                            logging.error(f"[Worker {worker_id}] Failed to fetch transaction {sig_str} after 3 attempts.")
+        if client is not None:
+            await drain_queue(worker_id, client)
+        else:
+            async with AsyncClient(rpc_url) as own_client:
+                own_client = MeteredClient(own_client, rpc_url)
+                if limiter is not None:
+                    own_client = RateLimitedClient(own_client, limiter)
+                await drain_queue(worker_id, own_client)
+
+    async def drain_queue(worker_id, client):
+        while not queue.empty():
+            sig_str = await queue.get()
+            METRICS.queue_depth(queue.qsize())
+            try:
+                # Convert the transaction signature string to a Signature object
+                transaction_signature = Signature.from_string(sig_str)
+            except ValueError:
+                logging.error(f"[Worker {worker_id}] Invalid signature format: {sig_str}")
                 queue.task_done()
+                continue
+
+            attempt = 0
+            success = False
+            while attempt < max_attempts and not success:
+                attempt += 1
+                try:
+                    response = await client.get_transaction(
+                        transaction_signature,
+                        encoding="json",
+                        commitment=commitment,
+                        max_supported_transaction_version=0  # Specify the supported transaction version
+                    )
+
+                    transaction_details = response.value
+
+                    if transaction_details:
+                        logging.info(f"[Worker {worker_id}] Transaction {sig_str[:15]} details fetched successfully.")
+                        collect(transaction_details)
+                        if cache is not None:
+                            cache.put(sig_str, transaction_details,
+                                      finalized=is_final(transaction_details, (commitment or client.commitment) == Finalized))
+                    else:
+                        logging.warning(f"[Worker {worker_id}] Transaction {sig_str[:15]} not found or not finalized.")
+                    success = True  # Mark as success to exit the retry loop
+                except Exception as e:
+                    logging.error(f"[Worker {worker_id}] Error fetching transaction {sig_str}, attempt {attempt}: {e}")
+                    if attempt < max_attempts:
+                        METRICS.inc("rpc_retries_total", {"reason": error_outcome(e)})
+                        logging.info(f"[Worker {worker_id}] Retrying transaction {sig_str} (attempt {attempt + 1})")
+                        await asyncio.sleep(1)  # Optional: Wait a bit before retrying
+                    else:
+                        logging.error(f"[Worker {worker_id}] Failed to fetch transaction {sig_str} after {max_attempts} attempts.")
+            queue.task_done()
 
     # Start multiple worker tasks
     worker_tasks = []
@@ -1,5 +1,6 @@
 import json
 import re
+from log_rules import as_rule_set, literal_pattern
 
 # ==================== Function 3: Search Particular Words  ==========================
 # ====================================================================================
@@ -9,21 +10,23 @@ def search_keywords_in_transaction(transaction, keywords):
     Recursively search for any of the keywords in the transaction JSON data.
     Returns True if any keyword is found in any key or value, else False.
     """
+    # All keywords are compiled into one pattern, so every string is scanned once
+    pattern = keywords if isinstance(keywords, re.Pattern) else literal_pattern(tuple(keywords))
     if isinstance(transaction, dict):
         for key, value in transaction.items():
             # Check if the key contains any keyword
-            if any(keyword in key for keyword in keywords):
+            if isinstance(key, str) and pattern.search(key):
                 return True
             # Recursively check the value
-            if search_keywords_in_transaction(value, keywords):
+            if search_keywords_in_transaction(value, pattern):
                 return True
     elif isinstance(transaction, list):
         for item in transaction:
-            if search_keywords_in_transaction(item, keywords):
+            if search_keywords_in_transaction(item, pattern):
                 return True
     elif isinstance(transaction, str):
         # Check if any keyword is present in the string
-        if any(keyword in transaction for keyword in keywords):
+        if pattern.search(transaction):
             return True
     # For other data types (int, float, etc.), no action is needed
     return False
@@ -59,32 +62,57 @@ def extract_signature(txn_str):
     match = re.search(pattern, txn_str)
     return match.group(1) if match else None
 
-def search_logs(transactions, terms):
+def extract_transaction_record(tx):
     """
-    Searches for specified terms within the log messages of each transaction.
+    Reads slot, block time, signature and log messages straight off a typed
+    transaction (the `.value` of a GetTransactionResp), without serializing it.
     """
-    results = []
-    for txn_str in transactions:
-        # Extract log messages
-        log_messages = extract_log_messages(txn_str)
-        if not log_messages:
-            continue
+    meta = tx.transaction.meta
+    log_messages = meta.log_messages if meta is not None and meta.log_messages else []
+    signatures = getattr(tx.transaction.transaction, 'signatures', None)
+    return {
+        "slot": tx.slot,
+        "signature": str(signatures[0]) if signatures else None,
+        "block_time": tx.block_time,
+        "err": meta.err if meta is not None else None,
+        "log_messages": list(log_messages),
+    }
 
-        # Extract other relevant fields
-        slot = extract_field(txn_str, 'slot')
-        signature = extract_signature(txn_str)
-        block_time = extract_field(txn_str, 'block_time')
+def extract_transaction_records(transactions):
+    """
+    Batch version of extract_transaction_record; skips missing (None) transactions.
+    """
+    return [extract_transaction_record(tx) for tx in transactions if tx is not None]
+
+def _as_record(txn):
+    """
+    Accepts a record, a typed transaction, or a legacy json.dumps string.
+    """
+    if isinstance(txn, dict):
+        return txn
+    if isinstance(txn, str):
+        return {
+            "slot": extract_field(txn, 'slot'),
+            "signature": extract_signature(txn),
+            "block_time": extract_field(txn, 'block_time'),
+            "log_messages": extract_log_messages(txn),
+        }
+    return extract_transaction_record(txn)
 
-        # Search for terms within log messages
-        for log in log_messages:
-            for term in terms:
-                if term in log:
-                    result = {
-                        "slot": slot,
-                        "signature": signature,
-                        "block_time": block_time,
-                        "found_term": term,
-                        "log": log
-                    }
-                    results.append(result)
-    return results
+def match_log_lines(log_messages, terms, slot=None, signature=None, block_time=None, account=None):
+    """
+    Matching stage shared by the polling and streaming paths: returns one result per
+    (log line, fired rule) hit, tagged with the transaction's slot, signature, block time,
+    the index of the log line and the rule. `terms` is a list of search terms or rules,
+    or a compiled log_rules.RuleSet.
+    """
+    record = {"slot": slot, "signature": signature, "block_time": block_time, "log_messages": log_messages}
+    return as_rule_set(terms).evaluate([record], account)
+
+def search_logs(transactions, terms, account=None):
+    """
+    Searches for specified terms (or rules) within the log messages of each transaction,
+    evaluating the whole batch in one pass. Transactions are records from
+    extract_transaction_records (preferred), typed transactions, or the legacy json.dumps strings.
+    """
+    return as_rule_set(terms).evaluate([_as_record(txn) for txn in transactions], account)
@@ -1,10 +1,12 @@
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 import ssl
+import socket
 import smtplib
 import os 
 import logging
-from config import EMAIL_BODY, EMAIL_SUBJECT, RECEIVER_EMAIL
+import threading
+from config import EMAIL_BODY, EMAIL_SUBJECT, RECEIVER_EMAIL, SMTP_HOST, SMTP_PORT, SMTP_USE_SSL
 
 # ==================== Function 4: Send email ====================
 # ================================================================
@@ -38,3 +40,134 @@ def send_email_notification():
         logging.info("Email sent successfully.")
     except Exception as e:
         logging.error(f"Error sending email: {e}")
+
+
+# ==================== Function 4b: Digest emails over a persistent connection ====================
+# =================================================================================================
+
+def build_digest_body(matches, window_seconds=None):
+    """
+    Plain-text email body listing every match (account, signature, slot, term and log line).
+    """
+    header = f"{len(matches)} matching log message(s)"
+    if window_seconds:
+        header += f" in the last {window_seconds:.0f} seconds"
+    lines = [header + ":", ""]
+    for match in matches:
+        if match.get('account'):
+            lines.append(f"Account: {match['account']}")
+        lines.append(f"Signature: {match['signature']}")
+        lines.append(f"Slot: {match['slot']}  Block Time: {match['block_time']}")
+        lines.append(f"Found Term: {match['found_term']}")
+        if match.get('rule'):
+            lines.append(f"Rule: {match['rule']}")
+        lines.append(f"Log Message: {match['log']}")
+        for fill in match.get('fills', []):
+            lines.append(f"Decoded: {fill.describe()}")
+        if match.get('signature'):
+            lines.append(f"https://solscan.io/tx/{match['signature']}")
+        lines.append("-" * 40)
+    return "\n".join(lines)
+
+
+def build_retraction_body(matches, reason):
+    """
+    Plain-text email body withdrawing earlier alerts whose transaction did not finalize.
+    """
+    signatures = sorted({match['signature'] for match in matches})
+    lines = [f"RETRACTED: {len(signatures)} transaction(s) alerted at confirmed commitment did not finalize "
+             f"({reason}). Ignore these earlier alerts:", ""]
+    for signature in signatures:
+        lines.append(f"Signature: {signature}")
+        lines.append(f"https://solscan.io/tx/{signature}")
+        lines.append("-" * 40)
+    return "\n".join(lines)
+
+
+class SmtpMailer:
+    """
+    Keeps one SMTP connection open between emails and reconnects when the server drops it.
+    Blocking: call it from a worker thread (see notification_dispatcher). smtplib is not
+    thread-safe, so sends (digests and retractions) take turns on the connection.
+    """
+    def __init__(self, host=SMTP_HOST, port=SMTP_PORT, use_ssl=SMTP_USE_SSL,
+                 sender_email=None, password=None, receiver_email=RECEIVER_EMAIL, timeout=30):
+        self.host = host
+        self.port = port
+        self.use_ssl = use_ssl
+        self.sender_email = sender_email or os.environ.get('SENDER_EMAIL')
+        self.password = password or os.environ.get('EMAIL_PASSWORD')
+        self.receiver_email = receiver_email
+        self.timeout = timeout
+        self._server = None
+        self._lock = threading.Lock()
+        self.sent = 0
+
+    def _connect(self):
+        context = ssl.create_default_context()
+        if self.use_ssl:
+            server = smtplib.SMTP_SSL(self.host, self.port, context=context, timeout=self.timeout)
+        else:
+            server = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        try:
+            if not self.use_ssl:
+                server.ehlo()
+                if server.has_extn("starttls"):
+                    server.starttls(context=context)
+                    server.ehlo()
+            # Local stand-in servers usually run without authentication
+            if self.password:
+                server.login(self.sender_email, self.password)
+        except Exception:
+            # Do not leak the socket when the handshake or the login fails
+            server.close()
+            raise
+        self._server = server
+        logging.info(f"Connected to SMTP server {self.host}:{self.port}.")
+
+    def send(self, subject, body):
+        if not self.sender_email:
+            logging.error("Email credentials are not set in environment variables.")
+            return False
+
+        message = MIMEMultipart()
+        message["From"] = self.sender_email
+        message["To"] = self.receiver_email
+        message["Subject"] = subject
+        message.attach(MIMEText(body, "plain"))
+
+        with self._lock:
+            return self._send(message)
+
+    def _send(self, message):
+        for attempt in (1, 2):
+            try:
+                if self._server is None:
+                    self._connect()
+                self._server.sendmail(self.sender_email, self.receiver_email, message.as_string())
+                self.sent += 1
+                logging.info("Email sent successfully.")
+                return True
+            except (smtplib.SMTPServerDisconnected, smtplib.SMTPConnectError, ConnectionError, socket.timeout) as e:
+                # The server closed the idle connection; reconnect once. Other SMTP errors
+                # (auth, refused recipients, data) are not connection problems and are not retried.
+                logging.warning(f"SMTP connection lost ({e}), reconnecting (attempt {attempt}).")
+                self._close()
+            except Exception as e:
+                logging.error(f"Error sending email: {e}")
+                self._close()
+                return False
+        logging.error("Error sending email: could not reconnect to the SMTP server.")
+        return False
+
+    def close(self):
+        with self._lock:
+            self._close()
+
+    def _close(self):
+        if self._server is not None:
+            try:
+                self._server.quit()
+            except Exception:
+                pass
+            self._server = None
@@ -1,5 +1,7 @@
 import os
 import time
+import asyncio
+import logging
 
 # ==================== Function 4: Music to my ears  =================================
 # ====================================================================================
@@ -35,3 +37,26 @@ def play_sequence():
     play_sound("2")
 
     print("Finished playing sounds.")
+
+
+async def play_sequence_async():
+    """Plays the same sequence as play_sequence without blocking the event loop."""
+    async def play_sound(sound_key):
+        if sound_key not in sounds:
+            logging.warning(f"Sound key {sound_key} not found.")
+            return
+        try:
+            process = await asyncio.create_subprocess_exec(
+                "paplay", sounds[sound_key],
+                stdout=asyncio.subprocess.DEVNULL, stderr=asyncio.subprocess.DEVNULL
+            )
+            await process.wait()
+        except FileNotFoundError:
+            logging.warning("paplay is not installed; skipping sound alert.")
+
+    await play_sound("2")
+    await asyncio.sleep(0.1)
+    for _ in range(10):
+        await play_sound("4")
+        await asyncio.sleep(0.1)
+    await play_sound("2")
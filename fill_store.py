@@ -0,0 +1,221 @@
+import os
+import sqlite3
+from dataclasses import fields
+from drift_events import FillRecord
+
+# ==================== Local Fill Store ====================
+# Decoded fills (drift_events.FillRecord) and the log matches that surfaced them are kept
+# in one SQLite file in WAL mode, so the monitor can keep writing while notebooks read.
+#   - fills are keyed by (signature, log_index) and matches by (signature, account, term, log):
+#     writing the same batch twice is a no-op, and later writes only fill in missing values,
+#   - every batch is one transaction (executemany), not one commit per row,
+#   - slot, block_time, account, taker, maker and market are indexed, so range queries
+#     over millions of fills are answered from the indexes,
+#   - queries come back as pandas DataFrames (pandas is only imported when querying).
+# ==========================================================
+
+FILL_COLUMNS = [f.name for f in fields(FillRecord)]
+DERIVED_COLUMNS = ["price", "base_amount", "quote_amount", "account"]
+MATCH_COLUMNS = ["signature", "account", "found_term", "log", "slot", "block_time"]
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS fills (
+    signature TEXT NOT NULL,
+    log_index INTEGER NOT NULL,
+    kind TEXT NOT NULL,
+    slot INTEGER,
+    block_time INTEGER,
+    market_type TEXT,
+    market_index INTEGER,
+    explanation TEXT,
+    ts INTEGER,
+    fill_record_id INTEGER,
+    base_asset_amount INTEGER,
+    quote_asset_amount INTEGER,
+    oracle_price INTEGER,
+    taker TEXT,
+    taker_order_id INTEGER,
+    taker_direction TEXT,
+    taker_fee INTEGER,
+    maker TEXT,
+    maker_order_id INTEGER,
+    maker_direction TEXT,
+    maker_fee INTEGER,
+    filler TEXT,
+    role TEXT,
+    price REAL,
+    base_amount REAL,
+    quote_amount REAL,
+    account TEXT,
+    PRIMARY KEY (signature, log_index)
+);
+CREATE INDEX IF NOT EXISTS fills_slot ON fills (slot);
+CREATE INDEX IF NOT EXISTS fills_block_time ON fills (block_time);
+CREATE INDEX IF NOT EXISTS fills_account_time ON fills (account, block_time);
+CREATE INDEX IF NOT EXISTS fills_taker_time ON fills (taker, block_time);
+CREATE INDEX IF NOT EXISTS fills_maker_time ON fills (maker, block_time);
+CREATE INDEX IF NOT EXISTS fills_market_time ON fills (market_index, block_time);
+
+CREATE TABLE IF NOT EXISTS matches (
+    signature TEXT NOT NULL,
+    account TEXT NOT NULL DEFAULT '',
+    found_term TEXT NOT NULL,
+    log TEXT NOT NULL,
+    slot INTEGER,
+    block_time INTEGER,
+    PRIMARY KEY (signature, account, found_term, log)
+);
+CREATE INDEX IF NOT EXISTS matches_account_slot ON matches (account, slot);
+CREATE INDEX IF NOT EXISTS matches_block_time ON matches (block_time);
+"""
+
+
+def _upsert_sql(table, columns, key):
+    # Re-inserting a row is a no-op except that NULL columns pick up newly known values
+    updates = ", ".join(f"{c} = COALESCE({table}.{c}, excluded.{c})" for c in columns if c not in key)
+    return (f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))}) "
+            f"ON CONFLICT ({', '.join(key)}) DO UPDATE SET {updates}")
+
+
+class FillStore:
+    def __init__(self, path="fills.sqlite"):
+        self.path = path
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        # WAL + NORMAL: durable across application crashes, only an OS crash can lose the last commits
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+        self._fill_sql = _upsert_sql("fills", FILL_COLUMNS + DERIVED_COLUMNS, ("signature", "log_index"))
+        self._match_sql = _upsert_sql("matches", MATCH_COLUMNS, ("signature", "account", "found_term", "log"))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self.conn.close()
+
+    # ---------- writes ----------
+    def upsert_fills(self, fills, account=None):
+        """
+        Bulk, idempotent insert of FillRecords in one transaction. Returns the number of rows written.
+        """
+        rows = [
+            tuple(getattr(fill, c) for c in FILL_COLUMNS) + (fill.price, fill.base_amount, fill.quote_amount, account)
+            for fill in fills
+        ]
+        if rows:
+            with self.conn:
+                self.conn.executemany(self._fill_sql, rows)
+        return len(rows)
+
+    def record_matches(self, matches):
+        """
+        Stores a batch of log matches and the decoded fills attached to them (see drift_events.attach_fills).
+        """
+        match_rows = []
+        fill_rows = []
+        for match in matches:
+            account = match.get('account') or ''
+            match_rows.append((match['signature'], account, match['found_term'], match['log'],
+                               match.get('slot'), match.get('block_time')))
+            for fill in match.get('fills', []):
+                fill_rows.append(tuple(getattr(fill, c) for c in FILL_COLUMNS)
+                                 + (fill.price, fill.base_amount, fill.quote_amount, account or None))
+        with self.conn:
+            if match_rows:
+                self.conn.executemany(self._match_sql, match_rows)
+            if fill_rows:
+                self.conn.executemany(self._fill_sql, fill_rows)
+        return len(fill_rows)
+
+    def delete_signatures(self, signatures):
+        """
+        Removes every match and fill of the given transactions (e.g. retracted ones). Returns the rows deleted.
+        """
+        rows = [(str(signature),) for signature in signatures]
+        if not rows:
+            return 0
+        with self.conn:
+            before = self.conn.total_changes
+            self.conn.executemany("DELETE FROM fills WHERE signature = ?", rows)
+            self.conn.executemany("DELETE FROM matches WHERE signature = ?", rows)
+            return self.conn.total_changes - before
+
+    # ---------- reads ----------
+    def query_fills(self, market_index=None, market_type=None, account=None, since=None, until=None,
+                    slot_from=None, slot_to=None, kind=None, ours_only=False, limit=None):
+        """
+        Fills matching every given filter, newest first, as a DataFrame.
+        `account` matches the watched account as well as the taker or maker side.
+        `since`/`until` are unix timestamps (block_time), `slot_from`/`slot_to` are inclusive.
+        """
+        clauses, params = [], []
+        if market_index is not None:
+            clauses.append("market_index = ?")
+            params.append(market_index)
+        if market_type is not None:
+            clauses.append("market_type = ?")
+            params.append(market_type)
+        if account is not None:
+            clauses.append("(account = ? OR taker = ? OR maker = ?)")
+            params.extend([str(account)] * 3)
+        if since is not None:
+            clauses.append("block_time >= ?")
+            params.append(int(since))
+        if until is not None:
+            clauses.append("block_time < ?")
+            params.append(int(until))
+        if slot_from is not None:
+            clauses.append("slot >= ?")
+            params.append(slot_from)
+        if slot_to is not None:
+            clauses.append("slot <= ?")
+            params.append(slot_to)
+        if kind is not None:
+            clauses.append("kind = ?")
+            params.append(kind)
+        if ours_only:
+            clauses.append("role IS NOT NULL")
+
+        sql = "SELECT * FROM fills"
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        sql += " ORDER BY block_time DESC, slot DESC, log_index"
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(int(limit))
+        return self._frame(sql, params)
+
+    def query_matches(self, account=None, since=None, limit=None):
+        clauses, params = [], []
+        if account is not None:
+            clauses.append("account = ?")
+            params.append(str(account))
+        if since is not None:
+            clauses.append("block_time >= ?")
+            params.append(int(since))
+        sql = "SELECT * FROM matches"
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        sql += " ORDER BY slot DESC"
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(int(limit))
+        return self._frame(sql, params)
+
+    def _frame(self, sql, params):
+        import pandas as pd
+        return pd.read_sql_query(sql, self.conn, params=params)
+
+    def count(self):
+        return self.conn.execute("SELECT COUNT(*) FROM fills").fetchone()[0]
+
+    def stats(self):
+        fills, first, last = self.conn.execute("SELECT COUNT(*), MIN(block_time), MAX(block_time) FROM fills").fetchone()
+        matches = self.conn.execute("SELECT COUNT(*) FROM matches").fetchone()[0]
+        return {"fills": fills, "matches": matches, "first_block_time": first, "last_block_time": last}
@@ -0,0 +1,226 @@
+import time
+import json
+import asyncio
+import logging
+from solders.signature import Signature
+from solders.transaction_status import TransactionConfirmationStatus
+from signature_cursor import write_json_atomic
+from metrics import METRICS
+
+# ==================== Confirmed-then-Finalized Fast Path ====================
+# Alerts go out as soon as a transaction is `confirmed` instead of waiting ~13 s more
+# for `finalized`, with three helpers around the inspection stage:
+#   - prefilter_signatures: the getSignaturesForAddress entries already say whether a
+#     transaction failed (err) and when it landed (blockTime), so failed and (optionally)
+#     too old transactions are never fetched. Already processed ones need no check: the
+#     `until=cursor` bound of the query excludes them, and a slot comparison would drop
+#     other transactions of the account that landed in the cursor's own slot,
+#   - RetryQueue: signatures whose transaction was not returned yet (the node has not
+#     caught up) are retried in later cycles with backoff instead of being dropped; the
+#     queue is persisted so restarts keep them,
+#   - FinalityTracker: every match alerted before finalization is re-checked in the
+#     background with getSignatureStatuses; if the transaction fails or is dropped instead
+#     of finalizing, a retraction is sent.
+# Only finalized responses are ever cached (see TransactionCache.put).
+# ============================================================================
+
+FINALIZED = "finalized"
+
+
+def prefilter_signatures(entries, max_age_seconds=0, now=None):
+    """
+    Splits getSignaturesForAddress entries into the ones worth fetching and a count of the
+    skipped ones per reason: failed (err set) and stale (blockTime older than
+    `max_age_seconds`, 0 keeps everything).
+    """
+    now = time.time() if now is None else now
+    to_fetch, skipped = [], {}
+    for entry in entries:
+        if entry.get('err') is not None:
+            reason = "failed"
+        elif max_age_seconds and entry.get('blockTime') and now - entry['blockTime'] > max_age_seconds:
+            reason = "stale"
+        else:
+            to_fetch.append(entry)
+            continue
+        skipped[reason] = skipped.get(reason, 0) + 1
+    for reason, count in skipped.items():
+        METRICS.inc("signatures_skipped_total", {"reason": reason}, count)
+    if skipped:
+        logging.info(f"Skipping {sum(skipped.values())} of {len(entries)} signatures without fetching them: {skipped}")
+    return to_fetch, skipped
+
+
+class RetryQueue:
+    """
+    Signature entries whose transaction was not available yet, retried with exponential
+    backoff (base_delay, 2 * base_delay, ...) until found or max_attempts is reached.
+    """
+    def __init__(self, path=None, max_attempts=8, base_delay=5.0, max_delay=300.0):
+        self.path = path or None
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.counters = {"queued": 0, "recovered": 0, "given_up": 0}
+        # signature -> {"entry": ..., "attempts": n, "next_retry": unix time}
+        self._pending = {}
+        if self.path:
+            self._load()
+
+    def __len__(self):
+        return len(self._pending)
+
+    def due(self, now=None):
+        """
+        Entries to fetch again now (oldest slot first). They are claimed until update() reports
+        on them, so overlapping batches do not fetch them twice.
+        """
+        now = time.time() if now is None else now
+        ready = [item for item in self._pending.values() if item["next_retry"] <= now]
+        for item in ready:
+            item["next_retry"] = now + self.max_delay
+        return sorted((item["entry"] for item in ready), key=lambda entry: entry.get('slot') or 0)
+
+    def release(self, entries, now=None):
+        """
+        Gives back the claims of due() entries that were never fetched (e.g. a dropped batch),
+        so they are due again right away instead of after max_delay.
+        """
+        now = time.time() if now is None else now
+        for entry in entries:
+            item = self._pending.get(entry['signature'])
+            if item is not None:
+                item["next_retry"] = now
+
+    def update(self, attempted, found, now=None):
+        """
+        After fetching `attempted` entries: drops the `found` signatures from the queue and
+        (re)schedules the others.
+        """
+        now = time.time() if now is None else now
+        changed = False
+        for entry in attempted:
+            signature = entry['signature']
+            item = self._pending.get(signature)
+            if signature in found:
+                if item is not None:
+                    del self._pending[signature]
+                    self.counters["recovered"] += 1
+                    changed = True
+                continue
+            if item is None:
+                item = self._pending[signature] = {"entry": entry, "attempts": 0, "next_retry": now}
+                self.counters["queued"] += 1
+            item["attempts"] += 1
+            if item["attempts"] >= self.max_attempts:
+                del self._pending[signature]
+                self.counters["given_up"] += 1
+                METRICS.inc("pending_given_up_total")
+                logging.error(f"Transaction {signature} still not available after {item['attempts']} attempts; giving up.")
+            else:
+                item["next_retry"] = now + min(self.max_delay, self.base_delay * 2 ** (item["attempts"] - 1))
+            changed = True
+        METRICS.set("pending_signatures", len(self._pending))
+        if changed:
+            self.save()
+
+    def stats(self):
+        return {**self.counters, "pending": len(self._pending)}
+
+    def save(self):
+        if not self.path:
+            return
+        try:
+            write_json_atomic(self.path, self._pending, prefix=".pending-")
+        except OSError as e:
+            logging.error(f"Could not persist pending signatures to {self.path}: {e}")
+
+    def _load(self):
+        try:
+            with open(self.path, "r") as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as e:
+            logging.error(f"Could not read pending signatures {self.path}: {e}")
+            return
+        if isinstance(data, dict):
+            self._pending = data
+            logging.info(f"Resuming {len(self._pending)} pending signatures from {self.path}.")
+
+
+class FinalityTracker:
+    """
+    Re-checks alerted, not yet finalized transactions every `interval_seconds` and calls
+    `on_retract(matches, reason)` for those that fail or are still unknown after `timeout_seconds`.
+    """
+    def __init__(self, client, on_retract, interval_seconds=5.0, timeout_seconds=120.0, chunk_size=256):
+        self.client = client
+        self.on_retract = on_retract
+        self.interval_seconds = interval_seconds
+        self.timeout_seconds = timeout_seconds
+        self.chunk_size = chunk_size
+        self.counters = {"tracked": 0, "finalized": 0, "retracted": 0}
+        # signature -> {"matches": [...], "since": monotonic time}
+        self._pending = {}
+        self._task = None
+
+    def start(self):
+        self._task = asyncio.create_task(self.run_forever())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+
+    def track(self, matches):
+        for match in matches:
+            if match.get('confirmation_status') == FINALIZED or not match.get('signature'):
+                continue
+            item = self._pending.get(match['signature'])
+            if item is None:
+                item = self._pending[match['signature']] = {"matches": [], "since": time.monotonic()}
+                self.counters["tracked"] += 1
+            item["matches"].append(match)
+        METRICS.set("finality_pending", len(self._pending))
+
+    def stats(self):
+        return {**self.counters, "pending": len(self._pending)}
+
+    async def check(self):
+        signatures = list(self._pending)
+        for start in range(0, len(signatures), self.chunk_size):
+            chunk = signatures[start:start + self.chunk_size]
+            response = await self.client.get_signature_statuses(
+                [Signature.from_string(s) for s in chunk], search_transaction_history=True
+            )
+            for signature, status in zip(chunk, response.value):
+                item = self._pending[signature]
+                if status is not None and status.err is not None:
+                    self._retract(signature, f"failed: {status.err}")
+                elif status is not None and status.confirmation_status == TransactionConfirmationStatus.Finalized:
+                    del self._pending[signature]
+                    self.counters["finalized"] += 1
+                elif time.monotonic() - item["since"] > self.timeout_seconds:
+                    self._retract(signature, f"not finalized after {self.timeout_seconds:g}s (dropped)")
+        METRICS.set("finality_pending", len(self._pending))
+
+    def _retract(self, signature, reason):
+        matches = self._pending.pop(signature)["matches"]
+        self.counters["retracted"] += 1
+        METRICS.inc("alerts_retracted_total")
+        logging.warning(f"Retracting the alert for {signature}: {reason}")
+        try:
+            self.on_retract(matches, reason)
+        except Exception as e:
+            logging.error(f"Sending the retraction for {signature} failed: {e}")
+
+    async def run_forever(self):
+        while True:
+            await asyncio.sleep(self.interval_seconds)
+            if not self._pending:
+                continue
+            try:
+                await self.check()
+            except Exception as e:
+                logging.error(f"Finality check failed: {e}")
@@ -0,0 +1,333 @@
+import re
+import time
+import logging
+from bisect import bisect_right
+from functools import lru_cache
+from itertools import accumulate
+from metrics import METRICS
+
+# ==================== Log Rule Engine ====================
+# Matches transaction logs against many rules at once. A rule is either a plain search
+# term (it matches log lines containing it, like LOG_SEARCH_TERMS) or a dict:
+#   {"name": "big-fills",                  # reported as match['rule']
+#    "terms": ["FillPerpOrder", ...],      # a line containing any of these matches
+#    "regex": [r"base_asset_amount=\d{10,}"],   # ... or matching any of these (per line)
+#    "programs": ["dRiftyHA39..."],        # the transaction must invoke one of these programs
+#                                          #   (on its own: the program's invoke line matches)
+#    "require": ["Instruction: ..."],      # every one of these must appear in the transaction
+#    "accounts": ["<pubkey>", ...]}        # only for transactions of these watched accounts
+# compile_rules() turns all rules into:
+#   - one automaton over every literal (terms, `Program <id> invoke` lines, required terms),
+#     built as a trie-shaped regex so a batch is scanned in one pass of the C regex engine
+#     (up to FIND_MAX_LITERALS literals, one str.find sweep per literal is faster still),
+#   - one combined regex that rules out the batch, then single lines, before any individual
+#     rule regex runs,
+#   - indexes from each literal to the rules it can fire, and per-account rule masks
+#     (including per-account overrides).
+# evaluate() returns one match per (log line, fired rule), tagged with the rule name, and
+# counts how often every rule fired (RuleSet.fired, drift_monitor_rules_fired_total).
+# =========================================================
+
+RULE_KEYS = {"name", "terms", "regex", "programs", "require", "accounts", "enabled"}
+# str.find scans at memory speed, the regex automaton at a few ns per character whatever the
+# number of literals; past this many literals the automaton wins
+FIND_MAX_LITERALS = 24
+
+
+def program_line(program_id):
+    return f"Program {program_id} invoke"
+
+
+def _as_list(value):
+    if value is None:
+        return []
+    return [value] if isinstance(value, str) else list(value)
+
+
+def _build_trie(terms):
+    root = {}
+    for term in terms:
+        node = root
+        for char in term:
+            node = node.setdefault(char, {})
+        # "" marks the end of a term
+        node[""] = term
+    return root
+
+
+def _trie_pattern(node):
+    # Branches at one node start with different characters, so at most one applies and the
+    # greedy optional groups make every match the longest literal starting at its position.
+    branches = [re.escape(char) + _trie_pattern(child) for char, child in sorted(node.items()) if char]
+    if not branches:
+        return ""
+    body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+    return f"(?:{body})?" if "" in node else body
+
+
+@lru_cache(maxsize=64)
+def literal_pattern(terms):
+    """
+    One compiled regex matching any of `terms` (a tuple of strings), longest first.
+    """
+    return re.compile(_trie_pattern(_build_trie(terms)))
+
+
+class Rule:
+    def __init__(self, name, terms=(), regex=(), programs=(), require=(), accounts=None):
+        self.name = name
+        self.terms = tuple(terms)
+        self.regex = tuple(re.compile(pattern, re.MULTILINE) for pattern in regex)
+        self.programs = tuple(programs)
+        self.require = tuple(require)
+        self.accounts = frozenset(accounts) if accounts else None
+        # Accounts for which a per-account override replaces this rule
+        self.excluded = set()
+        for literal in self.terms + self.require:
+            if not literal or "\n" in literal:
+                raise ValueError(f"Rule {name!r}: terms must be non-empty single-line strings, got {literal!r}")
+        if not (self.terms or self.regex or self.programs):
+            raise ValueError(f"Rule {name!r} needs terms, regex or programs to match log lines")
+
+    @classmethod
+    def from_spec(cls, spec, accounts=None):
+        if isinstance(spec, str):
+            return cls(spec, terms=[spec], accounts=accounts)
+        unknown = set(spec) - RULE_KEYS
+        if unknown:
+            raise ValueError(f"Unknown keys in rule {spec.get('name')!r}: {sorted(unknown)}")
+        if not spec.get("name"):
+            raise ValueError(f"Rule without a name: {spec}")
+        return cls(spec["name"], _as_list(spec.get("terms")), _as_list(spec.get("regex")),
+                   _as_list(spec.get("programs")), _as_list(spec.get("require")),
+                   accounts or _as_list(spec.get("accounts")) or None)
+
+    def applies_to(self, account):
+        return account not in self.excluded and (self.accounts is None or account in self.accounts)
+
+
+def compile_rules(rules, overrides=None):
+    """
+    Compiles rule specs (see the module header) into a RuleSet. `overrides` maps an account to
+    its own rule specs: one named like a global rule replaces it for that account, and
+    {"name": ..., "enabled": False} turns it off there.
+    """
+    compiled = {}
+    for spec in rules:
+        if isinstance(spec, dict) and spec.get("enabled", True) is False:
+            continue
+        rule = Rule.from_spec(spec)
+        if rule.name in compiled:
+            raise ValueError(f"Duplicate rule name {rule.name!r}")
+        compiled[rule.name] = rule
+    ordered = list(compiled.values())
+    for account, specs in (overrides or {}).items():
+        for spec in specs:
+            name = spec if isinstance(spec, str) else spec.get("name")
+            if name in compiled:
+                compiled[name].excluded.add(account)
+            if isinstance(spec, dict) and spec.get("enabled", True) is False:
+                continue
+            ordered.append(Rule.from_spec(spec, accounts=[account]))
+    return RuleSet(ordered)
+
+
+def fired_rules(matches):
+    """
+    How many matches each rule produced, e.g. for a cycle summary.
+    """
+    fired = {}
+    for match in matches:
+        rule = match.get('rule', match.get('found_term'))
+        fired[rule] = fired.get(rule, 0) + 1
+    return fired
+
+
+@lru_cache(maxsize=16)
+def _terms_rule_set(terms):
+    return compile_rules(terms)
+
+
+def as_rule_set(rules):
+    """
+    A RuleSet as-is; a list of plain search terms is compiled once and cached.
+    """
+    if isinstance(rules, RuleSet):
+        return rules
+    rules = list(rules)
+    if all(isinstance(rule, str) for rule in rules):
+        return _terms_rule_set(tuple(rules))
+    return compile_rules(rules)
+
+
+class RuleSet:
+    def __init__(self, rules):
+        started = time.perf_counter()
+        self.rules = list(rules)
+        self.fired = {}
+        self.literals = []
+        self._literal_ids = {}
+        # literal id -> rules a log line containing it can fire
+        self._line_rules = []
+        # rule id -> literal ids that match it on a line (found_term order), and its transaction-level
+        # predicates: any of _programs and all of _require among the transaction's literals
+        self._rule_literals, self._programs, self._require = [], [], []
+        for rule_id, rule in enumerate(self.rules):
+            line_literals = rule.terms or (() if rule.regex else tuple(map(program_line, rule.programs)))
+            ids = [self._literal(literal) for literal in line_literals]
+            for literal_id in ids:
+                self._line_rules[literal_id].append(rule_id)
+            self._rule_literals.append(ids)
+            self._programs.append(frozenset(self._literal(program_line(p)) for p in rule.programs))
+            self._require.append(frozenset(self._literal(literal) for literal in rule.require))
+        self._regex_rules = [rule_id for rule_id, rule in enumerate(self.rules) if rule.regex]
+
+        self._automaton = literal_pattern(tuple(self.literals)) if len(self.literals) > FIND_MAX_LITERALS else None
+        self._implied = self._implied_literals()
+        self._gate = None
+        if self._regex_rules:
+            patterns = [f"(?:{pattern.pattern})" for rule_id in self._regex_rules for pattern in self.rules[rule_id].regex]
+            try:
+                self._gate = re.compile("|".join(patterns), re.MULTILINE)
+            except re.error:
+                # e.g. inline global flags inside one rule; every line is then tried rule by rule
+                self._gate = None
+        self._masks = {}
+        logging.info(f"Compiled {len(self.rules)} log rules ({len(self.literals)} literals, "
+                     f"{len(self._regex_rules)} with regexes) in {(time.perf_counter() - started) * 1e3:.1f} ms.")
+
+    def __len__(self):
+        return len(self.rules)
+
+    def _literal(self, literal):
+        literal_id = self._literal_ids.get(literal)
+        if literal_id is None:
+            literal_id = self._literal_ids[literal] = len(self.literals)
+            self.literals.append(literal)
+            self._line_rules.append([])
+        return literal_id
+
+    def _implied_literals(self):
+        """
+        For every literal, the literals it contains (itself included). The automaton reports the
+        longest literal starting at each position, so the ones nested inside it come from here.
+        """
+        trie = _build_trie(self.literals)
+        implied = []
+        for literal in self.literals:
+            found = set()
+            for start in range(len(literal)):
+                node = trie
+                for char in literal[start:]:
+                    node = node.get(char)
+                    if node is None:
+                        break
+                    if "" in node:
+                        found.add(self._literal_ids[node[""]])
+            implied.append(found)
+        return implied
+
+    def _mask(self, account):
+        mask = self._masks.get(account)
+        if mask is None:
+            mask = self._masks[account] = [rule.applies_to(account) for rule in self.rules]
+        return mask
+
+    def stats(self):
+        return {"rules": len(self.rules), "literals": len(self.literals), "regex_rules": len(self._regex_rules),
+                "fired": dict(self.fired)}
+
+    # ---------- evaluation ----------
+    def evaluate(self, records, account=None):
+        """
+        Matches a batch of transaction records (extract_transaction_record) in one pass. `account`
+        selects the rules that apply (None: rules without an account filter). Returns one result
+        per (log line, fired rule), in transaction, line and rule order.
+        """
+        lines, firsts = [], []
+        for record in records:
+            firsts.append(len(lines))
+            lines.extend(record.get('log_messages') or ())
+        if not lines:
+            return []
+        text = "\n".join(lines)
+
+        # (position, literal id) of every literal occurrence in the batch
+        positions = []
+        if self._automaton is None:
+            for literal_id, literal in enumerate(self.literals):
+                position = text.find(literal)
+                while position >= 0:
+                    positions.append((position, literal_id))
+                    position = text.find(literal, position + 1)
+        else:
+            # The longest literal at every position where one starts
+            search = self._automaton.search
+            found = search(text)
+            while found is not None:
+                positions.append((found.start(), self._literal_ids[found.group()]))
+                found = search(text, found.start() + 1)
+        if not positions and not self._regex_rules:
+            return []
+
+        starts = [0, *accumulate(len(line) + 1 for line in lines)]
+        hits = {}
+        for position, literal_id in positions:
+            hits.setdefault(bisect_right(starts, position) - 1, set()).update(self._implied[literal_id])
+
+        # Lines where some rule regex may match; a cross-line match only adds a candidate
+        regex_lines = set()
+        if self._regex_rules:
+            if self._gate is None:
+                regex_lines.update(range(len(lines)))
+            else:
+                found = self._gate.search(text)
+                while found is not None:
+                    line = bisect_right(starts, found.start()) - 1
+                    if self._gate.search(lines[line]):
+                        regex_lines.add(line)
+                    found = self._gate.search(text, starts[line + 1]) if line + 1 < len(lines) else None
+
+        mask = self._mask(account)
+        results, fired, transaction_literals = [], {}, {}
+        for line in sorted(hits.keys() | regex_lines):
+            index = bisect_right(firsts, line) - 1
+            record = records[index]
+            log = lines[line]
+            present = hits.get(line, ())
+            candidates = {rule_id for literal_id in present for rule_id in self._line_rules[literal_id]}
+            if line in regex_lines:
+                candidates.update(self._regex_rules)
+            for rule_id in sorted(candidates):
+                if not mask[rule_id]:
+                    continue
+                term = next((self.literals[i] for i in self._rule_literals[rule_id] if i in present), None)
+                if term is None:
+                    matched = next(filter(None, (pattern.search(log) for pattern in self.rules[rule_id].regex)), None)
+                    if matched is None:
+                        continue
+                    term = matched.group()
+                if self._programs[rule_id] or self._require[rule_id]:
+                    literals = transaction_literals.get(index)
+                    if literals is None:
+                        end = firsts[index + 1] if index + 1 < len(firsts) else len(lines)
+                        literals = transaction_literals[index] = set().union(*(hits.get(i, ()) for i in range(firsts[index], end)))
+                    if self._programs[rule_id] and self._programs[rule_id].isdisjoint(literals):
+                        continue
+                    if not self._require[rule_id] <= literals:
+                        continue
+                name = self.rules[rule_id].name
+                fired[name] = fired.get(name, 0) + 1
+                results.append({
+                    "slot": record.get('slot'),
+                    "signature": record.get('signature'),
+                    "block_time": record.get('block_time'),
+                    "log_index": line - firsts[index],
+                    "found_term": term,
+                    "log": log,
+                    "rule": name,
+                })
+        for name, count in fired.items():
+            self.fired[name] = self.fired.get(name, 0) + count
+            METRICS.inc("rules_fired_total", {"rule": name}, count)
+        return results
@@ -1,13 +1,24 @@
-from f1_get_signatures import fetch_last_10_signatures
+from f1_get_signatures import fetch_last_10_signatures, fetch_new_signatures
 from f2_inspect_transactions import inspect_transactions
-from f3_search_logs import search_logs
+from f3_search_logs import search_logs, extract_transaction_records
+from drift_events import decode_fill_events, attach_fills
 from f4_send_email import send_email_notification
 from f5_pc_notification_style import play_sequence
+from signature_cursor import SignatureCursorStore
+from notification_dispatcher import NotificationDispatcher
+from multi_account_watcher import MultiAccountWatcher, load_whale_accounts
+from metrics import METRICS, serve_metrics
+from cycle_pipeline import CyclePipeline, FixedRateTicker
+from alert_dedup import AlertDeduplicator
+from finality import prefilter_signatures, RetryQueue, FinalityTracker
+from log_rules import compile_rules, fired_rules
+from builders import (build_transaction_cache, build_transaction_sink, build_fill_store, build_rate_limiter,
+                      build_endpoint_pool, shared_client)
 
 import config
 import asyncio
-import json
 import argparse
+import functools
 from datetime import datetime
 import logging
 
@@ -24,6 +35,17 @@ def parse_arguments():
         default="https://api.mainnet-beta.solana.com",
         help="RPC endpoint to use.",
     )
+    parser.add_argument(
+        "--rpc_pool",
+        type=str,
+        default="",
+        help="Comma-separated extra RPC endpoints; joined with --rpc_override and HELIUS_RPC_URL into one health-scored pool.",
+    )
+    parser.add_argument(
+        "--hedge",
+        action='store_true',
+        help="Send a hedged duplicate request to the runner-up endpoint when the best one is slower than its p95.",
+    )
     parser.add_argument(
         "--before_sig",
         type=str,
@@ -36,75 +58,418 @@ def parse_arguments():
         default=5,
         help="Number of concurrent workers for fetching transactions.",
     )
+    parser.add_argument(
+        "--batch_size",
+        type=int,
+        default=0,
+        help="Fetch transactions in JSON-RPC batches of this size over one connection (0 = one request per signature).",
+    )
+    parser.add_argument(
+        "--rps",
+        type=float,
+        default=config.RPC_RATE_PER_SECOND,
+        help="Shared RPC rate limit in requests per second; concurrency is auto-tuned below it (0 disables the limiter).",
+    )
+    parser.add_argument(
+        "--commitment",
+        type=str,
+        default=config.ALERT_COMMITMENT,
+        choices=["confirmed", "finalized"],
+        help="Alert from confirmed transactions (re-verified at finalized, with retractions) or wait for finalized ones.",
+    )
+    parser.add_argument(
+        "--sequential",
+        action='store_true',
+        help="Run whole cycles one after another instead of the pipelined scheduler.",
+    )
     parser.add_argument(
         "--include_test_sigs",
         action='store_true',
         help="Include specific test signatures in the inspection.",
     )
+    parser.add_argument(
+        "--accounts",
+        type=str,
+        default="",
+        help="Comma-separated list of accounts to watch instead of HARDCODED_ACCOUNT.",
+    )
+    parser.add_argument(
+        "--watch_whales",
+        action='store_true',
+        help="Also watch every account in helpers.DRIFT_WHALE_LIST_SNAP.",
+    )
+    parser.add_argument(
+        "--max_concurrency",
+        type=int,
+        default=8,
+        help="Global cap on in-flight RPC requests when watching multiple accounts.",
+    )
+    parser.add_argument(
+        "--stream",
+        action='store_true',
+        help="Stream logs over a logsSubscribe WebSocket instead of polling every FREQUENCY_SECONDS.",
+    )
+    parser.add_argument(
+        "--ws_url",
+        type=str,
+        default="",
+        help="WebSocket endpoint for --stream (defaults to the ws:// form of --rpc_override).",
+    )
+    parser.add_argument(
+        "--stream_program",
+        action='store_true',
+        help="With --stream, also subscribe to every log mentioning the Drift program.",
+    )
+    parser.add_argument(
+        "--record_stream",
+        type=str,
+        default="",
+        help="With --stream, append every received notification to this NDJSON file (for ws_replay_server.py).",
+    )
+    parser.add_argument(
+        "--metrics_port",
+        type=int,
+        default=config.METRICS_PORT,
+        help="Serve Prometheus metrics on http://127.0.0.1:<port>/metrics (0 disables).",
+    )
+    parser.add_argument(
+        "--metrics_json",
+        type=str,
+        default=config.METRICS_JSON_PATH,
+        help="Append a JSON summary of every cycle to this NDJSON file.",
+    )
     return parser.parse_args()
 
 
+def watched_accounts(args):
+    accounts = [a.strip() for a in args.accounts.split(",") if a.strip()]
+    if args.watch_whales:
+        accounts = (accounts or [config.HARDCODED_ACCOUNT]) + load_whale_accounts()
+    return accounts
+
+
+def report_matches(matching_logs, dispatcher=None, store=None, dedup=None, tracker=None):
+    if dedup is not None:
+        # Matches that were already alerted (same signature and log line) are dropped
+        matching_logs = dedup.filter(matching_logs)
+        if not matching_logs:
+            return
+    for block_time in {match['signature']: match['block_time'] for match in matching_logs}.values():
+        METRICS.alert(block_time)
+    logging.info("\nMatching Log Messages:")
+    for match in matching_logs:
+        if match.get('account'):
+            logging.info(f"Account: {match['account']}")
+        logging.info(f"Slot: {match['slot']}")
+        logging.info(f"Signature: {match['signature']}")
+        logging.info(f"Block Time: {match['block_time']}")
+        logging.info(f"Found Term: {match['found_term']}")
+        if match.get('rule'):
+            logging.info(f"Rule: {match['rule']}")
+        logging.info(f"Log Message: {match['log']}")
+        for fill in match.get('fills', []):
+            logging.info(f"Decoded: {fill.describe()}")
+        logging.info("-" * 80)
+    if store is not None:
+        try:
+            stored = store.record_matches(matching_logs)
+            logging.info(f"Stored {len(matching_logs)} matches and {stored} decoded fills in {store.path}.")
+        except Exception as e:
+            logging.error(f"Error writing matches to the fill store: {e}")
+    try:
+        if dispatcher is not None:
+            # Sound and a digest email are handled in the background
+            dispatcher.submit(matching_logs)
+        else:
+            # Play a sound
+            play_sequence()
+            # Send an email
+            send_email_notification()
+    finally:
+        # Once the notification was attempted, a failure does not re-alert the match every cycle
+        if dedup is not None:
+            dedup.add(matching_logs)
+    if tracker is not None:
+        # Alerted before finalization: re-verified in the background
+        tracker.track(matching_logs)
+
+
+def report_retractions(matches, reason, dispatcher=None, store=None):
+    signatures = sorted({match['signature'] for match in matches})
+    for signature in signatures:
+        logging.warning(f"RETRACTED: transaction {signature} did not finalize ({reason}); ignore its earlier alert.")
+    if store is not None:
+        try:
+            store.delete_signatures(signatures)
+        except Exception as e:
+            logging.error(f"Error removing retracted matches from the fill store: {e}")
+    if dispatcher is not None:
+        dispatcher.retract(matches, reason)
+
+
 # ==================== One Cycle Flow Function:  ==================
 # =================================================================
-async def run_cycle(args):
+def build_retry_queue(path=config.PENDING_SIGNATURES_PATH):
+    return RetryQueue(path, config.PENDING_MAX_ATTEMPTS)
+
+
+def build_finality_tracker(args, client, dispatcher, store):
+    if args.commitment != "confirmed":
+        return None
+    tracker = FinalityTracker(client, functools.partial(report_retractions, dispatcher=dispatcher, store=store),
+                              config.FINALITY_CHECK_SECONDS, config.FINALITY_TIMEOUT_SECONDS)
+    tracker.start()
+    return tracker
+
+
+def build_log_rules():
+    # Every LOG_SEARCH_TERMS entry is a rule of its own, next to LOG_RULES
+    return compile_rules(list(config.LOG_SEARCH_TERMS) + list(config.LOG_RULES), config.LOG_RULE_OVERRIDES)
+
+
+def build_alert_dedup():
+    return AlertDeduplicator(config.ALERT_DEDUP_PATH, config.ALERT_DEDUP_CAPACITY,
+                             config.ALERT_DEDUP_BLOOM_CAPACITY, config.ALERT_DEDUP_BLOOM_ERROR_RATE)
+
+
+def build_dispatcher():
+    dispatcher = NotificationDispatcher(
+        play_sound=config.NOTIFY_PLAY_SOUND,
+        coalesce_seconds=config.NOTIFY_COALESCE_SECONDS
+    )
+    dispatcher.start()
+    return dispatcher
+
+
+async def start_metrics_server(args):
+    if not args.metrics_port:
+        return None
+    return await serve_metrics(args.metrics_port)
+
+
+async def run_cycle(args, cursor_store=None, cache=None, limiter=None, client=None, sink=None, dispatcher=None,
+                    store=None, dedup=None, pending=None, tracker=None, rules=None):
+    METRICS.begin_cycle()
     try:
-        # Fetch the latest signatures
-        signatures = await fetch_last_10_signatures(args)
+        with METRICS.stage("cycle"):
+            await _run_cycle(args, cursor_store, cache, limiter, client, sink, dispatcher, store, dedup, pending, tracker,
+                             rules if rules is not None else build_log_rules())
+    except Exception as e:
+        logging.error(f"An error occurred during the cycle: {e}")
+    finally:
+        summary = METRICS.end_cycle(args.metrics_json or None)
+        logging.info(f"Cycle metrics: {summary}")
+
 
-        # If the user wants to include test signatures, add them to the list
-        if args.include_test_sigs:
-            logging.info("Including test signatures for inspection.")
-            signatures.extend(config.TEST_SIGNATURES)
+async def _run_cycle(args, cursor_store, cache, limiter, client, sink, dispatcher, store, dedup, pending, tracker, rules):
+    new_signatures, entries, transaction_records = [], [], []
+    with METRICS.stage("fetch_signatures"):
+        if args.before_sig or cursor_store is None or client is None:
+            # Fetch the latest signatures
+            signatures = await fetch_last_10_signatures(args, limiter)
+        else:
+            # Fetch only the signatures newer than the stored cursor
+            new_signatures = await fetch_new_signatures(
+                client,
+                config.HARDCODED_ACCOUNT,
+                cursor_store,
+                max_catchup=config.CURSOR_MAX_CATCHUP,
+                commitment=args.commitment
+            )
+            # Failed (and too old) transactions are never fetched; pending ones due again are
+            to_fetch, _ = prefilter_signatures(new_signatures, config.SIGNATURE_MAX_AGE_SECONDS)
+            entries = (pending.due() if pending is not None else []) + to_fetch
+            signatures = [entry['signature'] for entry in entries]
 
-        if signatures:
-            # Inspect transactions with the specified number of workers
-            transaction_details = await inspect_transactions(signatures, workers=args.workers)
+    # If the user wants to include test signatures, add them to the list
+    if args.include_test_sigs:
+        logging.info("Including test signatures for inspection.")
+        signatures.extend(config.TEST_SIGNATURES)
+    METRICS.note("signatures", len(signatures))
 
-            if transaction_details:
-                # Save all transaction details
-                with open("transaction_details.json", "w") as f:
-                    json.dump(transaction_details, f, indent=4, default=str)
-                logging.info("All transaction details saved to transaction_details.json")
+    if signatures:
+        # Inspect transactions with the specified number of workers
+        with METRICS.stage("inspect_transactions"):
+            transaction_details = await inspect_transactions(
+                signatures, workers=args.workers, client=client, batch_size=args.batch_size, cache=cache, limiter=limiter,
+                on_transaction=sink.write if sink is not None else None, commitment=args.commitment
+            )
+        METRICS.note("transactions", len(transaction_details))
+        # Read slot, signature, block time and logs straight off the typed responses
+        transaction_records = extract_transaction_records(transaction_details)
+        if pending is not None and entries:
+            # Signatures whose transaction is not available yet are retried in later cycles
+            pending.update(entries, {record['signature'] for record in transaction_records})
+        if cache is not None:
+            logging.info(f"Transaction cache: {cache.stats()}")
+        if limiter is not None:
+            logging.info(f"Rate limiter: {limiter.stats()}")
 
-                # Convert transaction_details to string representations for log processing
-                transaction_strings = [json.dumps(tx, default=str) for tx in transaction_details]
+        if transaction_details:
+            if sink is not None:
+                logging.info(f"Transaction log: {sink.written} transactions appended to {config.TX_LOG_DIR} so far.")
 
-                # Execute the log search
-                matching_logs = search_logs(transaction_strings, config.LOG_SEARCH_TERMS)
+            with METRICS.stage("search_logs"):
+                # Execute the log search (every rule over the whole batch in one pass)
+                matching_logs = search_logs(transaction_records, rules, account=config.HARDCODED_ACCOUNT)
+            METRICS.note("matches", len(matching_logs))
+            METRICS.note("rules_fired", fired_rules(matching_logs))
 
-                # Output the log search results
-                if matching_logs:
-                    logging.info("\nMatching Log Messages:")
+            # Output the log search results
+            if matching_logs:
+                with METRICS.stage("decode_fills"):
+                    # Decode the Drift fill events of the matched transactions
+                    matched = {match['signature'] for match in matching_logs}
+                    fills = decode_fill_events(
+                        [record for record in transaction_records if record['signature'] in matched],
+                        accounts=[config.HARDCODED_ACCOUNT]
+                    )
+                    attach_fills(matching_logs, fills)
+                    statuses = {entry['signature']: entry.get('confirmationStatus') for entry in entries}
                     for match in matching_logs:
-                        logging.info(f"Slot: {match['slot']}")
-                        logging.info(f"Signature: {match['signature']}")
-                        logging.info(f"Block Time: {match['block_time']}")
-                        logging.info(f"Found Term: {match['found_term']}")
-                        logging.info(f"Log Message: {match['log']}")
-                        logging.info("-" * 80)
-                    # Play a sound
-                    play_sequence()
-                    # Send an email
-                    send_email_notification()
-                else:
-                    logging.info("No matching log messages found.")
+                        match['account'] = config.HARDCODED_ACCOUNT
+                        match['confirmation_status'] = statuses.get(match['signature'])
+                with METRICS.stage("notify"):
+                    report_matches(matching_logs, dispatcher, store, dedup, tracker)
             else:
-                logging.info("No transaction details to display.")
+                logging.info("No matching log messages found.")
         else:
-            logging.info("No signatures to inspect.")
-    except Exception as e:
-        logging.error(f"An error occurred during the cycle: {e}")
+            logging.info("No transaction details to display.")
+    else:
+        logging.info("No signatures to inspect.")
+
+    # Only move the cursor once the whole delta went through the cycle
+    if new_signatures and pending is None:
+        # Without a retry queue, never move past a signature whose transaction was not fetched
+        fetched = {record['signature'] for record in transaction_records}
+        inspected = set(signatures)
+        missing = next((i for i, entry in enumerate(new_signatures)
+                        if entry['signature'] in inspected and entry['signature'] not in fetched), None)
+        if missing is not None:
+            logging.warning(f"{len(new_signatures) - missing} signatures from {new_signatures[missing]['signature'][:15]} "
+                            f"on are fetched again next cycle.")
+            new_signatures = new_signatures[:missing]
+    if new_signatures:
+        cursor_store.advance(config.HARDCODED_ACCOUNT, new_signatures[-1]['signature'], new_signatures[-1]['slot'])
 
 
 # ==================== Periodic Runs Orquestrator Function ====================
 # =============================================================================
 
 async def periodic_runner(args):
-    while True:
-        logging.info("Starting a new cycle of transaction inspection.")
-        await run_cycle(args)
-        logging.info(f"Cycle completed. Sleeping for {config.FREQUENCY_SECONDS} seconds.\n")
-        await asyncio.sleep(config.FREQUENCY_SECONDS)
+    cursor_store = SignatureCursorStore(config.CURSOR_STORE_PATH)
+    cache = build_transaction_cache()
+    limiter = build_rate_limiter(args)
+    sink = build_transaction_sink()
+    dispatcher = build_dispatcher()
+    store = build_fill_store()
+    dedup = build_alert_dedup()
+    rules = build_log_rules()
+    await start_metrics_server(args)
+
+    async with build_endpoint_pool(args) as pool:
+        client = shared_client(pool, limiter)
+
+        accounts = watched_accounts(args)
+        if accounts:
+            logging.info(f"Watching {len(accounts)} accounts over one shared connection pool.")
+            async with MultiAccountWatcher(
+                accounts,
+                args.rpc_override,
+                cursor_store,
+                rules,
+                max_concurrency=args.max_concurrency,
+                workers=args.workers,
+                batch_size=args.batch_size,
+                cache=cache,
+                limiter=limiter,
+                client=client,
+                sink=sink,
+                interval_seconds=config.FREQUENCY_SECONDS,
+                max_catchup=config.CURSOR_MAX_CATCHUP,
+                retry_queue=build_retry_queue(config.WATCHER_PENDING_SIGNATURES_PATH),
+                commitment=args.commitment,
+                max_age_seconds=config.SIGNATURE_MAX_AGE_SECONDS
+            ) as watcher:
+                # Alerts sent before finalization are re-verified, as on the single-account path
+                tracker = build_finality_tracker(args, client, dispatcher, store)
+                await watcher.run_forever(functools.partial(report_matches, dispatcher=dispatcher, store=store,
+                                                            dedup=dedup, tracker=tracker))
+            return
+
+        pending = build_retry_queue()
+        tracker = build_finality_tracker(args, client, dispatcher, store)
+        if not (args.sequential or args.before_sig or args.include_test_sigs):
+            pipeline = CyclePipeline(
+                config.HARDCODED_ACCOUNT,
+                cursor_store,
+                client,
+                rules,
+                functools.partial(report_matches, dispatcher=dispatcher, store=store, dedup=dedup, tracker=tracker),
+                interval_seconds=config.FREQUENCY_SECONDS,
+                workers=args.workers,
+                batch_size=args.batch_size,
+                cache=cache,
+                limiter=limiter,
+                sink=sink,
+                max_pending=config.PIPELINE_MAX_PENDING_BATCHES,
+                max_catchup=config.CURSOR_MAX_CATCHUP,
+                metrics_json=args.metrics_json,
+                commitment=args.commitment,
+                retry_queue=pending,
+                max_age_seconds=config.SIGNATURE_MAX_AGE_SECONDS
+            )
+            await pipeline.run_forever()
+            return
+
+        # Cycles start on a fixed cadence, however long the previous one took
+        ticker = FixedRateTicker(config.FREQUENCY_SECONDS)
+        while True:
+            logging.info("Starting a new cycle of transaction inspection.")
+            await run_cycle(args, cursor_store, cache, limiter, client, sink, dispatcher, store, dedup, pending, tracker, rules)
+            logging.info(f"Endpoint pool: {pool.stats()}")
+            logging.info(f"Cycle completed. Next cycle in {ticker.remaining():.1f} seconds.\n")
+            await ticker.wait()
+
+
+# ==================== Streaming Runner Function ====================
+# ===================================================================
+
+async def streaming_runner(args):
+    # Only streaming needs the websocket stack
+    from stream_logs import LogStreamer, ws_url_from_rpc
+    from solders.commitment_config import CommitmentLevel
+
+    cursor_store = SignatureCursorStore(config.CURSOR_STORE_PATH)
+    accounts = watched_accounts(args) or [config.HARDCODED_ACCOUNT]
+    limiter = build_rate_limiter(args)
+    dispatcher = build_dispatcher()
+    store = build_fill_store()
+    await start_metrics_server(args)
+    async with build_endpoint_pool(args) as pool:
+        client = shared_client(pool, limiter)
+        # Streamed logs are confirmed, so their alerts are re-verified at finalized as well
+        tracker = build_finality_tracker(args, client, dispatcher, store)
+        streamer = LogStreamer(
+            args.ws_url or ws_url_from_rpc(args.rpc_override),
+            args.rpc_override,
+            accounts,
+            cursor_store,
+            build_log_rules(),
+            functools.partial(report_matches, dispatcher=dispatcher, store=store, dedup=build_alert_dedup(),
+                              tracker=tracker),
+            include_program=args.stream_program,
+            commitment=CommitmentLevel.Finalized if args.commitment == "finalized" else CommitmentLevel.Confirmed,
+            workers=args.workers,
+            batch_size=args.batch_size,
+            cache=build_transaction_cache(),
+            limiter=limiter,
+            client=client,
+            sink=build_transaction_sink(),
+            record_path=args.record_stream or None
+        )
+        logging.info(f"Streaming logs for {len(accounts)} accounts.")
+        await streamer.run_forever()
 
 
 # ==================== MAIN Function: Putting it all together ====================
@@ -114,7 +479,10 @@ def main():
     args = parse_arguments()
 
     try:
-        asyncio.run(periodic_runner(args))
+        if args.stream:
+            asyncio.run(streaming_runner(args))
+        else:
+            asyncio.run(periodic_runner(args))
     except KeyboardInterrupt:
         logging.info("Operation cancelled by user. Exiting gracefully.")
     except Exception as e:
@@ -130,4 +498,16 @@ if __name__ == "__main__":
 # For standard use just use:
 # python main.py
 
+# To get alerts as soon as logs land instead of every FREQUENCY_SECONDS:
+# python main.py --stream
+
+# To watch several subaccounts plus the whale list from one process:
+# python main.py --accounts "SubAccount1,SubAccount2" --watch_whales --max_concurrency 8
+
+# To run whole cycles one after another instead of the pipelined scheduler:
+# python main.py --sequential
+
+# To expose Prometheus metrics and keep a per-cycle JSON summary:
+# python main.py --metrics_port 9108 --metrics_json cycle_metrics.ndjson
+
 # =================================================
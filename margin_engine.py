@@ -0,0 +1,342 @@
+import math
+import numpy as np
+from driftpy.types import is_variant
+from driftpy.accounts import DataAndSlot
+from driftpy.drift_user import DriftUser
+from driftpy.drift_client import AccountSubscriptionConfig
+from driftpy.math.margin import MarginCategory, calculate_scaled_initial_asset_weight
+from driftpy.constants.numeric_constants import (
+    AMM_RESERVE_PRECISION, BASE_PRECISION, PRICE_PRECISION, QUOTE_PRECISION, FUNDING_RATE_BUFFER,
+    MARGIN_PRECISION, SPOT_WEIGHT_PRECISION, SPOT_MARKET_WEIGHT_PRECISION, SPOT_IMF_PRECISION,
+    QUOTE_SPOT_MARKET_INDEX, OPEN_ORDER_MARGIN_REQUIREMENT, MAX_PREDICTION_PRICE,
+)
+
+# ==================== Batched Per-Slot Margin Engine ====================
+# Computes the all_user_stats metrics (leverage, spot/perp liability, initial margin
+# requirement, spot value, unrealized pnl) for every user at once:
+#   - every user's 8 perp and 8 spot position slots are laid out as (users x slots) arrays,
+#   - market and oracle values are gathered per slot by market index,
+#   - driftpy's formulas are applied to the whole arrays, and the sums run slot by slot
+#     (a loop over the 8 slots, not over users).
+# The arrays are dtype=object: balances times cumulative interest and funding products
+# overflow int64, so numpy still does Python int/float arithmetic per element. The speedup
+# comes from building no DriftUser per user and looking every market/oracle up once.
+# Slots are summed in driftpy's order, so every result is identical to the per-user path
+# (user_stats_row), which is still used for the rare users the batch does not model
+# (LP shares, spot orders).
+# ===============================================================
+
+STAT_COLUMNS = ['leverage', 'spot_liability', 'perp_liability', 'margin_requirement', 'spot_value', 'upnl']
+
+_int = np.frompyfunc(int, 1, 1)
+_ceil = np.frompyfunc(math.ceil, 1, 1)
+
+
+def _max(a, b):
+    # Python max(a, b): the first argument wins ties
+    return np.where(b > a, b, a)
+
+
+def _min(a, b):
+    return np.where(b < a, b, a)
+
+
+def _div_ceil(a, b):
+    return np.where(a % b > 0, a // b + 1, a // b)
+
+
+# is_variant() formats the enum on every call; the answer only depends on its class
+_BORROW_BY_KIND = {}
+
+
+def _is_borrow(balance_type):
+    kind = type(balance_type)
+    if kind not in _BORROW_BY_KIND:
+        _BORROW_BY_KIND[kind] = is_variant(balance_type, "Borrow")
+    return _BORROW_BY_KIND[kind]
+
+
+def _field(positions, name):
+    return np.array([[getattr(p, name) for p in slots] for slots in positions], dtype=object)
+
+
+# ---------- per-user reference path ----------
+def _leverage(chu, spot_value, spot_liab, perp_liab):
+    # DriftUser.get_leverage(include_open_orders=False), with the perp liability of every position
+    total_asset = spot_value + chu.get_unrealized_pnl(True)
+    total_liab = spot_liab + perp_liab
+    net_asset = total_asset - spot_liab
+    if net_asset == 0:
+        return 0
+    return (total_liab * 10_000) // net_asset
+
+
+def user_stats_row(drift_client, user, only_one_index=None):
+    """
+    The six stats of one user (a program account with .public_key and a decoded User .account),
+    computed through DriftUser against drift_client's cache.
+    """
+    chu = DriftUser(drift_client, user_public_key=user.public_key,
+                    account_subscription=AccountSubscriptionConfig("cached"))
+    chu.account_subscriber.user_and_slot = DataAndSlot(0, user.account)
+
+    spot_liab = chu.get_spot_market_liability_value(None, None, None, False)
+    perp_liab = chu.get_total_perp_position_liability(None, 0, False)
+    margin_req = chu.get_margin_requirement(MarginCategory.INITIAL, None)
+    spot_value = chu.get_spot_market_asset_value(None, None, False)
+    upnl = chu.get_unrealized_pnl(True, only_one_index, None)
+    leverage = _leverage(chu, spot_value, spot_liab, perp_liab)
+
+    return [leverage / MARGIN_PRECISION, spot_liab / QUOTE_PRECISION, perp_liab / QUOTE_PRECISION,
+            margin_req / QUOTE_PRECISION, spot_value / QUOTE_PRECISION, upnl / QUOTE_PRECISION]
+
+
+def needs_per_user_path(account):
+    """
+    LP shares (settled against the AMM) and open spot orders (fill simulation) are not batched.
+    """
+    if any(p.lp_shares > 0 for p in account.perp_positions):
+        return True
+    return any((p.open_bids != 0 or p.open_asks != 0) and (p.scaled_balance != 0 or p.open_orders != 0)
+               for p in account.spot_positions)
+
+
+# ---------- market tables ----------
+def _perp_tables(drift_client, indexes):
+    size = max(indexes, default=0) + 1
+    price, prediction, settlement, imf, mri, funding_long, funding_short = ([0] * size for _ in range(7))
+    for i in indexes:
+        market = drift_client.get_perp_market_account(i)
+        price[i] = drift_client.get_oracle_price_data_for_perp_market(i).price
+        settlement[i] = is_variant(market.status, "Settlement")
+        if settlement[i]:
+            price[i] = market.expiry_price
+        prediction[i] = is_variant(market.contract_type, "Prediction")
+        imf[i] = market.imf_factor
+        mri[i] = market.margin_ratio_initial
+        funding_long[i] = market.amm.cumulative_funding_rate_long
+        funding_short[i] = market.amm.cumulative_funding_rate_short
+    table = dict(price=price, imf=imf, mri=mri, funding_long=funding_long, funding_short=funding_short)
+    table = {k: np.array(v, dtype=object) for k, v in table.items()}
+    table["prediction"] = np.array(prediction, dtype=bool)
+    table["settlement"] = np.array(settlement, dtype=bool)
+    return table
+
+
+def _spot_tables(drift_client, indexes):
+    size = max(indexes, default=0) + 1
+    price, precision, token_precision, cdi, cbi, imf, iaw, ilw = ([1] * size for _ in range(8))
+    for i in indexes:
+        market = drift_client.get_spot_market_account(i)
+        price[i] = drift_client.get_oracle_price_data_for_spot_market(i).price
+        precision[i] = 10 ** market.decimals
+        token_precision[i] = 10 ** (19 - market.decimals)
+        cdi[i] = market.cumulative_deposit_interest
+        cbi[i] = market.cumulative_borrow_interest
+        imf[i] = market.imf_factor
+        iaw[i] = calculate_scaled_initial_asset_weight(market, price[i])
+        ilw[i] = market.initial_liability_weight
+    table = dict(price=price, precision=precision, token_precision=token_precision, cdi=cdi, cbi=cbi,
+                 imf=imf, iaw=iaw, ilw=ilw)
+    return {k: np.array(v, dtype=object) for k, v in table.items()}
+
+
+# ---------- driftpy math over (users x slots) ----------
+def _perp_liability(base, price, prediction):
+    # calculate_perp_liability_value
+    regular = (np.abs(base) * price) // BASE_PRECISION
+    long_prediction = (base * price) // BASE_PRECISION
+    short_prediction = (np.abs(base) * (MAX_PREDICTION_PRICE - price)) // BASE_PRECISION
+    return np.where(prediction, np.where(base > 0, long_prediction, short_prediction), regular)
+
+
+def _size_premium(size, imf, weight, precision):
+    # calculate_size_premium_liability_weight; driftpy takes a float square root here (size ** 0.5),
+    # not an integer one, so the same float is used for identical results
+    size_sqrt = (np.abs(size) * 10 + 1) ** 0.5
+    premium = weight - (weight // 5) + ((size_sqrt * imf) // ((100_000 * SPOT_IMF_PRECISION) // precision))
+    return np.where(imf == 0, weight, _max(weight, premium))
+
+
+def _size_discount(size, imf, weight):
+    # calculate_size_discount_asset_weight
+    size_sqrt = _ceil((np.abs(size) * 10) ** 0.5) + 1
+    imf_num = SPOT_IMF_PRECISION + (SPOT_IMF_PRECISION / 10)
+    discount = _ceil(imf_num * SPOT_WEIGHT_PRECISION / (SPOT_IMF_PRECISION + size_sqrt * imf / 100_000))
+    return np.where(imf == 0, weight, _min(weight, discount))
+
+
+def _size_in_amm(amount, precision):
+    return np.where(precision > AMM_RESERVE_PRECISION,
+                    amount / (precision / AMM_RESERVE_PRECISION),
+                    amount * AMM_RESERVE_PRECISION / precision)
+
+
+def _token_value(amount, price, precision):
+    # get_strict_token_value without a twap: min() == max() == current price
+    return np.where(amount == 0, 0, (amount * price) // precision)
+
+
+def _accumulate(values, mask):
+    # Slot by slot, like driftpy's loops, so float rounding happens in the same order
+    total = np.zeros(values.shape[0], dtype=object)
+    for j in range(values.shape[1]):
+        total = total + np.where(mask[:, j], values[:, j], 0)
+    return total
+
+
+def _net_quote(asset, liab, net_quote):
+    positive = net_quote > 0
+    return np.where(positive, asset + net_quote, asset), np.where(positive, liab, liab + np.abs(net_quote))
+
+
+# ---------- batch ----------
+class PositionLayout:
+    """
+    The users' position slots as (users x slots) arrays. Nothing here depends on prices,
+    so one layout serves every oracle scenario of the same users.
+    """
+    def __init__(self, users):
+        self.users = users
+        self.fallback = [i for i, user in enumerate(users) if needs_per_user_path(user.account)]
+        skip = set(self.fallback)
+        self.batched = [i for i in range(len(users)) if i not in skip]
+        accounts = [users[i].account for i in self.batched]
+        count = len(accounts)
+        perps = [a.perp_positions for a in accounts]
+        spots = [a.spot_positions for a in accounts]
+        self.max_margin_ratio = np.array([a.max_margin_ratio for a in accounts], dtype=object)[:, None]
+
+        (self.base, self.quote, self.open_bids, self.open_asks, self.open_orders, lp_shares,
+         self.last_funding) = (_field(perps, name) for name in (
+            "base_asset_amount", "quote_asset_amount", "open_bids", "open_asks", "open_orders", "lp_shares",
+            "last_cumulative_funding_rate"))
+        self.perp_index = np.array([[p.market_index for p in slots] for slots in perps], dtype=np.int64).reshape(count, -1)
+        self.active = (self.base != 0) | (self.quote != 0) | (self.open_orders != 0) | (lp_shares != 0)
+
+        self.scaled, self.spot_orders = _field(spots, "scaled_balance"), _field(spots, "open_orders")
+        self.borrow = np.array([[_is_borrow(p.balance_type) for p in slots] for slots in spots], dtype=bool).reshape(count, -1)
+        self.spot_index = np.array([[p.market_index for p in slots] for slots in spots], dtype=np.int64).reshape(count, -1)
+        self.spot_active = (self.scaled != 0) | (self.spot_orders != 0)
+
+
+def batch_stat_rows(drift_client, layout, only_one_index=None):
+    """
+    Stats rows (as user_stats_row) for the layout's batched users, in layout.batched order.
+    """
+    if not layout.batched:
+        return []
+    users = len(layout.batched)
+    max_margin_ratio = layout.max_margin_ratio
+    quote_price = drift_client.get_oracle_price_data_for_spot_market(QUOTE_SPOT_MARKET_INDEX).price
+
+    # perp positions
+    base, quote, open_orders, perp_index = layout.base, layout.quote, layout.open_orders, layout.perp_index
+    active = layout.active
+    market = _perp_tables(drift_client, sorted(set(perp_index.ravel().tolist())))
+    price = market["price"][perp_index]
+    prediction = market["prediction"][perp_index]
+
+    perp_liab = _accumulate(_perp_liability(base, price, prediction), active)
+
+    # initial margin: worst case of all bids / all asks filling
+    all_bids, all_asks = base + layout.open_bids, base + layout.open_asks
+    bids_liab = _perp_liability(all_bids, price, prediction)
+    asks_liab = _perp_liability(all_asks, price, prediction)
+    take_asks = asks_liab >= bids_liab
+    worst_base = np.where(take_asks, all_asks, all_bids)
+    worst_liab = np.where(take_asks, asks_liab, bids_liab)
+    margin_ratio = _max(_size_premium(np.abs(worst_base), market["imf"][perp_index], market["mri"][perp_index],
+                                      MARGIN_PRECISION), max_margin_ratio)
+    margin_ratio = np.where(market["settlement"][perp_index], 0, margin_ratio)
+    weighted = worst_liab * quote_price // PRICE_PRECISION * margin_ratio // MARGIN_PRECISION
+    weighted = weighted + open_orders * OPEN_ORDER_MARGIN_REQUIREMENT
+    perp_margin = _accumulate(weighted, active)
+
+    # unrealized pnl (with funding), every slot
+    base_value = (np.abs(base) * price) // AMM_RESERVE_PRECISION
+    sign = np.where(base < 0, -1, 1)
+    funding = np.where(base > 0, market["funding_long"][perp_index], market["funding_short"][perp_index])
+    funding_pnl = (funding - layout.last_funding) * base / AMM_RESERVE_PRECISION / FUNDING_RATE_BUFFER * -1
+    pnl = np.where(base == 0, quote, base_value * sign + quote + funding_pnl)
+    pnl = (pnl * quote_price) // PRICE_PRECISION
+    all_slots = np.ones(pnl.shape, dtype=bool)
+    upnl_all = _accumulate(pnl, all_slots)
+    upnl = upnl_all if only_one_index is None else _accumulate(pnl, perp_index == only_one_index)
+
+    # spot positions
+    scaled, spot_orders, borrow = layout.scaled, layout.spot_orders, layout.borrow
+    spot_index, spot_active = layout.spot_index, layout.spot_active
+    spot = _spot_tables(drift_client, sorted(set(spot_index.ravel().tolist())))
+    s_price, s_precision = spot["price"][spot_index], spot["precision"][spot_index]
+    token_precision = spot["token_precision"][spot_index]
+
+    amount = np.where(borrow, _div_ceil(scaled * spot["cbi"][spot_index], token_precision),
+                      _int((scaled * spot["cdi"][spot_index]) / token_precision))
+    amount = np.where(borrow, -np.abs(amount), amount)
+    value = _token_value(amount, s_price, s_precision)
+    is_quote = spot_index == QUOTE_SPOT_MARKET_INDEX
+
+    # spot value / liability: unweighted, open orders excluded
+    net_quote = np.zeros(users, dtype=object)
+    spot_value = np.zeros(users, dtype=object)
+    spot_liab = np.zeros(users, dtype=object)
+    for j in range(amount.shape[1]):
+        quote_slot = spot_active[:, j] & is_quote[:, j]
+        base_slot = spot_active[:, j] & ~is_quote[:, j]
+        v, b = value[:, j], borrow[:, j]
+        net_quote = np.where(quote_slot & b, net_quote - np.abs(v), np.where(quote_slot & ~b, net_quote + v, net_quote))
+        spot_liab = np.where(base_slot & b, spot_liab + np.abs(v), spot_liab)
+        spot_value = np.where(base_slot & ~b, spot_value + v, spot_value)
+    spot_value, spot_liab = _net_quote(spot_value, spot_liab, net_quote)
+
+    # spot initial margin liability: weighted, open orders included
+    size = _size_in_amm(amount, s_precision)
+    liab_weight = _size_premium(size, spot["imf"][spot_index], spot["ilw"][spot_index], SPOT_WEIGHT_PRECISION)
+    liab_weight = np.where(is_quote, liab_weight, _max(liab_weight, SPOT_MARKET_WEIGHT_PRECISION + max_margin_ratio))
+    asset_weight = _size_discount(size, spot["imf"][spot_index], spot["iaw"][spot_index])
+    custom_weight = SPOT_MARKET_WEIGHT_PRECISION - max_margin_ratio
+    custom_weight = np.where(custom_weight > 0, custom_weight, 0)
+    asset_weight = np.where(is_quote, asset_weight, _min(asset_weight, custom_weight))
+    weighted_liab = (value * liab_weight) // SPOT_MARKET_WEIGHT_PRECISION
+    weighted_asset = (value * asset_weight) // SPOT_MARKET_WEIGHT_PRECISION
+
+    net_quote = np.zeros(users, dtype=object)
+    margin_asset = np.zeros(users, dtype=object)
+    spot_margin = np.zeros(users, dtype=object)
+    for j in range(amount.shape[1]):
+        quote_slot = spot_active[:, j] & is_quote[:, j]
+        base_slot = spot_active[:, j] & ~is_quote[:, j]
+        b = borrow[:, j]
+        net_quote = np.where(quote_slot & b, net_quote - np.abs(weighted_liab[:, j]),
+                             np.where(quote_slot & ~b, net_quote + weighted_asset[:, j], net_quote))
+        margin_asset = np.where(base_slot & (amount[:, j] > 0), margin_asset + weighted_asset[:, j], margin_asset)
+        spot_margin = np.where(base_slot & (amount[:, j] < 0), spot_margin + np.abs(weighted_liab[:, j]), spot_margin)
+        spot_margin = np.where(base_slot, spot_margin + spot_orders[:, j] * OPEN_ORDER_MARGIN_REQUIREMENT, spot_margin)
+    margin_asset, spot_margin = _net_quote(margin_asset, spot_margin, net_quote)
+
+    # leverage (include_open_orders=False)
+    total_asset = spot_value + upnl_all
+    total_liab = spot_liab + perp_liab
+    net_asset = total_asset - spot_liab
+    zero = net_asset == 0
+    leverage = np.where(zero, 0, (total_liab * 10_000) // np.where(zero, 1, net_asset))
+
+    margin_req = perp_margin + spot_margin
+    columns = [leverage / MARGIN_PRECISION, spot_liab / QUOTE_PRECISION, perp_liab / QUOTE_PRECISION,
+               margin_req / QUOTE_PRECISION, spot_value / QUOTE_PRECISION, upnl / QUOTE_PRECISION]
+    return [list(row) for row in zip(*(c.tolist() for c in columns))]
+
+
+def all_stat_rows(drift_client, users, only_one_index=None, layout=None):
+    """
+    Stats rows for every user (program accounts), batched where possible, in input order.
+    Pass a PositionLayout of the same users to skip the layout step.
+    """
+    layout = layout if layout is not None else PositionLayout(users)
+    rows = [None] * len(users)
+    for i in layout.fallback:
+        rows[i] = user_stats_row(drift_client, users[i], only_one_index)
+    for i, row in zip(layout.batched, batch_stat_rows(drift_client, layout, only_one_index)):
+        rows[i] = row
+    return rows
@@ -0,0 +1,412 @@
+import os
+import re
+import json
+import time
+import asyncio
+import logging
+import argparse
+from numbers import Number
+import numpy as np
+import pandas as pd
+
+import config
+from helpers import PERP_MARKET_SECTIONS, SPOT_MARKET_SECTIONS, market_rows, section_rules, scale_columns
+
+# ==================== Market History Recorder ====================
+# Snapshots every perp and spot market on a schedule into an append-only columnar store:
+#   <directory>/perp/ and <directory>/spot/, each holding chunk directories
+#   (chunk-000001/, ...) with one .npy file per column, plus index.ndjson, one line per
+#   chunk: its row count, time range and how each column is encoded.
+# A row is one market at one snapshot: "ts" (unix ms), "slot" and the unscaled fields,
+# named as in serialize_perp_markets / serialize_spot_markets. Inside a chunk rows are
+# ordered by market, then time, and each column is stored as the smallest of:
+#   - const: a single value in the index (flags, static parameters),
+#   - dict:  uint8/16/32 codes into a value list (enums, pubkeys, names, step values),
+#   - delta: per-market differences in the narrowest int dtype, plus each market's first
+#            value (reserves, cumulative funding, TWAPs, open interest, ts, slot),
+#   - raw:   plain int64/float64/bool.
+# Reads memory-map only the chunks overlapping the time range and only the requested
+# columns, so the history never has to fit in memory.
+# Rows waiting for their chunk are also appended to <kind>/spill.ndjson as they arrive, so
+# a crash loses none of them: the next ColumnStore picks them up and writes them with its
+# first chunk, after which the spill file is emptied.
+# =================================================================
+
+CHUNK_PATTERN = re.compile(r"^chunk-(\d{6})$")
+KINDS = {
+    "perp": (PERP_MARKET_SECTIONS, "market.market_index", None),
+    "spot": (SPOT_MARKET_SECTIONS, "spot_market.market_index", "spot_market.decimals"),
+}
+INT_DTYPES = [np.int8, np.int16, np.int32, np.int64]
+CODE_DTYPES = [np.uint8, np.uint16, np.uint32]
+
+
+def storable(value):
+    """
+    Account field -> int/float/bool/str, or None for fields that are not recorded (padding).
+    """
+    if isinstance(value, (bool, int, float, str)):
+        return value
+    if isinstance(value, list):
+        # Only the name byte arrays are worth keeping
+        return None
+    if type(value).__name__ == "Pubkey":
+        return str(value)
+    return type(value).__name__  # enum variant, e.g. MarketStatus.Active() -> "Active"
+
+
+def _narrowest(dtypes, low, high):
+    for dtype in dtypes:
+        info = np.iinfo(dtype)
+        if info.min <= low and high <= info.max:
+            return dtype
+    return None
+
+
+def _to_ms(moment):
+    # Unix seconds, or anything pd.Timestamp accepts (naive means UTC)
+    if moment is None:
+        return None
+    if isinstance(moment, Number):
+        return int(moment * 1000)
+    moment = pd.Timestamp(moment)
+    if moment.tzinfo is None:
+        moment = moment.tz_localize("UTC")
+    return moment.value // 1_000_000
+
+
+class ColumnStore:
+    """
+    Append-only chunked column files for one market kind. Appended rows are buffered in
+    memory (and in the spill file) until flush() writes them as one chunk.
+    """
+    def __init__(self, directory, key_column):
+        self.directory = directory
+        self.key_column = key_column
+        os.makedirs(directory, exist_ok=True)
+        self.index_path = os.path.join(directory, "index.ndjson")
+        self.chunks = self._load_index()
+        # Orphaned chunk directories (a crash before the index line) are never reused
+        existing = [m for m in map(CHUNK_PATTERN.match, os.listdir(directory)) if m]
+        self._chunk_number = max((int(m.group(1)) for m in existing), default=0)
+        self.spill_path = os.path.join(directory, "spill.ndjson")
+        self._rows = []
+        self._columns = None
+        self._recover_spill()
+
+    def _recover_spill(self):
+        # Rows buffered by a process that died before flushing; those already in a chunk are skipped
+        if not os.path.exists(self.spill_path):
+            return
+        written = max((entry["ts_max"] for entry in self.chunks), default=None)
+        with open(self.spill_path, "r") as f:
+            for line in f:
+                try:
+                    row = json.loads(line)
+                except ValueError:
+                    # A torn last line after a crash
+                    continue
+                if written is not None and row["ts"] <= written:
+                    continue
+                if self._columns is None:
+                    self._columns = list(row)
+                self._rows.append(row)
+        if self._rows:
+            logging.info(f"Recovered {len(self._rows)} unflushed rows from {self.spill_path}")
+
+    def _load_index(self):
+        chunks = []
+        if os.path.exists(self.index_path):
+            with open(self.index_path, "r") as f:
+                for line in f:
+                    try:
+                        chunks.append(json.loads(line))
+                    except ValueError:
+                        # A torn last line after a crash; that chunk is simply not indexed
+                        continue
+        return chunks
+
+    def refresh(self):
+        """
+        Re-reads the index, picking up chunks written by another process.
+        """
+        self.chunks = self._load_index()
+
+    def append(self, rows):
+        """
+        Buffers {column: value} rows (all rows of one snapshot share their columns).
+        """
+        if not rows:
+            return
+        columns = list(rows[0])
+        if self._columns is not None and columns != self._columns:
+            # A new account layout starts a new chunk
+            self.flush()
+        self._columns = columns
+        self._rows.extend(rows)
+        with open(self.spill_path, "a") as f:
+            f.write("".join(json.dumps(row) + "\n" for row in rows))
+
+    def flush(self):
+        if not self._rows:
+            return
+        rows, columns = self._rows, self._columns
+        self._rows, self._columns = [], None
+
+        # Market-major, then time (rows were appended in time order)
+        keys = np.array([row[self.key_column] for row in rows])
+        order = np.argsort(keys, kind="stable")
+        keys = keys[order]
+        starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+        runs = np.diff(np.r_[starts, len(keys)]).tolist()
+
+        self._chunk_number += 1
+        name = f"chunk-{self._chunk_number:06d}"
+        tmp = os.path.join(self.directory, "." + name)
+        os.makedirs(tmp, exist_ok=True)
+        encodings = {}
+        for column in columns:
+            values = [rows[i][column] for i in order]
+            encoding, array = self._encode(values, starts)
+            if array is not None:
+                np.save(os.path.join(tmp, f"{column}.npy"), array)
+            encodings[column] = encoding
+        os.replace(tmp, os.path.join(self.directory, name))
+
+        ts = [row["ts"] for row in rows]
+        entry = {"chunk": name, "rows": len(rows), "ts_min": min(ts), "ts_max": max(ts),
+                 "runs": runs, "columns": encodings}
+        with open(self.index_path, "a") as f:
+            f.write(json.dumps(entry) + "\n")
+        self.chunks.append(entry)
+        # The chunk is indexed, so its rows no longer need the spill file
+        open(self.spill_path, "w").close()
+        logging.info(f"Wrote {name} to {self.directory}: {len(rows)} rows, {len(columns)} columns")
+
+    @staticmethod
+    def _encode(values, starts):
+        distinct = set(values)
+        if len(distinct) == 1:
+            return {"encoding": "const", "value": values[0]}, None
+        first = values[0]
+        if isinstance(first, (bool, float)):
+            return {"encoding": "raw"}, np.array(values, dtype=float if isinstance(first, float) else bool)
+
+        code_dtype = _narrowest(CODE_DTYPES, 0, len(distinct) - 1)
+        if isinstance(first, int):
+            low, high = min(values), max(values)
+            if low >= -2 ** 63 and high < 2 ** 63 and high - low < 2 ** 63:
+                array = np.array(values, dtype=np.int64)
+                deltas = np.zeros_like(array)
+                deltas[1:] = np.diff(array)
+                deltas[starts] = 0
+                delta_dtype = _narrowest(INT_DTYPES, int(deltas.min()), int(deltas.max()))
+                candidates = [(8, 0, "raw"), (np.dtype(delta_dtype).itemsize, 2, "delta")]
+                if code_dtype is not None:
+                    candidates.append((np.dtype(code_dtype).itemsize, 1, "dict"))
+                _, _, encoding = min(candidates)
+                if encoding == "raw":
+                    return {"encoding": "raw"}, array
+                if encoding == "delta":
+                    return {"encoding": "delta", "bases": array[starts].tolist()}, deltas.astype(delta_dtype)
+            # Wider than int64 (u128 / i128 fields): kept exact as a dictionary of Python ints
+
+        lookup = sorted(distinct)
+        codes = {value: code for code, value in enumerate(lookup)}
+        return {"encoding": "dict", "values": lookup}, np.fromiter((codes[v] for v in values), code_dtype, len(values))
+
+    def close(self):
+        self.flush()
+
+    # ---------- reads ----------
+    def _column(self, entry, column, mask):
+        spec = entry["columns"].get(column)
+        if spec is None:
+            # Not recorded in this chunk (an older or newer account layout)
+            return np.full(int(mask.sum()), None, dtype=object)
+        if spec["encoding"] == "const":
+            return np.full(int(mask.sum()), spec["value"])
+        stored = np.load(os.path.join(self.directory, entry["chunk"], f"{column}.npy"), mmap_mode="r")
+        if spec["encoding"] == "raw":
+            return np.asarray(stored[mask])
+        if spec["encoding"] == "dict":
+            values = spec["values"]
+            try:
+                lookup = np.array(values, dtype=np.int64) if isinstance(values[0], int) else np.array(values, dtype=object)
+            except OverflowError:
+                lookup = np.array(values, dtype=object)
+            return lookup[stored[mask]]
+        # delta: a cumulative sum restarted at every market's first row
+        run_lengths = np.array(entry["runs"])
+        starts = np.r_[0, np.cumsum(run_lengths)[:-1]]
+        totals = np.cumsum(stored, dtype=np.int64)
+        offsets = np.repeat(np.array(spec["bases"], dtype=np.int64) - totals[starts], run_lengths)
+        return (totals + offsets)[mask]
+
+    def read(self, columns=None, start=None, end=None, markets=None):
+        """
+        Rows with start <= ts < end (unix ms) of `markets` (market indexes), restricted to
+        `columns` (always with ts, slot and the market index). Unscaled values.
+        """
+        wanted = ["ts", "slot", self.key_column]
+        for column in columns or []:
+            if column not in wanted:
+                wanted.append(column)
+        frames = []
+        for entry in self.chunks:
+            if (start is not None and entry["ts_max"] < start) or (end is not None and entry["ts_min"] >= end):
+                continue
+            everything = np.ones(entry["rows"], dtype=bool)
+            mask = everything
+            ts = self._column(entry, "ts", everything)
+            if start is not None:
+                mask = mask & (ts >= start)
+            if end is not None:
+                mask = mask & (ts < end)
+            if markets is not None:
+                mask = mask & np.isin(self._column(entry, self.key_column, everything), list(markets))
+            if not mask.any():
+                continue
+            names = wanted if columns is not None else wanted + [c for c in entry["columns"] if c not in wanted]
+            frames.append(pd.DataFrame({column: self._column(entry, column, mask) for column in names}))
+        if not frames:
+            return pd.DataFrame(columns=wanted)
+        frame = pd.concat(frames, ignore_index=True)
+        return frame.sort_values(["ts", self.key_column], kind="stable", ignore_index=True)
+
+
+class MarketRecorder:
+    """
+    Records all perp and spot markets of a subscribed DriftClient every `interval` seconds.
+    """
+    def __init__(self, drift_client, directory="market_history", interval=10.0, chunk_snapshots=360, refresh=True):
+        self.drift_client = drift_client
+        self.interval = interval
+        self.chunk_snapshots = chunk_snapshots
+        # The cached subscriber only sees new data after a fetch; websocket ones are live already
+        self.refresh = refresh
+        self.stores = {kind: ColumnStore(os.path.join(directory, kind), key)
+                       for kind, (_, key, _) in KINDS.items()}
+        self.snapshots = 0
+
+    async def snapshot(self, ts=None):
+        """
+        Records the current accounts, stamped `ts` (unix ms, default now).
+        """
+        subscriber = self.drift_client.account_subscriber
+        if self.refresh:
+            await subscriber.fetch()
+        ts = int(time.time() * 1000) if ts is None else ts
+        accounts = {"perp": subscriber.get_market_accounts_and_slots(),
+                    "spot": subscriber.get_spot_market_accounts_and_slots()}
+        for kind, (sections, _, _) in KINDS.items():
+            entries = [entry for entry in accounts[kind] if entry is not None]
+            rows = []
+            for entry, fields in zip(entries, market_rows([e.data for e in entries], sections)):
+                row = {"ts": ts, "slot": entry.slot}
+                for column, value in fields.items():
+                    if column.endswith(".name"):
+                        value = bytes(value).decode("utf-8", "replace").strip()
+                    value = storable(value)
+                    if value is not None:
+                        row[column] = value
+                rows.append(row)
+            self.stores[kind].append(rows)
+        self.snapshots += 1
+        if self.snapshots % self.chunk_snapshots == 0:
+            self.flush()
+
+    def flush(self):
+        for store in self.stores.values():
+            store.flush()
+
+    async def run(self, snapshots=None):
+        """
+        Snapshots on a fixed schedule (a slow snapshot shortens the next wait) until cancelled.
+        """
+        loop = asyncio.get_running_loop()
+        next_at = loop.time()
+        taken = 0
+        try:
+            while snapshots is None or taken < snapshots:
+                try:
+                    await self.snapshot()
+                except Exception as e:
+                    logging.error(f"Market snapshot failed: {e}")
+                taken += 1
+                next_at += self.interval
+                await asyncio.sleep(max(0.0, next_at - loop.time()))
+        finally:
+            self.flush()
+
+
+def read_market_history(directory="market_history", kind="perp", start=None, end=None, columns=None,
+                        markets=None, human=True):
+    """
+    Recorded snapshots of `kind` ("perp" or "spot") with start <= ts < end, one row per market
+    per snapshot. `start` / `end` are unix seconds, datetimes or ISO strings (naive means UTC);
+    `columns` selects fields (default all), `markets` market indexes (default all).
+    human=True scales the fields like serialize_perp_markets / serialize_spot_markets and makes
+    ts a UTC datetime.
+    """
+    sections, key, decimals_column = KINDS[kind]
+    store = ColumnStore(os.path.join(directory, kind), key)
+    extra = [decimals_column] if human and decimals_column and columns is not None else []
+    frame = store.read(None if columns is None else list(columns) + extra, _to_ms(start), _to_ms(end), markets)
+    if human:
+        decimals = frame[decimals_column].values if decimals_column in frame.columns else None
+        scale_columns(frame, section_rules(sections), decimals)
+        frame["ts"] = pd.to_datetime(frame["ts"].astype("int64"), unit="ms", utc=True)
+        if extra and decimals_column not in columns:
+            frame = frame.drop(columns=extra)
+    return frame
+
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(description="Record every Drift perp and spot market on a schedule.")
+    parser.add_argument("--rpc_override", type=str, default="https://api.mainnet-beta.solana.com",
+                        help="RPC endpoint to use.")
+    parser.add_argument("--directory", type=str, default=config.MARKET_HISTORY_DIR, help="Column store directory.")
+    parser.add_argument("--interval", type=float, default=config.MARKET_SNAPSHOT_SECONDS,
+                        help="Seconds between snapshots.")
+    parser.add_argument("--chunk_snapshots", type=int, default=config.MARKET_HISTORY_CHUNK_SNAPSHOTS,
+                        help="Snapshots per chunk written to disk.")
+    parser.add_argument("--snapshots", type=int, default=None, help="Stop after this many snapshots.")
+    return parser.parse_args()
+
+
+async def record_markets(args):
+    from anchorpy import Wallet
+    from solana.rpc.async_api import AsyncClient
+    from driftpy.drift_client import DriftClient, AccountSubscriptionConfig
+
+    drift_client = DriftClient(AsyncClient(args.rpc_override), Wallet.dummy(), "mainnet",
+                               account_subscription=AccountSubscriptionConfig("cached"))
+    await drift_client.subscribe()
+    recorder = MarketRecorder(drift_client, args.directory, args.interval, args.chunk_snapshots)
+    try:
+        await recorder.run(args.snapshots)
+    finally:
+        await drift_client.unsubscribe()
+
+
+def main():
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    args = parse_arguments()
+    try:
+        asyncio.run(record_markets(args))
+    except KeyboardInterrupt:
+        logging.info("Market recorder stopped; buffered snapshots were flushed.")
+
+
+if __name__ == "__main__":
+    main()
+
+# ==================== Usage ====================
+# Record every 10 seconds (Ctrl+C flushes what is buffered; a crash leaves it in spill.ndjson):
+# python market_recorder.py --interval 10
+#
+# Funding of SOL-PERP over one afternoon, without loading the rest of the history:
+# read_market_history(kind="perp", start="2024-06-01T12:00", end="2024-06-01T18:00", markets=[0],
+#                     columns=["market.amm.last_funding_rate", "market.amm.base_asset_amount_long"])
+# =================================================
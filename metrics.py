@@ -0,0 +1,295 @@
+import json
+import time
+import asyncio
+import logging
+from bisect import bisect_left
+from contextlib import contextmanager
+
+# ==================== Monitor Metrics ====================
+# One process-wide registry (METRICS) of counters, gauges and histograms:
+#   - drift_monitor_stage_seconds{stage}: run_cycle stages (fetch_signatures,
+#     inspect_transactions, search_logs, decode_fills, notify, cycle),
+#   - drift_monitor_rpc_request_seconds{method,endpoint} and
+#     drift_monitor_rpc_requests_total{method,endpoint,outcome}: every RPC call,
+#   - drift_monitor_rpc_retries_total{reason}: retries after throttling, timeouts and errors,
+#   - drift_monitor_inspect_queue_depth: signatures still queued in inspect_transactions,
+#   - drift_monitor_cycle_matches / drift_monitor_matches_total: matches per cycle and overall,
+#   - drift_monitor_alert_latency_seconds: from a matched transaction's block time to its alert,
+#   - drift_monitor_rules_fired_total{rule}: matches per log rule (log_rules.py).
+# serve_metrics() exposes them in the Prometheus text format on a local port, and each
+# cycle can be appended to an NDJSON file as a JSON summary (--metrics_json).
+# Recording is a few dict operations, so it is always on; only serving is optional.
+# =========================================================
+
+PREFIX = "drift_monitor_"
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+ALERT_LATENCY_BUCKETS = (1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0, 120.0, 300.0, 600.0)
+
+
+def endpoint_label(url):
+    # Query strings carry API keys (e.g. Helius ?api-key=...); never expose them
+    return str(url).split("?")[0] if url else "default"
+
+
+def error_outcome(exc):
+    from rate_limiter import retry_after_seconds, is_timeout
+    if retry_after_seconds(exc) is not None:
+        return "throttled"
+    if is_timeout(exc):
+        return "timeout"
+    return "error"
+
+
+class Histogram:
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+        self.max = 0.0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+        self.max = max(self.max, value)
+
+    def quantile(self, q):
+        """
+        Upper bound of the bucket holding the q-quantile (the max for the overflow bucket).
+        """
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(self.buckets, self.counts):
+            seen += count
+            if seen >= rank:
+                return min(bound, self.max)
+        return self.max
+
+
+def _labels(labels):
+    return tuple(sorted((labels or {}).items()))
+
+
+def _format_labels(labels, extra=()):
+    items = list(labels) + list(extra)
+    if not items:
+        return ""
+    escaped = (str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, v in items)
+    return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(items, escaped)) + "}"
+
+
+class Metrics:
+    def __init__(self):
+        self.counters = {}
+        self.gauges = {}
+        self.histograms = {}
+        self._cycle = None
+        self.last_cycle = None
+
+    # ---------- recording ----------
+    def inc(self, name, labels=None, value=1):
+        key = (name, _labels(labels))
+        self.counters[key] = self.counters.get(key, 0) + value
+
+    def set(self, name, value, labels=None):
+        self.gauges[(name, _labels(labels))] = value
+
+    def observe(self, name, value, labels=None, buckets=LATENCY_BUCKETS):
+        key = (name, _labels(labels))
+        histogram = self.histograms.get(key)
+        if histogram is None:
+            histogram = self.histograms[key] = Histogram(buckets)
+        histogram.observe(value)
+
+    def rpc(self, method, endpoint, seconds, error=None):
+        labels = {"method": method, "endpoint": endpoint_label(endpoint)}
+        self.observe("rpc_request_seconds", seconds, labels)
+        self.inc("rpc_requests_total", {**labels, "outcome": "ok" if error is None else error_outcome(error)})
+
+    def queue_depth(self, depth):
+        self.set("inspect_queue_depth", depth)
+        if self._cycle is not None:
+            self._cycle["max_queue_depth"] = max(self._cycle["max_queue_depth"], depth)
+
+    def alert(self, block_time):
+        if block_time:
+            self.observe("alert_latency_seconds", max(0.0, time.time() - float(block_time)), buckets=ALERT_LATENCY_BUCKETS)
+
+    @contextmanager
+    def stage(self, name, cycle=None):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_stage(name, time.perf_counter() - started, cycle)
+
+    def add_stage(self, name, seconds, cycle=None):
+        self.observe("stage_seconds", seconds, {"stage": name})
+        cycle = cycle if cycle is not None else self._cycle
+        if cycle is not None:
+            cycle["stages"][name] = cycle["stages"].get(name, 0.0) + seconds
+
+    # ---------- cycles ----------
+    # run_cycle has one current cycle (begin_cycle / end_cycle); pipelined batches overlap,
+    # so they keep their own cycle from new_cycle() and pass it explicitly.
+    def new_cycle(self):
+        return {"started": time.time(), "stages": {}, "max_queue_depth": 0, "counts": {},
+                "_counters": dict(self.counters)}
+
+    def begin_cycle(self):
+        self._cycle = self.new_cycle()
+        return self._cycle
+
+    def note(self, key, value, cycle=None):
+        """
+        Records a count (signatures, transactions, matches, ...) for the current (or given) cycle.
+        """
+        cycle = cycle if cycle is not None else self._cycle
+        if cycle is not None:
+            cycle["counts"][key] = value
+
+    def end_cycle(self, json_path=None, cycle=None):
+        """
+        Closes the cycle and returns its summary (also appended to `json_path` as one NDJSON line).
+        """
+        if cycle is None:
+            cycle, self._cycle = self._cycle, None
+        if cycle is None:
+            return None
+        matches = cycle["counts"].get("matches", 0)
+        self.set("cycle_matches", matches)
+        self.inc("matches_total", value=matches)
+        self.inc("cycles_total")
+
+        rpc_calls, retries = {}, {}
+        for (name, labels), value in self.counters.items():
+            delta = value - cycle["_counters"].get((name, labels), 0)
+            if not delta:
+                continue
+            labels = dict(labels)
+            if name == "rpc_requests_total":
+                key = f"{labels['method']} {labels['outcome']}"
+                rpc_calls[key] = rpc_calls.get(key, 0) + delta
+            elif name == "rpc_retries_total":
+                retries[labels["reason"]] = retries.get(labels["reason"], 0) + delta
+        summary = {
+            "started": round(cycle["started"], 3),
+            "stages": {name: round(seconds, 4) for name, seconds in cycle["stages"].items()},
+            **cycle["counts"],
+            "max_queue_depth": cycle["max_queue_depth"],
+            "rpc_calls": rpc_calls,
+            "retries": retries,
+        }
+        self.last_cycle = summary
+        if json_path:
+            try:
+                with open(json_path, "a") as f:
+                    f.write(json.dumps(summary) + "\n")
+            except OSError as e:
+                logging.error(f"Could not write the cycle summary to {json_path}: {e}")
+        return summary
+
+    # ---------- exposition ----------
+    def render(self):
+        """
+        All metrics in the Prometheus text exposition format.
+        """
+        lines = []
+        for kind, series in (("counter", self.counters), ("gauge", self.gauges)):
+            for name in sorted({name for name, _ in series}):
+                lines.append(f"# TYPE {PREFIX}{name} {kind}")
+                for (series_name, labels), value in sorted(series.items()):
+                    if series_name == name:
+                        lines.append(f"{PREFIX}{name}{_format_labels(labels)} {value}")
+        for name in sorted({name for name, _ in self.histograms}):
+            lines.append(f"# TYPE {PREFIX}{name} histogram")
+            for (series_name, labels), histogram in sorted(self.histograms.items()):
+                if series_name != name:
+                    continue
+                cumulative = 0
+                for bound, count in zip(histogram.buckets, histogram.counts):
+                    cumulative += count
+                    lines.append(f"{PREFIX}{name}_bucket{_format_labels(labels, [('le', bound)])} {cumulative}")
+                lines.append(f"{PREFIX}{name}_bucket{_format_labels(labels, [('le', '+Inf')])} {histogram.count}")
+                lines.append(f"{PREFIX}{name}_sum{_format_labels(labels)} {histogram.sum}")
+                lines.append(f"{PREFIX}{name}_count{_format_labels(labels)} {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+    def summary(self):
+        """
+        Compact view for logs: per-stage and per-RPC-method p50 / p95 / max in milliseconds.
+        """
+        view = {}
+        for (name, labels), histogram in sorted(self.histograms.items()):
+            label = ",".join(str(v) for _, v in labels)
+            view[f"{name}[{label}]"] = {"n": histogram.count, "p50_ms": round(histogram.quantile(0.5) * 1e3, 1),
+                                        "p95_ms": round(histogram.quantile(0.95) * 1e3, 1),
+                                        "max_ms": round(histogram.max * 1e3, 1)}
+        return view
+
+
+METRICS = Metrics()
+
+
+class MeteredClient:
+    """
+    Wraps an AsyncClient so every RPC method call is timed into METRICS under `endpoint`.
+    """
+    def __init__(self, client, endpoint):
+        self._client = client
+        self.endpoint = endpoint
+
+    def __getattr__(self, name):
+        attr = getattr(self._client, name)
+        if name in ("close", "is_connected") or not asyncio.iscoroutinefunction(attr):
+            return attr
+
+        async def metered(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                result = await attr(*args, **kwargs)
+            except Exception as e:
+                METRICS.rpc(name, self.endpoint, time.perf_counter() - started, e)
+                raise
+            METRICS.rpc(name, self.endpoint, time.perf_counter() - started)
+            return result
+        metered.__name__ = name
+        return metered
+
+    async def __aenter__(self):
+        await self._client.__aenter__()
+        return self
+
+    async def __aexit__(self, *exc):
+        await self._client.__aexit__(*exc)
+
+
+async def serve_metrics(port, host="127.0.0.1", registry=METRICS):
+    """
+    Serves `registry` in the Prometheus text format at http://host:port/metrics (plain
+    asyncio, no extra dependency). Returns the asyncio server.
+    """
+    async def handle(reader, writer):
+        try:
+            request = await reader.readline()
+            while (await reader.readline()) not in (b"\r\n", b"\n", b""):
+                pass
+            path = request.split(b" ")[1] if request.count(b" ") >= 2 else b"/"
+            if path.split(b"?")[0] in (b"/metrics", b"/"):
+                status, body = "200 OK", registry.render().encode()
+            else:
+                status, body = "404 Not Found", b"not found\n"
+            writer.write(f"HTTP/1.1 {status}\r\nContent-Type: text/plain; version=0.0.4; charset=utf-8\r\n"
+                         f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode() + body)
+            await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    server = await asyncio.start_server(handle, host, port)
+    logging.info(f"Serving metrics on http://{host}:{port}/metrics")
+    return server
@@ -0,0 +1,208 @@
+import time
+import asyncio
+import logging
+from itertools import zip_longest
+from solana.rpc.async_api import AsyncClient
+from f1_get_signatures import fetch_new_signatures
+from f2_inspect_transactions import inspect_transactions
+from f3_search_logs import search_logs, extract_transaction_records
+from drift_events import decode_fill_events, attach_fills
+from log_rules import as_rule_set
+from rate_limiter import RateLimitedClient
+from finality import RetryQueue, prefilter_signatures
+
+# ==================== Multi-Account Watcher ====================
+# Watches many accounts from one process. All accounts share a single AsyncClient
+# (one HTTP connection pool), a global cap on in-flight RPC requests, and a
+# scheduler that polls whichever accounts have waited longest first. Signatures whose
+# transaction could not be fetched go to a finality.RetryQueue and are inspected again
+# in later cycles, so advancing the cursors never drops them. Like the single-account
+# path it polls and inspects at `commitment`, skips what prefilter_signatures rules out
+# and tags every match with its confirmation status (for finality.FinalityTracker).
+# ===============================================================
+
+def load_whale_accounts():
+    """
+    Returns the account list from whale_list.DRIFT_WHALE_LIST_SNAP (also exported by helpers).
+    """
+    from whale_list import whale_accounts
+    return whale_accounts()
+
+
+def interleave(per_account_signatures):
+    """
+    Round-robins the per-account signature lists into one sequence,
+    so a busy account cannot starve the others in the inspection queue.
+    """
+    ordered = []
+    for row in zip_longest(*per_account_signatures.values()):
+        for item in row:
+            if item is not None:
+                ordered.append(item)
+    return ordered
+
+
+class MultiAccountWatcher:
+    def __init__(self, accounts, rpc_url, cursor_store, search_terms, max_concurrency=8, workers=5,
+                 batch_size=0, cache=None, limiter=None, client=None, sink=None, interval_seconds=600, intervals=None, max_catchup=10000, timeout=30,
+                 retry_queue=None, commitment=None, max_age_seconds=0):
+        # Preserve order, drop duplicates
+        self.accounts = list(dict.fromkeys(str(a) for a in accounts))
+        self.rpc_url = rpc_url
+        self.cursor_store = cursor_store
+        # Search terms or rules, compiled once
+        self.search_terms = as_rule_set(search_terms)
+        self.max_concurrency = max(1, max_concurrency)
+        self.workers = max(1, min(workers, self.max_concurrency))
+        self.batch_size = batch_size
+        self.cache = cache
+        self.limiter = limiter
+        self.sink = sink
+        self.intervals = {a: (intervals or {}).get(a, interval_seconds) for a in self.accounts}
+        self.max_catchup = max_catchup
+        self.timeout = timeout
+        self.next_due = {a: 0.0 for a in self.accounts}
+        # In memory unless a persisted queue is passed in
+        self.retry_queue = retry_queue if retry_queue is not None else RetryQueue()
+        # "confirmed" or "finalized"; None uses the client's default
+        self.commitment = commitment
+        self.max_age_seconds = max_age_seconds
+        # An externally owned client (e.g. an EndpointPool) is used as-is and not closed here
+        self._external_client = client
+        self._raw_client = None
+        self.client = None
+        self._semaphore = None
+
+    async def __aenter__(self):
+        if self._external_client is not None:
+            self.client = self._external_client
+        else:
+            self._raw_client = AsyncClient(self.rpc_url, timeout=self.timeout)
+            self.client = self._raw_client
+        if self.limiter is not None and not isinstance(self.client, RateLimitedClient):
+            self.client = RateLimitedClient(self.client, self.limiter)
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self
+
+    async def __aexit__(self, *exc):
+        if self._raw_client is not None:
+            await self._raw_client.close()
+            self._raw_client = None
+        self.client = None
+
+    def due_accounts(self, now=None):
+        """
+        Accounts whose interval elapsed, most overdue first.
+        """
+        now = time.monotonic() if now is None else now
+        due = [a for a in self.accounts if self.next_due[a] <= now]
+        return sorted(due, key=lambda a: self.next_due[a])
+
+    async def _poll(self, account):
+        async with self._semaphore:
+            return account, await fetch_new_signatures(
+                self.client, account, self.cursor_store, max_catchup=self.max_catchup, commitment=self.commitment
+            )
+
+    async def run_cycle(self, accounts=None):
+        """
+        One pass over `accounts` (default: the due ones). Returns the matches, each tagged
+        with the 'account' whose signature history produced it.
+        """
+        accounts = self.due_accounts() if accounts is None else accounts
+        if not accounts:
+            return []
+
+        started = time.monotonic()
+        for account in accounts:
+            self.next_due[account] = started + self.intervals[account]
+
+        # Stage 1: poll signature deltas for all due accounts, at most max_concurrency at a time
+        polled = await asyncio.gather(*(self._poll(a) for a in accounts), return_exceptions=True)
+        deltas = {}
+        for item in polled:
+            if isinstance(item, Exception):
+                logging.error(f"Signature poll failed: {item}")
+                continue
+            account, new_signatures = item
+            if new_signatures:
+                deltas[account] = new_signatures
+
+        retries = self.retry_queue.due()
+        if not deltas and not retries:
+            logging.info(f"No new signatures across {len(accounts)} accounts.")
+            return []
+
+        # Stage 2: inspect every unique signature once (pending retries first), interleaved fairly across accounts
+        accounts_by_signature = {}
+        per_account = {}
+        statuses = {}
+        for entry in retries:
+            statuses[entry['signature']] = entry.get('confirmationStatus')
+            for account in entry.get('accounts', ()):
+                per_account.setdefault(account, []).append(entry['signature'])
+        # Failed (and too old) transactions are never fetched
+        to_fetch = {account: prefilter_signatures(new_signatures, self.max_age_seconds)[0]
+                    for account, new_signatures in deltas.items()}
+        for account, entries in to_fetch.items():
+            for sig in entries:
+                statuses[sig['signature']] = sig.get('confirmationStatus')
+                accounts_by_signature.setdefault(sig['signature'], []).append(account)
+                per_account.setdefault(account, []).append(sig['signature'])
+        attempted = retries + [
+            {**sig, 'accounts': accounts_by_signature.pop(sig['signature'])}
+            for entries in to_fetch.values() for sig in entries if sig['signature'] in accounts_by_signature
+        ]
+        if not per_account:
+            self._advance(deltas)
+            return []
+        ordered = list(dict.fromkeys(interleave(per_account)))
+        logging.info(f"Inspecting {len(ordered)} signatures from {len(per_account)} accounts ({len(retries)} retries).")
+
+        transaction_details = await inspect_transactions(
+            ordered, workers=self.workers, client=self.client, batch_size=self.batch_size, cache=self.cache,
+            limiter=self.limiter, on_transaction=self.sink.write if self.sink is not None else None,
+            commitment=self.commitment
+        )
+
+        # Stage 3: search each account's transactions with the rules that apply to it, tag the matches
+        # with that account and decode the matched fills
+        transaction_records = extract_transaction_records(transaction_details)
+        records_by_signature = {record['signature']: record for record in transaction_records}
+        # Whatever was not returned is retried in later cycles, so the cursors can move past it
+        self.retry_queue.update(attempted, set(records_by_signature))
+        matches = []
+        for account, signatures in per_account.items():
+            records = [records_by_signature[s] for s in signatures if s in records_by_signature]
+            for match in search_logs(records, self.search_terms, account=account):
+                match['account'] = account
+                match['confirmation_status'] = statuses.get(match['signature'])
+                matches.append(match)
+        matched = {match['signature'] for match in matches}
+        fills = decode_fill_events([r for r in transaction_records if r['signature'] in matched], accounts=self.accounts)
+        attach_fills(matches, fills)
+
+        self._advance(deltas)
+
+        logging.info(f"Multi-account cycle done in {time.monotonic() - started:.2f}s with {len(matches)} matches.")
+        return matches
+
+    def _advance(self, deltas):
+        for account, new_signatures in deltas.items():
+            newest = new_signatures[-1]
+            self.cursor_store.advance(account, newest['signature'], newest['slot'])
+
+    async def run_forever(self, on_matches):
+        """
+        Polls accounts as they become due and hands every non-empty match list to `on_matches`.
+        """
+        while True:
+            try:
+                matches = await self.run_cycle()
+                if matches:
+                    on_matches(matches)
+            except Exception as e:
+                logging.error(f"An error occurred during the multi-account cycle: {e}")
+            sleep_for = max(0.0, min(self.next_due.values()) - time.monotonic())
+            logging.info(f"Next account due in {sleep_for:.0f} seconds.")
+            await asyncio.sleep(sleep_for)
@@ -0,0 +1,127 @@
+import time
+import asyncio
+import logging
+from config import EMAIL_SUBJECT
+from f4_send_email import SmtpMailer, build_digest_body, build_retraction_body
+from f5_pc_notification_style import play_sequence_async
+
+# ==================== Notification Dispatcher ====================
+# Alerts leave the hot path: submit() only enqueues the matches. Background workers
+#   - coalesce every match that arrives within `coalesce_seconds` of the first one
+#     into a single digest email sent over a persistent SMTP connection (in a thread),
+#   - play the sound sequence once per burst, without blocking the event loop,
+#   - send retractions (alerts whose transaction did not finalize) right away, uncoalesced.
+# =================================================================
+
+class NotificationDispatcher:
+    def __init__(self, mailer=None, play_sound=True, coalesce_seconds=30, max_queue=10000):
+        self.mailer = mailer if mailer is not None else SmtpMailer()
+        self.play_sound = play_sound
+        self.coalesce_seconds = coalesce_seconds
+        self._queue = asyncio.Queue(maxsize=max_queue)
+        self._sound_pending = asyncio.Event()
+        self._retractions = asyncio.Queue()
+        self._tasks = []
+        self.counters = {"matches": 0, "dropped": 0, "digests": 0, "sounds": 0, "retractions": 0}
+
+    async def __aenter__(self):
+        self.start()
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.stop()
+
+    def start(self):
+        self._tasks = [asyncio.create_task(self._email_worker()), asyncio.create_task(self._retraction_worker())]
+        if self.play_sound:
+            self._tasks.append(asyncio.create_task(self._sound_worker()))
+
+    async def stop(self, drain_timeout=10):
+        """
+        Sends whatever is still queued (bounded by drain_timeout), then stops the workers.
+        """
+        try:
+            await asyncio.wait_for(asyncio.gather(self._queue.join(), self._retractions.join()), drain_timeout)
+        except asyncio.TimeoutError:
+            logging.warning(f"Dropping {self._queue.qsize()} queued notifications on shutdown.")
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        await asyncio.to_thread(self.mailer.close)
+
+    def submit(self, matches):
+        """
+        Non-blocking: queues the matches for the next digest and requests a sound alert.
+        """
+        for match in matches:
+            try:
+                self._queue.put_nowait(match)
+                self.counters["matches"] += 1
+            except asyncio.QueueFull:
+                self.counters["dropped"] += 1
+        if self.counters["dropped"]:
+            logging.warning(f"Notification queue full; {self.counters['dropped']} matches dropped so far.")
+        if matches and self.play_sound:
+            self._sound_pending.set()
+
+    def retract(self, matches, reason):
+        """
+        Non-blocking: queues a retraction email for matches that were alerted but did not finalize.
+        """
+        self._retractions.put_nowait((matches, reason))
+
+    async def _collect_window(self):
+        """
+        Waits for the first match, then gathers everything that arrives until the window closes.
+        """
+        batch = [await self._queue.get()]
+        deadline = time.monotonic() + self.coalesce_seconds
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _email_worker(self):
+        while True:
+            batch = await self._collect_window()
+            try:
+                subject = f"{EMAIL_SUBJECT} ({len(batch)} match{'es' if len(batch) != 1 else ''})"
+                body = build_digest_body(batch, self.coalesce_seconds)
+                await asyncio.to_thread(self.mailer.send, subject, body)
+                self.counters["digests"] += 1
+            except Exception as e:
+                logging.error(f"Error sending digest email: {e}")
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    async def _retraction_worker(self):
+        while True:
+            matches, reason = await self._retractions.get()
+            try:
+                body = build_retraction_body(matches, reason)
+                await asyncio.to_thread(self.mailer.send, f"RETRACTED: {EMAIL_SUBJECT}", body)
+                self.counters["retractions"] += 1
+            except Exception as e:
+                logging.error(f"Error sending retraction email: {e}")
+            finally:
+                self._retractions.task_done()
+
+    async def _sound_worker(self):
+        while True:
+            await self._sound_pending.wait()
+            # Matches arriving while the sequence plays collapse into (at most) one more run
+            self._sound_pending.clear()
+            try:
+                await play_sequence_async()
+                self.counters["sounds"] += 1
+            except Exception as e:
+                logging.error(f"Error playing sound alert: {e}")
+
+    def stats(self):
+        return {**self.counters, "queued": self._queue.qsize(), "emails_sent": self.mailer.sent}
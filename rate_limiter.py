@@ -0,0 +1,184 @@
+import time
+import random
+import asyncio
+import logging
+from email.utils import parsedate_to_datetime
+import httpx
+from metrics import METRICS, error_outcome
+
+# ==================== Adaptive Rate Limiter ====================
+# Every RPC call goes through one shared limiter:
+#   - a token bucket caps the request rate (and pauses entirely after a 429 Retry-After),
+#   - failed calls are retried with exponential backoff and full jitter,
+#   - the number of in-flight calls is tuned with AIMD: +1 per window of healthy calls,
+#     halved on throttling, errors, timeouts or latency above target.
+# The same settings therefore work on free-tier and paid endpoints.
+# ===============================================================
+
+def retry_after_seconds(exc):
+    """
+    Seconds to wait if `exc` (or what it wraps) is an HTTP 429, else None.
+    """
+    seen = set()
+    while exc is not None and id(exc) not in seen:
+        seen.add(id(exc))
+        if isinstance(exc, httpx.HTTPStatusError) and exc.response.status_code == 429:
+            header = exc.response.headers.get("Retry-After")
+            if not header:
+                return 0.0
+            try:
+                return max(0.0, float(header))
+            except ValueError:
+                try:
+                    return max(0.0, parsedate_to_datetime(header).timestamp() - time.time())
+                except (TypeError, ValueError):
+                    return 0.0
+        exc = exc.__cause__ or exc.__context__
+    return None
+
+
+def is_timeout(exc):
+    seen = set()
+    while exc is not None and id(exc) not in seen:
+        seen.add(id(exc))
+        if isinstance(exc, (httpx.TimeoutException, asyncio.TimeoutError)):
+            return True
+        exc = exc.__cause__ or exc.__context__
+    return False
+
+
+class AdaptiveRateLimiter:
+    def __init__(self, rate=10.0, burst=None, initial_concurrency=4, min_concurrency=1, max_concurrency=32,
+                 max_attempts=5, base_delay=0.5, max_delay=30.0, latency_target=2.0, decrease_factor=0.5,
+                 decrease_cooldown=1.0):
+        self.rate = rate
+        self.burst = burst or max(1.0, rate)
+        self.min_concurrency = min_concurrency
+        self.max_concurrency = max_concurrency
+        self.concurrency = float(min(max(initial_concurrency, min_concurrency), max_concurrency))
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.latency_target = latency_target
+        self.decrease_factor = decrease_factor
+        self.decrease_cooldown = decrease_cooldown
+
+        self._tokens = self.burst
+        self._last_refill = time.monotonic()
+        self._blocked_until = 0.0
+        self._last_decrease = 0.0
+        self._in_flight = 0
+        self._slot_freed = asyncio.Condition()
+        self.counters = {"calls": 0, "retries": 0, "throttled": 0, "timeouts": 0, "errors": 0, "failures": 0}
+
+    # ---------- concurrency (AIMD) ----------
+    async def _acquire_slot(self):
+        async with self._slot_freed:
+            await self._slot_freed.wait_for(lambda: self._in_flight < int(self.concurrency))
+            self._in_flight += 1
+
+    async def _release_slot(self):
+        async with self._slot_freed:
+            self._in_flight -= 1
+            self._slot_freed.notify_all()
+
+    def _increase(self):
+        # Additive increase: about +1 slot per `concurrency` healthy calls
+        self.concurrency = min(self.max_concurrency, self.concurrency + 1.0 / self.concurrency)
+
+    def _decrease(self, reason):
+        now = time.monotonic()
+        if now - self._last_decrease < self.decrease_cooldown:
+            return
+        self._last_decrease = now
+        previous = self.concurrency
+        self.concurrency = max(self.min_concurrency, self.concurrency * self.decrease_factor)
+        logging.info(f"Rate limiter: {reason}, concurrency {previous:.1f} -> {self.concurrency:.1f}")
+
+    # ---------- rate (token bucket) ----------
+    async def _acquire_token(self):
+        while True:
+            now = time.monotonic()
+            if now < self._blocked_until:
+                await asyncio.sleep(self._blocked_until - now)
+                continue
+            self._tokens = min(self.burst, self._tokens + (now - self._last_refill) * self.rate)
+            self._last_refill = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return
+            await asyncio.sleep((1 - self._tokens) / self.rate)
+
+    def _backoff(self, attempt):
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1)))
+
+    async def call(self, fn, *args, **kwargs):
+        """
+        Runs `await fn(*args, **kwargs)` under the limiter, retrying up to max_attempts times.
+        """
+        for attempt in range(1, self.max_attempts + 1):
+            await self._acquire_slot()
+            try:
+                await self._acquire_token()
+                self.counters["calls"] += 1
+                started = time.monotonic()
+                result = await fn(*args, **kwargs)
+            except Exception as e:
+                retry_after = retry_after_seconds(e)
+                if retry_after is not None:
+                    self.counters["throttled"] += 1
+                    self._blocked_until = max(self._blocked_until, time.monotonic() + retry_after)
+                    self._decrease("throttled (429)")
+                elif is_timeout(e):
+                    self.counters["timeouts"] += 1
+                    self._decrease("timeout")
+                else:
+                    self.counters["errors"] += 1
+                    self._decrease("error")
+
+                if attempt == self.max_attempts:
+                    self.counters["failures"] += 1
+                    raise
+                delay = max(retry_after or 0.0, self._backoff(attempt))
+                self.counters["retries"] += 1
+                METRICS.inc("rpc_retries_total", {"reason": error_outcome(e)})
+                logging.warning(f"RPC call {getattr(fn, '__name__', fn)} failed (attempt {attempt}): {e}; "
+                                f"retrying in {delay:.2f}s")
+            else:
+                if time.monotonic() - started > self.latency_target:
+                    self._decrease("slow response")
+                else:
+                    self._increase()
+                return result
+            finally:
+                await self._release_slot()
+            await asyncio.sleep(delay)
+
+    def stats(self):
+        return {**self.counters, "concurrency": round(self.concurrency, 2), "in_flight": self._in_flight, "rate": self.rate}
+
+
+class RateLimitedClient:
+    """
+    Wraps an AsyncClient so every RPC method call goes through the limiter.
+    """
+    def __init__(self, client, limiter):
+        self._client = client
+        self.limiter = limiter
+
+    def __getattr__(self, name):
+        attr = getattr(self._client, name)
+        if name in ("close", "is_connected") or not asyncio.iscoroutinefunction(attr):
+            return attr
+
+        async def limited(*args, **kwargs):
+            return await self.limiter.call(attr, *args, **kwargs)
+        limited.__name__ = name
+        return limited
+
+    async def __aenter__(self):
+        await self._client.__aenter__()
+        return self
+
+    async def __aexit__(self, *exc):
+        await self._client.__aexit__(*exc)
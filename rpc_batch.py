@@ -0,0 +1,117 @@
+import json
+import asyncio
+import logging
+import time
+import httpx
+from solders.rpc.requests import GetTransaction, batch_to_json
+from solders.rpc.config import RpcTransactionConfig
+from solders.rpc.responses import GetTransactionResp
+from solders.transaction_status import UiTransactionEncoding
+from solders.commitment_config import CommitmentLevel
+from solders.signature import Signature
+from metrics import METRICS
+
+# ==================== Batched JSON-RPC getTransaction ====================
+# Packs many getTransaction calls into one JSON-RPC batch request and sends them
+# over a single keep-alive HTTP connection. Entries that fail inside a batch are
+# retried one by one on the same connection.
+# =========================================================================
+
+class BatchTransactionFetcher:
+    def __init__(self, rpc_url, batch_size=50, commitment=CommitmentLevel.Finalized, timeout=30, attempts=3, limiter=None):
+        self.rpc_url = rpc_url
+        self.batch_size = max(1, batch_size)
+        # A limiter owns retries and backoff
+        self.limiter = limiter
+        self.attempts = 1 if limiter is not None else attempts
+        self.config = RpcTransactionConfig(UiTransactionEncoding.Json, commitment, 0)
+        self.finalized = commitment == CommitmentLevel.Finalized
+        self.http = httpx.AsyncClient(
+            timeout=timeout,
+            limits=httpx.Limits(max_connections=1, max_keepalive_connections=1),
+            headers={"Content-Type": "application/json"},
+        )
+        self.round_trips = 0
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.http.aclose()
+
+    async def _post(self, body):
+        if self.limiter is not None:
+            return await self.limiter.call(self._send, body)
+        return await self._send(body)
+
+    async def _send(self, body):
+        self.round_trips += 1
+        started = time.perf_counter()
+        try:
+            response = await self.http.post(self.rpc_url, content=body)
+            response.raise_for_status()
+        except Exception as e:
+            METRICS.rpc("get_transaction_batch", self.rpc_url, time.perf_counter() - started, e)
+            raise
+        METRICS.rpc("get_transaction_batch", self.rpc_url, time.perf_counter() - started)
+        return response.json()
+
+    @staticmethod
+    def _parse(item):
+        """
+        Returns the typed transaction (or None if not found); raises on a JSON-RPC error entry.
+        """
+        if "error" in item:
+            raise RuntimeError(f"RPC error {item['error'].get('code')}: {item['error'].get('message')}")
+        return GetTransactionResp.from_json(json.dumps(item)).value
+
+    async def _fetch_one(self, signature):
+        for attempt in range(1, self.attempts + 1):
+            try:
+                body = GetTransaction(signature, self.config, 0).to_json()
+                return self._parse(await self._post(body))
+            except Exception as e:
+                logging.error(f"Error fetching transaction {signature}, attempt {attempt}: {e}")
+                if attempt < self.attempts:
+                    await asyncio.sleep(1)
+        logging.error(f"Failed to fetch transaction {signature} after {self.attempts} attempts.")
+        return None
+
+    async def _fetch_batch(self, signatures):
+        requests = [GetTransaction(sig, self.config, i) for i, sig in enumerate(signatures)]
+        results = {}
+        try:
+            payload = await self._post(batch_to_json(requests))
+            if not isinstance(payload, list):
+                raise RuntimeError(f"unexpected batch response: {str(payload)[:200]}")
+            for item in payload:
+                try:
+                    results[item["id"]] = self._parse(item)
+                except Exception as e:
+                    logging.warning(f"Batch entry {item.get('id')} failed ({e}); retrying it individually.")
+        except Exception as e:
+            logging.warning(f"Batch of {len(signatures)} failed ({e}); falling back to individual calls.")
+
+        out = []
+        for i, sig in enumerate(signatures):
+            value = results[i] if i in results else await self._fetch_one(sig)
+            out.append((str(sig), value))
+        return out
+
+    async def fetch(self, signatures):
+        """
+        Fetches every signature in batches of `batch_size`.
+        Returns [(signature, transaction or None)] in input order; invalid signatures are skipped.
+        """
+        parsed = []
+        for sig_str in signatures:
+            try:
+                parsed.append(Signature.from_string(sig_str))
+            except ValueError:
+                logging.error(f"Invalid signature format: {sig_str}")
+
+        out = []
+        for start in range(0, len(parsed), self.batch_size):
+            out.extend(await self._fetch_batch(parsed[start:start + self.batch_size]))
+        logging.info(f"Fetched {len(out)} transactions in {self.round_trips} round trips.")
+        return out
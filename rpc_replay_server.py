@@ -0,0 +1,258 @@
+import json
+import random
+import asyncio
+import logging
+import argparse
+from aiohttp import web, ClientSession
+
+# ==================== Local JSON-RPC Stand-in ====================
+# Serves recorded getSignaturesForAddress / getTransaction responses over HTTP, so
+# run_cycle, inspect_transactions and backfills can be measured offline and repeatably:
+#   - fixtures are NDJSON, one {"method", "params", "result"} per line,
+#   - with --record_from the server proxies every request to a real endpoint and appends
+#     what it answered to the fixture file (point main.py / backfill.py at it once),
+#   - on replay, getTransaction is answered by signature, getSignatureStatuses from the
+#     recorded transactions (all finalized) and getSignaturesForAddress from the merged
+#     signature history of the address (honouring before / until / limit), so replays do
+#     not depend on the cursor the recording was made with; getAccountInfo and
+#     getMultipleAccounts are answered per pubkey from every recorded account (at the newest
+#     recorded slot), whatever the chunking; anything else needs an exact (method, params) match,
+#   - every HTTP request waits --latency_ms +/- --jitter_ms, and --error_rate of them fail
+#     with an HTTP 429 (Retry-After), an HTTP 500 or a JSON-RPC error (--error_kind).
+# Single requests and JSON-RPC batches are both supported.
+# =================================================================
+
+ERROR_KINDS = ("429", "500", "rpc")
+
+
+def fixture_key(method, params):
+    return json.dumps([method, params], sort_keys=True)
+
+
+class FixtureStore:
+    def __init__(self, path=None):
+        self.path = path
+        self.transactions = {}
+        self.signatures = {}
+        # pubkey -> account (as getAccountInfo returns it) and the newest slot one was recorded at
+        self.accounts = {}
+        self.account_slot = 0
+        self.exact = {}
+        if path:
+            try:
+                with open(path, "r") as f:
+                    for line in f:
+                        if line.strip():
+                            entry = json.loads(line)
+                            self.add(entry["method"], entry.get("params") or [], entry.get("result"))
+            except FileNotFoundError:
+                pass
+
+    def add(self, method, params, result):
+        if method == "getTransaction" and result is not None:
+            self.transactions[params[0]] = result
+        elif method == "getSignaturesForAddress" and result:
+            known = {entry["signature"]: entry for entry in self.signatures.get(params[0], [])}
+            known.update({entry["signature"]: entry for entry in result})
+            # Newest first, as the real endpoint returns them
+            self.signatures[params[0]] = sorted(known.values(), key=lambda entry: entry["slot"], reverse=True)
+        elif method in ("getAccountInfo", "getMultipleAccounts") and result:
+            keys = [params[0]] if method == "getAccountInfo" else params[0]
+            values = [result["value"]] if method == "getAccountInfo" else result["value"]
+            self.accounts.update(zip(keys, values))
+            self.account_slot = max(self.account_slot, result["context"]["slot"])
+        self.exact[fixture_key(method, params)] = result
+
+    def record(self, method, params, result):
+        self.add(method, params, result)
+        if self.path:
+            with open(self.path, "a") as f:
+                f.write(json.dumps({"method": method, "params": params, "result": result}) + "\n")
+
+    def answer(self, method, params):
+        """
+        (True, result) if the fixtures can answer the request, else (False, None).
+        """
+        if method == "getTransaction":
+            # Like mainnet, an unknown signature is a null result
+            return True, self.transactions.get(params[0])
+        if method == "getSignaturesForAddress":
+            config = params[1] if len(params) > 1 and params[1] else {}
+            history = self.signatures.get(params[0], [])
+            start = 0
+            if config.get("before"):
+                positions = [i for i, entry in enumerate(history) if entry["signature"] == config["before"]]
+                if not positions:
+                    return True, []
+                start = positions[0] + 1
+            page = []
+            for entry in history[start:]:
+                if entry["signature"] == config.get("until") or len(page) >= config.get("limit", 1000):
+                    break
+                page.append(entry)
+            return True, page
+        if method == "getSignatureStatuses":
+            # Every recorded transaction counts as finalized; unknown signatures are null (dropped)
+            statuses = []
+            for signature in params[0]:
+                transaction = self.transactions.get(signature)
+                err = (transaction.get("meta") or {}).get("err") if transaction else None
+                statuses.append(None if transaction is None else {
+                    "slot": transaction["slot"], "confirmations": None, "err": err,
+                    "status": {"Err": err} if err is not None else {"Ok": None}, "confirmationStatus": "finalized"})
+            slot = max((status["slot"] for status in statuses if status), default=0)
+            return True, {"context": {"slot": slot}, "value": statuses}
+        if method in ("getAccountInfo", "getMultipleAccounts") and all(
+                key in self.accounts for key in ([params[0]] if method == "getAccountInfo" else params[0])):
+            if method == "getAccountInfo":
+                value = self.accounts[params[0]]
+            else:
+                value = [self.accounts[key] for key in params[0]]
+            return True, {"context": {"slot": self.account_slot}, "value": value}
+        key = fixture_key(method, params)
+        if key in self.exact:
+            return True, self.exact[key]
+        return False, None
+
+
+class ReplayServer:
+    def __init__(self, store, latency_ms=0.0, jitter_ms=0.0, error_rate=0.0, error_kind="429", upstream=None, seed=None):
+        if error_kind not in ERROR_KINDS:
+            raise ValueError(f"error_kind must be one of {ERROR_KINDS}")
+        self.store = store
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.error_kind = error_kind
+        self.upstream = upstream
+        self.random = random.Random(seed)
+        self.counters = {"http_requests": 0, "calls": 0, "injected_errors": 0, "misses": 0, "recorded": 0}
+        self._session = None
+        self._runner = None
+
+    def app(self):
+        app = web.Application(client_max_size=64 * 1024 * 1024)
+        app.router.add_post("/", self.handle)
+        return app
+
+    async def start(self, host="127.0.0.1", port=0):
+        """
+        Serves in the running event loop. Returns the URL (port 0 picks a free port).
+        """
+        self._runner = web.AppRunner(self.app())
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, host, port)
+        await site.start()
+        port = self._runner.addresses[0][1]
+        return f"http://{host}:{port}"
+
+    async def stop(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+        if self._session is not None:
+            await self._session.close()
+
+    async def handle(self, request):
+        self.counters["http_requests"] += 1
+        body = await request.json()
+        calls = body if isinstance(body, list) else [body]
+        self.counters["calls"] += len(calls)
+
+        if self.upstream:
+            return await self._proxy(body, calls)
+
+        delay = max(0.0, self.latency_ms + self.random.uniform(-self.jitter_ms, self.jitter_ms)) / 1e3
+        if delay:
+            await asyncio.sleep(delay)
+        if self.error_rate and self.random.random() < self.error_rate:
+            self.counters["injected_errors"] += 1
+            if self.error_kind == "429":
+                return web.Response(status=429, headers={"Retry-After": "1"}, text="Too Many Requests")
+            if self.error_kind == "500":
+                return web.Response(status=500, text="Internal Server Error")
+            replies = [self._error(call, -32005, "Node is behind by 42 slots (injected)", {"numSlotsBehind": 42})
+                       for call in calls]
+        else:
+            replies = [self._reply(call) for call in calls]
+        return web.json_response(replies if isinstance(body, list) else replies[0])
+
+    def _reply(self, call):
+        found, result = self.store.answer(call.get("method"), call.get("params") or [])
+        if not found:
+            self.counters["misses"] += 1
+            return self._error(call, -32601, f"{call.get('method')} is not in the fixtures")
+        return {"jsonrpc": "2.0", "id": call.get("id"), "result": result}
+
+    @staticmethod
+    def _error(call, code, message, data=None):
+        error = {"code": code, "message": message}
+        if data is not None:
+            error["data"] = data
+        return {"jsonrpc": "2.0", "id": call.get("id"), "error": error}
+
+    async def _proxy(self, body, calls):
+        if self._session is None:
+            self._session = ClientSession()
+        async with self._session.post(self.upstream, json=body) as response:
+            if response.status != 200:
+                # Throttling and outages are passed through, never recorded
+                headers = {"Retry-After": response.headers["Retry-After"]} if "Retry-After" in response.headers else None
+                return web.Response(status=response.status, text=await response.text(), headers=headers)
+            payload = await response.json(content_type=None)
+        replies = payload if isinstance(payload, list) else [payload]
+        by_id = {call.get("id"): call for call in calls}
+        for reply in replies:
+            call = by_id.get(reply.get("id"))
+            if call is not None and "result" in reply:
+                self.store.record(call["method"], call.get("params") or [], reply["result"])
+                self.counters["recorded"] += 1
+        return web.json_response(payload)
+
+
+async def serve(args):
+    store = FixtureStore(args.fixtures)
+    server = ReplayServer(store, args.latency_ms, args.jitter_ms, args.error_rate, args.error_kind,
+                          upstream=args.record_from or None, seed=args.seed)
+    url = await server.start(args.host, args.port)
+    if args.record_from:
+        logging.info(f"Recording {args.record_from} into {args.fixtures} through {url}")
+    else:
+        logging.info(f"Serving {len(store.transactions)} transactions and the signature history of "
+                     f"{len(store.signatures)} addresses on {url}")
+    try:
+        await asyncio.Future()
+    finally:
+        logging.info(f"Replay server: {server.counters}")
+        await server.stop()
+
+
+def main():
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description="Serve (or record) Solana JSON-RPC fixtures locally.")
+    parser.add_argument("fixtures", type=str, help="NDJSON fixture file (appended to with --record_from).")
+    parser.add_argument("--host", type=str, default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8899)
+    parser.add_argument("--record_from", type=str, default="", help="Proxy to this RPC endpoint and record its answers.")
+    parser.add_argument("--latency_ms", type=float, default=0.0, help="Added latency per HTTP request.")
+    parser.add_argument("--jitter_ms", type=float, default=0.0, help="Uniform +/- jitter on the latency.")
+    parser.add_argument("--error_rate", type=float, default=0.0, help="Fraction of HTTP requests that fail.")
+    parser.add_argument("--error_kind", type=str, default="429", choices=ERROR_KINDS)
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+    try:
+        asyncio.run(serve(args))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
+
+# ==================== Usage ====================
+# Record a few cycles of the monitor against mainnet (fixtures.ndjson keeps growing):
+# python rpc_replay_server.py fixtures.ndjson --record_from https://api.mainnet-beta.solana.com
+# python main.py --rpc_override http://127.0.0.1:8899
+#
+# Replay them with 80 +/- 40 ms latency and 2% rate-limit errors:
+# python rpc_replay_server.py fixtures.ndjson --latency_ms 80 --jitter_ms 40 --error_rate 0.02
+# =================================================
@@ -0,0 +1,130 @@
+import os
+import logging
+import itertools
+import multiprocessing
+from dataclasses import replace
+from concurrent.futures import ProcessPoolExecutor
+import pandas as pd
+from driftpy.accounts import DataAndSlot
+from margin_engine import STAT_COLUMNS, PositionLayout, all_stat_rows
+
+# ==================== Oracle-Shock Scenario Sweep ====================
+# Stress grids of (market, distortion) pairs over one shared base snapshot of the
+# drift client's account cache:
+#   - a scenario is a copy-on-write overlay: a new top-level dict and oracle dict that
+#     share every entry with the base, plus new entries for the shocked oracles only
+#     (the base snapshot is never copied or mutated),
+#   - the users' positions are laid out as arrays once (margin_engine.PositionLayout),
+#   - scenarios are evaluated in chunks across a process pool; workers are forked, so
+#     they read the snapshot, users and layout from inherited memory instead of pickling them,
+#   - the result is one tidy DataFrame indexed by (scenario, user).
+# A market is a perp market index, ("perp", i) / ("spot", i), an oracle pubkey, or None (all oracles).
+# =====================================================================
+
+_SWEEP = None  # (drift_client, base_cache, users, layout), set before the pool forks
+
+
+def shocked_oracle_keys(cache, market=None):
+    """
+    The oracle_price_data keys moved by a shock to `market`.
+    """
+    if market is None:
+        return list(cache['oracle_price_data'])
+    if isinstance(market, str):
+        return [market]
+    kind, index = market if isinstance(market, tuple) else ("perp", market)
+    if kind == "spot":
+        return [str(cache['spot_markets'][index].data.oracle)]
+    return [str(cache['perp_markets'][index].data.amm.oracle)]
+
+
+def overlay_cache(base, shocks):
+    """
+    Copy-on-write view of `base` with the oracle prices in `shocks` ({oracle key: multiplier}) scaled.
+    """
+    oracles = dict(base['oracle_price_data'])
+    for key, distortion in shocks.items():
+        entry = oracles.get(key)
+        if entry is not None:
+            oracles[key] = DataAndSlot(entry.slot, replace(entry.data, price=entry.data.price * distortion))
+    return {**base, 'oracle_price_data': oracles}
+
+
+def scenario_cache(base, market, distortion):
+    return overlay_cache(base, {key: distortion for key in shocked_oracle_keys(base, market)})
+
+
+def shock_grid(markets, distortions):
+    """
+    Every (market, distortion) pair, market-major.
+    """
+    return list(itertools.product(markets, distortions))
+
+
+def _upnl_market(market):
+    # Like all_user_stats(only_one_index=...): a single perp market shock reports that market's upnl
+    if isinstance(market, tuple):
+        return market[1] if market[0] == "perp" else None
+    return market if isinstance(market, int) else None
+
+
+def _evaluate(chunk):
+    drift_client, base, users, layout = _SWEEP
+    saved = drift_client.account_subscriber.cache
+    results = []
+    try:
+        for scenario, market, distortion in chunk:
+            drift_client.account_subscriber.cache = scenario_cache(base, market, distortion)
+            results.append((scenario, all_stat_rows(drift_client, users, _upnl_market(market), layout)))
+    finally:
+        drift_client.account_subscriber.cache = saved
+    return results
+
+
+def _fork_context():
+    try:
+        return multiprocessing.get_context("fork")
+    except ValueError:
+        return None
+
+
+def sweep_scenarios(drift_client, users, scenarios, base_cache=None, processes=None, chunks_per_process=4):
+    """
+    Evaluates every (market, distortion) scenario against `base_cache` (default: the drift
+    client's current cache). Returns a DataFrame indexed by (scenario, user) with the scenario's
+    market and distortion next to the all_user_stats columns.
+    """
+    global _SWEEP
+    scenarios = list(scenarios)
+    base = base_cache if base_cache is not None else drift_client.account_subscriber.cache
+    tasks = [(i, market, distortion) for i, (market, distortion) in enumerate(scenarios)]
+    processes = processes or os.cpu_count() or 1
+    context = _fork_context()
+    if context is None and processes > 1:
+        logging.warning("Process pools need the fork start method here; sweeping in-process.")
+    processes = min(processes, len(tasks)) if context is not None else 1
+
+    # Positions are laid out once for the whole grid
+    _SWEEP = (drift_client, base, users, PositionLayout(users))
+    try:
+        if processes <= 1:
+            results = _evaluate(tasks)
+        else:
+            size = max(1, -(-len(tasks) // (processes * chunks_per_process)))
+            chunks = [tasks[i:i + size] for i in range(0, len(tasks), size)]
+            with ProcessPoolExecutor(max_workers=processes, mp_context=context) as pool:
+                results = [item for chunk in pool.map(_evaluate, chunks) for item in chunk]
+    finally:
+        _SWEEP = None
+
+    keys = [str(user.public_key) for user in users]
+    rows, index = [], []
+    for scenario, stat_rows in results:
+        market, distortion = scenarios[scenario]
+        for key, row in zip(keys, stat_rows):
+            index.append((scenario, key))
+            rows.append([market, distortion] + row)
+    frame = pd.DataFrame(rows, columns=['market', 'distortion'] + STAT_COLUMNS,
+                         index=pd.MultiIndex.from_tuples(index, names=['scenario', 'user']))
+    frame['total_liability'] = frame['perp_liability'] + frame['spot_liability']
+    return frame
@@ -0,0 +1,74 @@
+import os
+import json
+import logging
+import tempfile
+
+# ==================== Signature Cursor: Per-Account Watermarks ====================
+# Remembers the last processed signature (and its slot) for every watched account
+# so each cycle only pulls signatures it has never seen. The store is a small JSON
+# file that is replaced atomically, so a crash mid-write never corrupts it.
+# ==================================================================================
+
+def write_json_atomic(path, data, prefix=".tmp-"):
+    """
+    Write `data` to a temporary file next to `path` and swap it in,
+    so readers only ever see the old or the new version.
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(prefix=prefix, dir=directory)
+    try:
+        with os.fdopen(fd, "w") as f:
+            json.dump(data, f, indent=4, sort_keys=True)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+class SignatureCursorStore:
+    def __init__(self, path):
+        self.path = path
+        self._cursors = self._load()
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return {}
+        try:
+            with open(self.path, "r") as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            logging.error(f"Could not read signature cursor store {self.path}: {e}")
+            return {}
+        if not isinstance(data, dict):
+            logging.error(f"Ignoring malformed signature cursor store {self.path}.")
+            return {}
+        return data
+
+    def _flush(self):
+        write_json_atomic(self.path, self._cursors, prefix=".cursor-")
+
+    def get(self, account):
+        """
+        Returns {"signature": ..., "slot": ...} for the account, or None if it was never processed.
+        """
+        return self._cursors.get(str(account))
+
+    def advance(self, account, signature, slot):
+        """
+        Moves the account watermark forward. Older slots never overwrite newer ones.
+        """
+        account = str(account)
+        current = self._cursors.get(account)
+        if current and slot is not None and current.get("slot") is not None and slot < current["slot"]:
+            logging.warning(f"Refusing to move cursor for {account} back from slot {current['slot']} to {slot}.")
+            return
+        self._cursors[account] = {"signature": str(signature), "slot": slot}
+        self._flush()
+        logging.info(f"Cursor for {account} advanced to {str(signature)[:15]} (slot {slot}).")
+
+    def reset(self, account):
+        if self._cursors.pop(str(account), None) is not None:
+            self._flush()
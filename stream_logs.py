@@ -0,0 +1,219 @@
+import time
+import json
+import asyncio
+import logging
+from collections import deque
+from solders.pubkey import Pubkey
+from solders.rpc.config import RpcTransactionLogsConfig, RpcTransactionLogsFilterMentions
+from solders.rpc.requests import LogsSubscribe
+from solders.rpc.responses import LogsNotification, SubscriptionResult
+from solders.commitment_config import CommitmentLevel
+from solana.rpc.websocket_api import connect, SubscriptionError
+from websockets.exceptions import ConnectionClosed, InvalidHandshake
+from f3_search_logs import match_log_lines
+from log_rules import as_rule_set
+from drift_events import decode_transaction_fills, attach_fills
+from multi_account_watcher import MultiAccountWatcher
+
+# ==================== Streaming Mode: logsSubscribe ====================
+# Subscribes to logs mentioning every watched account (and optionally the Drift
+# program) and runs each notification straight through the matching stage of
+# f3_search_logs. On every (re)connect the signature-history path backfills
+# whatever was missed while the socket was down.
+# =======================================================================
+
+DRIFT_PROGRAM_ID = "dRiftyHA39MWEi3m9aunc5MzRF1JYuBsbn6VPcn33UH"
+PROGRAM_TAG = "drift_program"
+
+
+def ws_url_from_rpc(rpc_url):
+    """
+    https://host/path -> wss://host/path (and http -> ws), the usual layout for Solana RPC providers.
+    """
+    if rpc_url.startswith("https://"):
+        return "wss://" + rpc_url[len("https://"):]
+    if rpc_url.startswith("http://"):
+        return "ws://" + rpc_url[len("http://"):]
+    return rpc_url
+
+
+class LogStreamer:
+    def __init__(self, ws_url, rpc_url, accounts, cursor_store, search_terms, on_matches,
+                 include_program=False, commitment=CommitmentLevel.Confirmed, workers=5, batch_size=0, cache=None, limiter=None, client=None, sink=None,
+                 reconnect_delay=1.0, max_reconnect_delay=30.0, cursor_flush_seconds=5.0,
+                 recent_size=10000, record_path=None):
+        self.ws_url = ws_url
+        self.rpc_url = rpc_url
+        self.accounts = list(dict.fromkeys(str(a) for a in accounts))
+        self.cursor_store = cursor_store
+        # Search terms or rules, compiled once
+        self.search_terms = as_rule_set(search_terms)
+        self.on_matches = on_matches
+        self.include_program = include_program
+        self.commitment = commitment
+        self.workers = workers
+        self.batch_size = batch_size
+        self.cache = cache
+        self.limiter = limiter
+        self.client = client
+        self.sink = sink
+        self.reconnect_delay = reconnect_delay
+        self.max_reconnect_delay = max_reconnect_delay
+        self.cursor_flush_seconds = cursor_flush_seconds
+        self.record_path = record_path
+
+        # Signatures already matched, so backfill and stream never alert twice
+        self._recent = deque(maxlen=recent_size)
+        self._recent_set = set()
+        # Latest streamed (signature, slot) per account, flushed to the cursor store periodically
+        self._pending_cursors = {}
+        self._last_flush = time.monotonic()
+
+    def _targets(self):
+        targets = list(self.accounts)
+        if self.include_program:
+            targets.append(PROGRAM_TAG)
+        return targets
+
+    def _rpc_commitment(self):
+        # The HTTP side (backfill) must read at the stream's commitment, or a cursor saved from a
+        # confirmed notification is not yet in the finalized history and `until` is ignored
+        return "finalized" if self.commitment == CommitmentLevel.Finalized else "confirmed"
+
+    async def _subscribe(self, websocket):
+        """
+        Sends one logsSubscribe per target and returns ({subscription id: target}, messages),
+        where `messages` are the notifications that arrived while waiting for the acks.
+        """
+        by_request = {}
+        for target in self._targets():
+            pubkey = DRIFT_PROGRAM_ID if target == PROGRAM_TAG else target
+            req_id = websocket.increment_counter_and_get_id()
+            request = LogsSubscribe(
+                RpcTransactionLogsFilterMentions(Pubkey.from_string(pubkey)),
+                RpcTransactionLogsConfig(self.commitment),
+                req_id
+            )
+            await websocket.send_data(request)
+            by_request[req_id] = target
+
+        by_subscription = {}
+        early = []
+        while len(by_subscription) < len(by_request):
+            for msg in await websocket.recv():
+                if isinstance(msg, SubscriptionResult) and msg.id in by_request:
+                    by_subscription[msg.result] = by_request[msg.id]
+                else:
+                    # Subscriptions acked first are already streaming; keep their notifications
+                    early.append(msg)
+        logging.info(f"Subscribed to logs for {len(by_subscription)} targets.")
+        return by_subscription, early
+
+    def _remember(self, signature):
+        if signature in self._recent_set:
+            return False
+        if len(self._recent) == self._recent.maxlen:
+            self._recent_set.discard(self._recent[0])
+        self._recent.append(signature)
+        self._recent_set.add(signature)
+        return True
+
+    def _flush_cursors(self, force=False):
+        if not self._pending_cursors:
+            return
+        if not force and time.monotonic() - self._last_flush < self.cursor_flush_seconds:
+            return
+        for account, (signature, slot) in self._pending_cursors.items():
+            self.cursor_store.advance(account, signature, slot)
+        self._pending_cursors.clear()
+        self._last_flush = time.monotonic()
+
+    def _record(self, target, notification):
+        if self.record_path:
+            with open(self.record_path, "a") as f:
+                f.write(json.dumps({"account": target, "notification": json.loads(notification.to_json())}) + "\n")
+
+    def handle_notification(self, target, notification):
+        """
+        Runs one logsNotification through the matching stage. Returns the (deduplicated) matches.
+        """
+        value = notification.result.value
+        slot = notification.result.context.slot
+        signature = str(value.signature)
+
+        pending = self._pending_cursors.get(target)
+        if target != PROGRAM_TAG and (pending is None or slot >= pending[1]):
+            self._pending_cursors[target] = (signature, slot)
+        if value.err is not None:
+            # Failed transactions never filled anything
+            return []
+
+        matches = match_log_lines(value.logs, self.search_terms, slot, signature, None,
+                                  account=None if target == PROGRAM_TAG else target)
+        if not matches or not self._remember((signature, target)):
+            return []
+        record = {"slot": slot, "signature": signature, "block_time": None, "err": None, "log_messages": value.logs}
+        attach_fills(matches, decode_transaction_fills(record, self.accounts))
+        for match in matches:
+            match['account'] = target
+        return matches
+
+    async def backfill(self, watcher):
+        """
+        Catches up every account from its cursor through the polling path.
+        """
+        self._flush_cursors(force=True)
+        matches = await watcher.run_cycle(self.accounts)
+        fresh = [m for m in matches if self._remember((m['signature'], m['account']))]
+        if fresh:
+            try:
+                self.on_matches(fresh)
+            except Exception as e:
+                logging.error(f"Reporting {len(fresh)} backfilled matches failed: {e}")
+        logging.info(f"Backfill finished with {len(fresh)} new matches.")
+
+    def _handle_messages(self, messages, by_subscription):
+        for msg in messages:
+            if not isinstance(msg, LogsNotification):
+                continue
+            target = by_subscription.get(msg.subscription)
+            if target is None:
+                continue
+            try:
+                self._record(target, msg)
+                matches = self.handle_notification(target, msg)
+                if matches:
+                    self.on_matches(matches)
+            except Exception as e:
+                # One bad notification (decoding, store, dispatcher) must not stop the stream
+                logging.error(f"Handling the log notification for {target} failed: {e}")
+        self._flush_cursors()
+
+    async def _consume(self, websocket, by_subscription):
+        async for messages in websocket:
+            self._handle_messages(messages, by_subscription)
+
+    async def run_forever(self):
+        delay = self.reconnect_delay
+        async with MultiAccountWatcher(
+            self.accounts, self.rpc_url, self.cursor_store, self.search_terms,
+            workers=self.workers, batch_size=self.batch_size, cache=self.cache,
+            limiter=self.limiter, client=self.client, sink=self.sink, commitment=self._rpc_commitment()
+        ) as watcher:
+            while True:
+                try:
+                    async with connect(self.ws_url, ping_interval=20, ping_timeout=20) as websocket:
+                        by_subscription, early = await self._subscribe(websocket)
+                        # Subscribe first, then backfill, so nothing falls between the two
+                        await self.backfill(watcher)
+                        delay = self.reconnect_delay
+                        self._handle_messages(early, by_subscription)
+                        await self._consume(websocket, by_subscription)
+                    logging.warning("Log stream closed by the server.")
+                except (ConnectionClosed, InvalidHandshake, SubscriptionError, OSError, asyncio.TimeoutError) as e:
+                    logging.warning(f"Log stream disconnected: {e}")
+                finally:
+                    self._flush_cursors(force=True)
+                logging.info(f"Reconnecting in {delay:.1f} seconds.")
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, self.max_reconnect_delay)
@@ -0,0 +1,132 @@
+import os
+import logging
+import tempfile
+from collections import OrderedDict
+from solders.transaction_status import EncodedConfirmedTransactionWithStatusMeta
+
+# ==================== Transaction Cache ====================
+# Finalized transactions never change, so they are fetched once and then served
+# from a bounded in-memory LRU, backed by an on-disk store (one JSON file per
+# signature) with size-based eviction of the least recently used files.
+# Only finalized, found transactions may be stored.
+# ===========================================================
+
+class TransactionCache:
+    def __init__(self, max_items=2048, disk_dir=None, max_disk_bytes=256 * 1024 * 1024):
+        self.max_items = max_items
+        self.disk_dir = disk_dir
+        self.max_disk_bytes = max_disk_bytes
+        self._memory = OrderedDict()
+        self.counters = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "stores": 0, "skipped": 0, "disk_evictions": 0}
+        self._disk_bytes = 0
+        if disk_dir:
+            os.makedirs(disk_dir, exist_ok=True)
+            self._disk_bytes = sum(
+                entry.stat().st_size for entry in os.scandir(disk_dir) if entry.name.endswith(".json")
+            )
+
+    def _path(self, signature):
+        return os.path.join(self.disk_dir, f"{signature}.json")
+
+    def _remember(self, signature, value):
+        self._memory[signature] = value
+        self._memory.move_to_end(signature)
+        while len(self._memory) > self.max_items:
+            self._memory.popitem(last=False)
+
+    def get(self, signature):
+        """
+        Returns the cached transaction or None.
+        """
+        signature = str(signature)
+        value = self._memory.get(signature)
+        if value is not None:
+            self._memory.move_to_end(signature)
+            self.counters["memory_hits"] += 1
+            return value
+
+        if self.disk_dir:
+            path = self._path(signature)
+            try:
+                with open(path, "r") as f:
+                    value = EncodedConfirmedTransactionWithStatusMeta.from_json(f.read())
+                # Touch the file so eviction sees it as recently used
+                os.utime(path)
+            except FileNotFoundError:
+                value = None
+            except Exception as e:
+                logging.warning(f"Dropping unreadable cache entry {path}: {e}")
+                self._remove(path)
+                value = None
+            if value is not None:
+                self.counters["disk_hits"] += 1
+                self._remember(signature, value)
+                return value
+
+        self.counters["misses"] += 1
+        return None
+
+    def put(self, signature, value, finalized=True):
+        """
+        Stores a transaction. Not-found (None) or unfinalized responses are never cached.
+        """
+        if value is None or not finalized:
+            self.counters["skipped"] += 1
+            return
+        signature = str(signature)
+        self._remember(signature, value)
+        self.counters["stores"] += 1
+        if self.disk_dir:
+            self._write(signature, value)
+
+    def _write(self, signature, value):
+        path = self._path(signature)
+        if os.path.exists(path):
+            return
+        data = value.to_json()
+        fd, tmp_path = tempfile.mkstemp(prefix=".tx-", dir=self.disk_dir)
+        try:
+            with os.fdopen(fd, "w") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except Exception as e:
+            logging.warning(f"Could not write cache entry for {signature[:15]}: {e}")
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            return
+        self._disk_bytes += len(data)
+        if self._disk_bytes > self.max_disk_bytes:
+            self._evict()
+
+    def _remove(self, path):
+        try:
+            size = os.path.getsize(path)
+            os.remove(path)
+            self._disk_bytes -= size
+        except OSError:
+            pass
+
+    def _evict(self):
+        """
+        Deletes least recently used files until the store is back under 90% of its budget.
+        """
+        entries = sorted(
+            (entry for entry in os.scandir(self.disk_dir) if entry.name.endswith(".json")),
+            key=lambda entry: entry.stat().st_mtime
+        )
+        target = self.max_disk_bytes * 0.9
+        for entry in entries:
+            if self._disk_bytes <= target:
+                break
+            self._remove(entry.path)
+            self.counters["disk_evictions"] += 1
+
+    def stats(self):
+        lookups = self.counters["memory_hits"] + self.counters["disk_hits"] + self.counters["misses"]
+        hits = self.counters["memory_hits"] + self.counters["disk_hits"]
+        return {
+            **self.counters,
+            "hit_rate": hits / lookups if lookups else 0.0,
+            "memory_items": len(self._memory),
+            "disk_bytes": self._disk_bytes,
+        }
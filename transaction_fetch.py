@@ -1,6 +1,7 @@
 from solders.rpc.responses import GetSignaturesForAddressResp, GetTokenAccountBalanceResp, GetTransactionResp
 import json
-from anchorpy.provider import Signature
+import logging
+from solders.signature import Signature
 from solders.pubkey import Pubkey
 
 async def load_token_balance(connection, address):
@@ -10,32 +11,39 @@ async def load_token_balance(connection, address):
     return v_amount
 
 
-async def transaction_history_for_account(connection, addy, before_sig1, limit, MAX_LIMIT):
+async def transaction_history_for_account(connection, addy, before_sig1, limit, MAX_LIMIT, until_sig=None, commitment=None):
+    """
+    Pages getSignaturesForAddress (newest first) `limit` signatures at a time until
+    MAX_LIMIT signatures are collected, a short page shows the history is exhausted,
+    or `until_sig` (exclusive) is reached. `commitment` defaults to the client's.
+    """
 
     if isinstance(addy, str):
          addy = Pubkey.from_string(addy)
+    if isinstance(before_sig1, str):
+        before_sig1 = Signature.from_string(before_sig1)
+    if isinstance(until_sig, str):
+        until_sig = Signature.from_string(until_sig)
 
     res2 = []
-    first_try = True
-    while (first_try and len(res2) % 1000 == 0) and len(res2)< MAX_LIMIT:
-        # try:
-            if len(res2):
-                bbs = res2[-1]['signature']
-                bbs = Signature.from_string(bbs)
-            else:
-                bbs = before_sig1
-            res: GetSignaturesForAddressResp = (await connection.get_signatures_for_address(addy, 
-                                                                                            before=bbs, 
-                                                                                            limit=limit
-                                                                                            )).to_json()
-            res = json.loads(res)
-            if 'result' not in res:
-                st.warning('bad get_signatures_for_address' + str(res))
-                first_try = False
-            else:
-                res2.extend(res['result'])
-        # except Exception as e:
-        #     st.warning('exception:'+str(e))
-        #     first_try = False
+    bbs = before_sig1
+    while len(res2) < MAX_LIMIT:
+        page_limit = min(limit, MAX_LIMIT - len(res2))
+        res: GetSignaturesForAddressResp = (await connection.get_signatures_for_address(addy, 
+                                                                                        before=bbs, 
+                                                                                        until=until_sig,
+                                                                                        limit=page_limit,
+                                                                                        commitment=commitment
+                                                                                        )).to_json()
+        res = json.loads(res)
+        if 'result' not in res:
+            logging.warning('bad get_signatures_for_address' + str(res))
+            break
 
-    return res2
\ No newline at end of file
+        page = res['result']
+        res2.extend(page)
+        if len(page) < page_limit:
+            break
+        bbs = Signature.from_string(page[-1]['signature'])
+
+    return res2
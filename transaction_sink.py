@@ -0,0 +1,205 @@
+import os
+import re
+import gzip
+import json
+import time
+import zlib
+import bisect
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from solders.transaction_status import EncodedConfirmedTransactionWithStatusMeta
+
+# ==================== Append-Only Transaction Log ====================
+# Every fetched transaction is appended as one NDJSON line the moment it arrives:
+#   {"signature": ..., "slot": ..., "block_time": ..., "transaction": <getTransaction value>}
+# Segments rotate by size or age and can be gzip-compressed once closed. index.ndjson
+# maps each signature to (segment, offset, length) so any transaction can be found
+# later without scanning the log. Signatures already in the index are not written twice.
+# Closed segments are compressed on a background thread as a series of gzip members of
+# about `block_bytes` of whole lines each (still one valid .gz file), with a
+# `<segment>.gz.blocks` map from uncompressed to compressed offsets, so a lookup only
+# inflates the one block holding its line.
+# =====================================================================
+
+SEGMENT_PATTERN = re.compile(r"^segment-(\d{6})\.ndjson(\.gz)?$")
+
+
+class TransactionSink:
+    def __init__(self, directory="transaction_log", max_segment_bytes=64 * 1024 * 1024,
+                 max_segment_seconds=24 * 3600, compress=True, block_bytes=64 * 1024):
+        self.directory = directory
+        self.max_segment_bytes = max_segment_bytes
+        self.max_segment_seconds = max_segment_seconds
+        self.compress = compress
+        self.block_bytes = block_bytes
+        # One thread, so segments are compressed in order and never concurrently
+        self._compressor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="tx-log-gzip")
+        self._blocks = {}
+        os.makedirs(directory, exist_ok=True)
+
+        self.index_path = os.path.join(directory, "index.ndjson")
+        self.index = self._load_index()
+        self._index_file = open(self.index_path, "a")
+
+        existing = [m for m in map(SEGMENT_PATTERN.match, os.listdir(directory)) if m]
+        self._segment_number = max((int(m.group(1)) for m in existing), default=0)
+        self._segment = None
+        self._segment_name = None
+        self._segment_bytes = 0
+        self._segment_opened = 0.0
+        self.written = 0
+
+        # Segments left open by a crash or kill are finished off now
+        for m in existing:
+            if not m.group(2):
+                self._segment_name = m.group(0)
+                self._segment_bytes = os.path.getsize(os.path.join(directory, self._segment_name))
+                self._segment = open(os.path.join(directory, self._segment_name), "ab")
+                self._close_segment()
+
+    def _load_index(self):
+        index = {}
+        if os.path.exists(self.index_path):
+            with open(self.index_path, "r") as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        # A torn last line after a crash; the transaction is simply unindexed
+                        continue
+                    index[entry["signature"]] = (entry["segment"], entry["offset"], entry["length"])
+        return index
+
+    def _open_segment(self):
+        # Always start a fresh segment so a closed (possibly compressed) one is never reopened
+        self._segment_number += 1
+        self._segment_name = f"segment-{self._segment_number:06d}.ndjson"
+        self._segment = open(os.path.join(self.directory, self._segment_name), "ab")
+        self._segment_bytes = 0
+        self._segment_opened = time.monotonic()
+        logging.info(f"Opened transaction log segment {self._segment_name}")
+
+    def _close_segment(self):
+        if self._segment is None:
+            return
+        self._segment.close()
+        path = os.path.join(self.directory, self._segment_name)
+        if self.compress and self._segment_bytes:
+            # Off the caller's thread (the event loop); lookups read the plain file until it is done
+            self._compressor.submit(self._compress_segment, path, self._segment_name)
+        elif not self._segment_bytes:
+            os.remove(path)
+        self._segment = None
+
+    def _compress_segment(self, path, name):
+        try:
+            blocks = []
+            with open(path, "rb") as src, open(path + ".gz.tmp", "wb") as dst:
+                while True:
+                    start = src.tell()
+                    block = src.read(self.block_bytes)
+                    if not block:
+                        break
+                    # Whole lines only, so every record sits in exactly one block
+                    block += src.readline()
+                    blocks.append((start, dst.tell()))
+                    dst.write(gzip.compress(block))
+                dst.flush()
+                os.fsync(dst.fileno())
+            with open(path + ".gz.blocks", "w") as f:
+                json.dump(blocks, f)
+            os.replace(path + ".gz.tmp", path + ".gz")
+            os.remove(path)
+            logging.info(f"Compressed transaction log segment {name} ({len(blocks)} blocks)")
+        except Exception as e:
+            logging.error(f"Could not compress transaction log segment {name}: {e}")
+
+    def _block_map(self, path):
+        blocks = self._blocks.get(path)
+        if blocks is None:
+            try:
+                with open(path + ".blocks", "r") as f:
+                    blocks = [tuple(block) for block in json.load(f)]
+            except (OSError, ValueError):
+                return None
+            self._blocks[path] = blocks
+        return blocks
+
+    def _read_compressed(self, path, offset, length):
+        blocks = self._block_map(path)
+        if blocks is None:
+            # Segments compressed as a single gzip stream: inflate up to the offset
+            with gzip.open(path, "rb") as f:
+                f.seek(offset)
+                return f.read(length)
+        i = bisect.bisect_right([start for start, _ in blocks], offset) - 1
+        start, compressed_start = blocks[i]
+        with open(path, "rb") as f:
+            f.seek(compressed_start)
+            if i + 1 < len(blocks):
+                data = f.read(blocks[i + 1][1] - compressed_start)
+            else:
+                data = f.read()
+        block = zlib.decompress(data, 31)
+        return block[offset - start:offset - start + length]
+
+    def _should_rotate(self):
+        return (self._segment_bytes >= self.max_segment_bytes
+                or time.monotonic() - self._segment_opened >= self.max_segment_seconds)
+
+    def write(self, transaction):
+        """
+        Appends one typed transaction (GetTransactionResp.value). Returns False if it was already logged.
+        """
+        signatures = getattr(transaction.transaction.transaction, 'signatures', None)
+        signature = str(signatures[0]) if signatures else None
+        if signature is None or signature in self.index:
+            return False
+
+        if self._segment is None or self._should_rotate():
+            self._close_segment()
+            self._open_segment()
+
+        line = (
+            f'{{"signature":"{signature}","slot":{transaction.slot},'
+            f'"block_time":{json.dumps(transaction.block_time)},"transaction":{transaction.to_json()}}}\n'
+        ).encode()
+        offset = self._segment_bytes
+        self._segment.write(line)
+        self._segment.flush()
+        self._segment_bytes += len(line)
+
+        self.index[signature] = (self._segment_name, offset, len(line))
+        self._index_file.write(json.dumps({
+            "signature": signature, "segment": self._segment_name, "offset": offset, "length": len(line)
+        }) + "\n")
+        self._index_file.flush()
+        self.written += 1
+        return True
+
+    def lookup(self, signature):
+        """
+        Returns the logged transaction for a signature, or None, without scanning the log.
+        """
+        entry = self.index.get(str(signature))
+        if entry is None:
+            return None
+        segment, offset, length = entry
+        path = os.path.join(self.directory, segment)
+        if os.path.exists(path):
+            with open(path, "rb") as f:
+                f.seek(offset)
+                line = f.read(length)
+        elif os.path.exists(path + ".gz"):
+            line = self._read_compressed(path + ".gz", offset, length)
+        else:
+            logging.warning(f"Segment {segment} for {str(signature)[:15]} is missing.")
+            return None
+        record = json.loads(line)
+        return EncodedConfirmedTransactionWithStatusMeta.from_json(json.dumps(record["transaction"]))
+
+    def close(self):
+        self._close_segment()
+        # Waits for the pending compressions
+        self._compressor.shutdown(wait=True)
+        self._index_file.close()
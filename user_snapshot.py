@@ -0,0 +1,207 @@
+import struct
+import asyncio
+import logging
+import keyword
+import dataclasses
+from itertools import islice
+from functools import lru_cache
+from dataclasses import dataclass, field
+
+# ==================== Batched User Snapshots ====================
+# Loads any list of Drift accounts (the whale list, a subaccount list, ...) with
+# getMultipleAccounts instead of one getAccountInfo per account:
+#   - pubkeys are fetched in chunks of up to 100 (the RPC limit), every chunk in flight at
+#     once (up to `concurrency`), so ~120 accounts are one round trip instead of 120,
+#   - every chunk reports the slot it was served at; chunks served behind the newest one
+#     are fetched again (up to `max_rounds`), so the snapshot reads as of a single slot,
+#   - accounts are decoded in bulk by a decoder compiled from the IDL layout into one
+#     struct format per account type (anchorpy's construct decode costs ~11 ms per User);
+#     layouts the compiler does not cover fall back to anchorpy's AccountsCoder.
+# Returns ProgramAccount(public_key, account), the shape all_user_stats consumes.
+# ================================================================
+
+MAX_ACCOUNTS_PER_REQUEST = 100
+
+
+@lru_cache(maxsize=1)
+def load_accounts_coder():
+    """
+    anchorpy's AccountsCoder for the Drift IDL shipped with driftpy.
+    """
+    from anchorpy import Idl
+    from anchorpy.coder.accounts import AccountsCoder
+    from drift_events import drift_idl_path
+
+    with open(drift_idl_path(), "r") as f:
+        return AccountsCoder(Idl.from_json(f.read()))
+
+
+# ---------- layout compiler ----------
+def _compile(node):
+    """
+    (struct format, build) for a fixed-size construct node, where build(values) takes the
+    node's unpacked fields from the `values` iterator and returns the decoded value.
+    """
+    import construct
+    from borsh_construct.enum import Enum
+    from anchorpy.borsh_extension import _DataclassStruct, BorshPubkeyAdapter
+    from solders.pubkey import Pubkey
+
+    if isinstance(node, construct.Renamed):
+        return _compile(node.subcon)
+    if isinstance(node, BorshPubkeyAdapter):
+        return "32s", lambda values: Pubkey(next(values))
+    if isinstance(node, construct.FormatField):
+        if node.fmtstr[0] != "<" and struct.calcsize(node.fmtstr) != 1:
+            raise NotImplementedError(f"{node.fmtstr!r} is not little-endian")
+        return node.fmtstr[1:], next
+    if isinstance(node, construct.BytesInteger):
+        if not isinstance(node.length, int) or node.swapped is not True:
+            raise NotImplementedError("only fixed-size little-endian BytesInteger")
+        signed = node.signed
+        return f"{node.length}s", lambda values: int.from_bytes(next(values), "little", signed=signed)
+    if isinstance(node, type(construct.Flag)):
+        return "?", next
+    if isinstance(node, construct.Bytes) and isinstance(node.length, int):
+        return f"{node.length}s", next
+    if isinstance(node, construct.Padded) and node.subcon is construct.Pass and isinstance(node.length, int):
+        return f"{node.length}x", lambda values: None
+    if isinstance(node, Enum):
+        if not all(isinstance(variant, str) for variant in node.variants):
+            raise NotImplementedError(f"enum {node.enum_name} has variants with fields")
+        classes = [node.enum.getitem(i) for i in range(len(node.variants))]
+        return "B", lambda values: classes[next(values)]()
+    if isinstance(node, construct.Array) and isinstance(node.count, int):
+        count = node.count
+        fmt, build = _compile(node.subcon)
+        if build is next:
+            return f"{count}{fmt}" if len(fmt) == 1 else fmt * count, lambda values: list(islice(values, count))
+        return fmt * count, lambda values: [build(values) for _ in range(count)]
+    if isinstance(node, _DataclassStruct):
+        fields = []
+        for sub in node.subcon.subcons:
+            name = sub.name
+            keep = not name.startswith("_")
+            fields.append((f"{name}_" if keyword.iskeyword(name) else name if keep else None, _compile(sub)))
+        fmt = "".join(sub_fmt for _, (sub_fmt, _) in fields)
+        builders = [(name, build) for name, (_, build) in fields]
+        datacls = node.datacls
+        if [name for name, _ in builders] == [f.name for f in dataclasses.fields(datacls) if f.init]:
+            # Every field is passed, in declaration order: positional arguments are cheaper
+            positional = [build for _, build in builders]
+            return fmt, lambda values: datacls(*[build(values) for build in positional])
+
+        def build(values):
+            kwargs = {}
+            for name, sub_build in builders:
+                value = sub_build(values)
+                if name is not None:
+                    kwargs[name] = value
+            return datacls(**kwargs)
+        return fmt, build
+    raise NotImplementedError(type(node).__name__)
+
+
+class AccountDecoder:
+    """
+    Decodes one account type from raw account data (discriminator included).
+    """
+    def __init__(self, coder, name):
+        self.coder = coder
+        self.name = name
+        self.discriminator = coder.acc_name_to_discriminator[name]
+        self.compiled = None
+        try:
+            fmt, self._build = _compile(coder._accounts_layout[name])
+            self.compiled = struct.Struct("<" + fmt)
+        except (NotImplementedError, AttributeError, KeyError, struct.error) as e:
+            logging.warning(f"No compiled decoder for {name} accounts ({e}); using anchorpy's decoder.")
+
+    def decode(self, data):
+        """
+        The decoded account, or None if `data` is not a `name` account.
+        """
+        if data is None or bytes(data[:8]) != self.discriminator:
+            return None
+        if self.compiled is not None and len(data) >= 8 + self.compiled.size:
+            try:
+                return self._build(iter(self.compiled.unpack_from(data, 8)))
+            except (IndexError, ValueError, TypeError) as e:
+                logging.debug(f"Compiled {self.name} decode failed ({e}); using anchorpy's decoder.")
+        return self.coder.decode(bytes(data))
+
+
+@lru_cache(maxsize=16)
+def account_decoder(coder, name="User"):
+    return AccountDecoder(coder, name)
+
+
+def decode_accounts(datas, name="User", coder=None):
+    """
+    Decodes raw account datas in bulk; entries that are missing or not `name` accounts are None.
+    """
+    decoder = account_decoder(coder or load_accounts_coder(), name)
+    return [decoder.decode(data) for data in datas]
+
+
+# ---------- fetching ----------
+@dataclass
+class UserSnapshot:
+    slot: int
+    # ProgramAccount(public_key, decoded account), in the order the pubkeys were given
+    users: list
+    # Pubkeys without an account (closed) or with another account type
+    missing: list = field(default_factory=list)
+    round_trips: int = 0
+    # False if some chunk still lagged behind `slot` after max_rounds
+    consistent: bool = True
+
+
+async def fetch_user_snapshot(client, pubkeys, name="User", coder=None, chunk_size=MAX_ACCOUNTS_PER_REQUEST,
+                              concurrency=8, commitment=None, max_rounds=3):
+    """
+    Fetches and decodes `pubkeys` (strings or Pubkeys) with chunked getMultipleAccounts at one
+    slot. `client` is a solana AsyncClient (or anything with get_multiple_accounts).
+    """
+    from anchorpy import ProgramAccount
+    from solders.pubkey import Pubkey
+
+    pubkeys = [key if isinstance(key, Pubkey) else Pubkey.from_string(str(key)) for key in pubkeys]
+    if not pubkeys:
+        return UserSnapshot(slot=0, users=[])
+    chunk_size = min(chunk_size, MAX_ACCOUNTS_PER_REQUEST)
+    chunks = [pubkeys[start:start + chunk_size] for start in range(0, len(pubkeys), chunk_size)]
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+
+    async def fetch(chunk):
+        async with semaphore:
+            response = await client.get_multiple_accounts(chunk, commitment=commitment)
+        return response.context.slot, response.value
+
+    # chunk index -> (slot, accounts)
+    results = {}
+    pending = list(range(len(chunks)))
+    round_trips, target = 0, 0
+    while pending and round_trips < max_rounds:
+        fetched = await asyncio.gather(*(fetch(chunks[i]) for i in pending))
+        round_trips += 1
+        results.update(zip(pending, fetched))
+        target = max(slot for slot, _ in results.values())
+        # A node behind the newest chunk served an older state; ask again
+        pending = [i for i, (slot, _) in results.items() if slot < target]
+    if pending:
+        logging.warning(f"{len(pending)} of {len(chunks)} account chunks still behind slot {target} "
+                        f"after {round_trips} rounds; the snapshot mixes slots.")
+
+    decoder = account_decoder(coder or load_accounts_coder(), name)
+    users, missing = [], []
+    for i, chunk in enumerate(chunks):
+        for pubkey, account in zip(chunk, results[i][1]):
+            decoded = decoder.decode(account.data) if account is not None else None
+            if decoded is None:
+                missing.append(pubkey)
+            else:
+                users.append(ProgramAccount(pubkey, decoded))
+    logging.info(f"Loaded {len(users)} {name} accounts at slot {target} in {round_trips} round trip(s)"
+                 f"{f', {len(missing)} missing' if missing else ''}.")
+    return UserSnapshot(slot=target, users=users, missing=missing, round_trips=round_trips, consistent=not pending)
@@ -0,0 +1,130 @@
+# ==================== Whale List ====================
+# Kept apart from helpers.py so the monitor (--watch_whales) can read it without
+# loading driftpy, anchorpy or pandas.
+# ====================================================
+
+# over ~100k in value
+DRIFT_WHALE_LIST_SNAP = '''BRksHqLiq2gvQw1XxsZq6DXZjD3GB5a9J63tUBgd6QS9
+7tDm5mxdUcqW423mX9a3yC9MkPQccaTYuPmAxZBkGNxn
+ETsaTf7tsaYEChnLfu2iwzFXWxJbCzwD6bPkMGCyB42d
+9e3dJLadqDVdunTLbQwW5rPyq2284pXJ6aWQtKD6DZHJ
+7SeykJkVT24ZkuNwyYNACWj5JaLdNRjxVeBD5LAJbMmB
+2aMcirYcF9W8aTFem6qe8QtvfQ22SLY6KUe6yUQbqfHk
+4oTeSjNig62yD4KCehU4jkpNVYowLfaTie6LTtGbmefX
+8RLb4ys91TjY3EqWHEVEbNnzzSbQGsdwn6Dj3dtY8Z67
+3KdSdkCjSPvpthQScANfNRkSfX8xpqcngTTUnnZJoxUm
+8LsnV5g8xtKcjiwyBBUNZonyaiC91GcbX2sXazVefVyX
+2oJLLjUnoq6dvwdQKBWAoY2cUJKCEgMBs49HxJiRKwDY
+2Crr5X53x36xcBUpEV52wT1Xbnhknwaz2XVjeTXTJEUY
+BsZ7DBAqNiTC9PN5St4cb8aUoaCzGB23NRq6Xcv2CfUW
+DQmcci1JpEPHkXYoAn3kKkDB7ZNpEQjZPUbQd97z1aXM
+73ZwKGCsaMitEcTQV4W5tBnyht9XayUmShA9xbzG8EUG
+DiDsuvdxGUQdvLBToYN4Bmk2GfFSR2bFFMRu7GhmMkJG
+HmrXYdAiraCKSjyuTuzX24Jb6QDNj36oTD1BwWb369Gd
+EHQ2YfkMQ9UTV3yCLTuMXqWNfoLSuwBnrwNZ2iUPGHcF
+HpFLzDwaKqfHWZGGHgUJfVRB3D2RF4EsY9NKaFXcTxRr
+GPmMKkE3cuvoDmQmyPdqqoxhWXeZZAcbJ726r1zbBEkE
+8us4LosdD7Ct2jQEHFsfZdF3Uaj9mtwYbBwpxeWvcaGp
+EU7uEtXojSPz1FtmaJnUrLJkx9RTwayS3TyfveBZ5qDC
+HbwQHQ52NZZTuSgpWdSrm3zHKFB4VKSrufWVH5bV7b8C
+BsVi8TcSsfdZuoksw1enwrDTYEVRnPBze4ZSPSqmafqh
+F1vmkcTwgC7AVSQkVMpRhjws1Ni3gmz4Cu55Xe1TWXvA
+G4iis9dLtpKwFkERDUBUqjbWPY4uJwYkGnWcZQUa1mpv
+3hH27WiZV2QmM6bK5Rz7bkrqHK2PX7wNo4EogPzmGadN
+56BnDPDBv8yhJdsVjkuH53QjvjiMA4qURKuDy7FYWX2X
+AM1zueGrHg7zQDYUfVWtzFgn2G6EAuX161KMrkSgtkkh
+22n9s2gQQN5T5t1i8RrHpKju5RkiJsw2LrfmgBsdPhmn
+2EUQ6kxy2cM558ZJN4D31x6RGgLwgK1eo9BAEFjochVT
+FgbsjcwKyUYLKLoYyq3piHW3xfU7cemPS8GniM1eeoUs
+FeCV4X2uSehvYRSUHU7eVqtiJdnFJ2fGShC98CNW8gwG
+Daz7CYfAym86pf6MmzsfZFz22wuLNLqECu1wx7rKLxsn
+Er5x5oryNKNwvCgPBz2481m82NutLWMHivHBRGJzV9uv
+5z3wiSDCPnkxywMj1VJ64ZbvcVPoUK8ydCp74rkeqzZ8
+Lshvy96HmpRUyUhx1KP5F1xL2LvJerEpbHSh2xqAmg1
+4EUfWFFpxckhBiCRN35wLqQFH6XeT4sRy5NkBF3249Fu
+4b7qSeHYDqN3byBgbtsQNVfNcJ7x2P9BLFNk9yQfQqLq
+2Mc7TScL3xN4iRRFRpaGJP3zy1Zaq2ZRV21epuobQMHg
+EEBjRSo6kNeQXpRYmxuuBcBNB4MqxmRsQaarNUJTHBL5
+GC3hdnsPZVkVsXCceF5HyTWxu7ZD7sj7CMiVyPW7ew9y
+HvSYehyjXAcL9Dq8DW9sYaUieRWpz5wozB3U5ajCRvqc
+4rv4bGgCuKpakw2BTCasnkzSgqi7QFGmWEEkGEw9modm
+C13FZykQfLXKuMAMh2iuG7JxhQqd8otujNRAgVETU6id
+74obHhSMzZLyyWpbz9SfbrFtKGmmTmAfp13FEV26PDgB
+DUfFQC9uXXmSc7amJPr7pwf75LV2oNtSkW5wV669b1LQ
+4yN82JynHtd57JB63CepKmCs7nvsiqk4KShjPd9xtpDU
+FAmFxKSzAdtDkb8eoHNyGf9Qrk7qHGo6BAZujRe5r1fc
+3ZHrooUPNAv7NuajRW4N95t6Pm5Xeyps15q9oeSPt5Q4
+3gvf9XBYcs453b1UXDnaj3CgNcz5p9dT9aiYDhxBePiC
+7WrK1Ku9qXv2Lpum7osN7n7vrdDPdRorM4LYVDZ2Qsts
+8hiFmuXjwWpmUpSJfnZb9jfSCx8gPfqwQUVcNV8WmS8K
+46BbA4BYke2wYZsqRXiyXcz67LtSBR911KXoVTuRrDg2
+8LNHw4qZGmXAKMJ6qL3PS45yCpJQre49oCzrVVCc76sW
+74tj4HwRvWY3yHc7PNRzAuDss4z9udeSygKdfB9HSBtY
+EaETWptCSuVjLeMe2c2exYt4CzHLruUZQF3LXTgR87de
+G8ipCTW4dn1KwYyMBuTaXWp5stYbtrjYeLA6JxrAgbQe
+DwtySoEwL2QSArfmUzVXaVFXW8ZLCHEDuXQCpqpq5V3j
+7cBRvpTLiLi6cp3bLaZ8u9AerjrwsqPo37H2jKChnE3c
+AMz5hbWe2B2ohM3LhVk5eRRtSYVUgANdUKR3M5Xb4t7s
+EcY7jYAZAdgRzM8wBsR2qP3faL25w7C3Uy18HtzWdfZQ
+EZe9hRFsUuSFD9kVeAEa8cmKZHsnBvKdGLiPspHBFrB
+AQ66FNXphVFfTR8mFmv1PmCgkQzRKUP3Giw4bRYdHERe
+6xjDCa6fpehWBQzEdDQW3Gv1kum3VzVKzZpXG4AKckJK
+FjnB7KNmjGjYg2vRAQymnePW9wMuaTcP4EiinRcNdZtr
+Eh87smZiFo797bjFc5RreRGrmKxvBs2vQM71oNfSxnfA
+Gc2wTwfKgr17VzaEaGKHQFGDfqWo3miAshHzNhHRMGPJ
+HFk6YDhctF45YcxP4U3JbEMVt4YkmhGz7mNU9nyXMpLe
+BdehTirPRjv7iAakdzL3vD41VMYrizaEYYCSA2gVnWv
+6X4aNRKmxeh6BLKhzGm8RedaspAigHZJPMAaM6nJdcJu
+BoaYJas68C483JJjUaD31M3c1bkuRosFWpZrBfoALnyv
+D99njKWrHAJXpkjKxLYLAeYU4z3RuQh6hWGBiCHhxi7i
+J7tpzrQHfWhW69Q6GBzW778ProJ3hRLyvaHMmGqsB5ZQ
+g1PMk3xmxdb631cFkrCzJuGxehRBqs6P3o7nGAvhnNU
+AGFbBosmenBH9fm9SkKcz8m6borRbKKJxUfQnGsHDcsn
+HVMMKeksGXZih5aQpv1KYHCBhaGCRuXqE3bkQCURYehU
+HnmRSitzQk249TVjTxVmWakNUrdMfEnG6TBpv7V9pQWB
+4ywReyHX6hEr3GyP4d1AXpkam8HmFYZeKz8f3xpbqYSN
+A5VNoX7JDuzi6BTRkAvEBf2dBiFK67yqbQC7ChUatExj
+23h8frAqQwRiRRHF2mE8H6vztEZJ6DTYfJfRxr4d64HV
+DjN8mCngZHnhDtKYwFjgQk4cjr6oUanE1GCS9AmBwTcq
+5J4wTB2dfBLSJJa5g988N4LM8TNhV71EjjifWZej2oj6
+8HACL7BXeJBS1aYYUizQFoxwYBVEiDMxD8QsrNkZwDx4
+85QLSQAKhWYcKFQJ8xxfi4gkb82Cx6ito8CXLPCTGLn4
+7XX43NrjTHTNPd5LfNmHKKLPhVSjgAV4FKRdXGDUVwgh
+7GguEzb2ZgeH1TFukx9VdBKJdpRPsRom56WgFYK6zD9e
+A3h5TLA7ij3VnsZJmt2g2piVXDenuMskXLUQ7LgcQZTi
+GZSciBrAKKhHMZi6yphPKtvhoTssmKJUaCxxDTaKX8md
+4X8f5P9V4Jvzr4sU2H6rTKYjJeDFEX2nxbcB3vmG2q2u
+DFUXe5EHxAQLoLiUquuH75rFf5h5kbfK8s2PDrKVs6cK
+73taguWJkNYo5mTfA52dxgwoTLN8PP6AFyCVHbSSfycg
+B3WuWwm46HAaBT1xRHh8ymoiVrftJ3vuDYVaK5vqoX57
+ApdcetQhQqrwvwC6BisX7y1iJJLbhtziPbXwko1KrpTQ
+3Q89n76Lx7K6yyVagH4BTRfPJ8BLb5K8wB6LwvDK72WW
+AkmPdA5DQsJgLsTiskRyeGbYzGxJ9GxAE6AA2vp9wmtx
+9CNuKaJ7zzDvUHQpGmjB4akDYBFv6HXqhmxAQYx9Qw7w
+6t4DUWiaewuxfuCo7RpAyw3avcPWp8zvpeogpBfuLFEL
+ENZihoaRFsY1ZHzWibR3uMMVhMT2xAcm1JaAgoLxGSte
+Bi9U9KvmgQK9kLww3N3UJvPy5A1mJnRqyzm4BXDePHvF
+BXP1a8cCBdGNrpTjfncqeSxy8hhX6Szs4P76MF8eDQUU
+F4ypfFqdWvR4zFCsbBLv6j29huFjpgRmmCKkVN9M8khT
+FmohRubtmmrwWe8xJ3R6WTp5BYyVv6do9V2tfnFijUtg
+9xnPxwedXTbwYeDegP4kXQ6LWyNKCwhaJuuF7ST7bxRi
+HnH5gaa84M7phQFwNMp2PHVQqdeVCoXKFGu1nyTwKpuB
+E3M3VWPsiUp89uxzLw4Cg1hZMbqk5PfHqRQqQ6qj4dX
+7WBa9Du2N6KJTNnQdpWG4djRKzkZZcCan6ksEPaX8Vpo
+9fwhHftD1KM3C5QQ3TJZBD13MVL4r9s3BsuR7rzbVZcu
+Fgfdx9QFvwQwZ4QdUGPUBES7YR5S6itZPVJSUYKh5VEE
+HPVVmzTKkwMWbpNyT9PQoeowBEWaXca2g9NYUawYuBQ6
+2AkGKesooNq1Hn39xMsZnJkjQaNuqyaXaHfmPHgmpmPL
+481L7qoCfkWqutamEcj7AYDS6P3azawF5WhshWRAPVdi
+fBcykPptSKYJTCRZ8JTSN53gGo5HyQ9SaJXSpfRMERR
+2nBqswD2KW4Vh63ZbFmtdRHT4n649bvS8n2XAueToi3P
+59XziNjAka8dh9yDnquThAFu5jdHbhbyanx6h14ZpZTj
+DBKiRUXMctVodDxNyQFrr2JJ1rZF6kr4muQDSKhMpBqu
+6oSJJuGZSz1UgeJDMMHGMz81NbbXWsBn4P5Jrn3YQJo4'''
+
+
+def whale_accounts():
+    """
+    The pubkeys in DRIFT_WHALE_LIST_SNAP, in order.
+    """
+    return [line.strip() for line in DRIFT_WHALE_LIST_SNAP.split() if line.strip()]
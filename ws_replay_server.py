@@ -0,0 +1,91 @@
+import json
+import asyncio
+import logging
+import argparse
+import websockets
+from stream_logs import DRIFT_PROGRAM_ID, PROGRAM_TAG
+
+# ==================== Local WebSocket Stand-in ====================
+# Replays logsNotification messages recorded by `main.py --stream --record_stream`
+# to anyone who logsSubscribes, so the streaming mode can be exercised offline.
+# Use --drop_after to cut the connection mid-replay and exercise reconnect + backfill.
+# ==================================================================
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+
+def load_recording(path):
+    """
+    Each line: {"account": <watched account or "drift_program">, "notification": <logsNotification params>}.
+    """
+    with open(path, "r") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def make_handler(recording, delay, drop_after):
+    subscription_counter = iter(range(1, 1 << 31))
+
+    async def handler(websocket, path=None):
+        subscriptions = {}
+        sent = 0
+
+        async def replay():
+            nonlocal sent
+            # Give the client a moment to finish subscribing before replaying
+            await asyncio.sleep(0.1)
+            for entry in recording:
+                sub_id = subscriptions.get(entry["account"])
+                if sub_id is None:
+                    continue
+                params = dict(entry["notification"], subscription=sub_id)
+                await websocket.send(json.dumps({"jsonrpc": "2.0", "method": "logsNotification", "params": params}))
+                sent += 1
+                if drop_after and sent >= drop_after:
+                    logging.info(f"Dropping connection after {sent} notifications.")
+                    await websocket.close()
+                    return
+                await asyncio.sleep(delay)
+
+        replay_task = None
+        async for raw in websocket:
+            request = json.loads(raw)
+            if request.get("method") != "logsSubscribe":
+                continue
+            mentions = request["params"][0].get("mentions", [None])[0]
+            sub_id = next(subscription_counter)
+            # Notifications recorded for the program subscription are keyed by tag, not pubkey
+            account = PROGRAM_TAG if mentions == DRIFT_PROGRAM_ID else mentions
+            subscriptions[account] = sub_id
+            await websocket.send(json.dumps({"jsonrpc": "2.0", "result": sub_id, "id": request["id"]}))
+            if replay_task is None:
+                replay_task = asyncio.create_task(replay())
+        if replay_task is not None:
+            replay_task.cancel()
+
+    return handler
+
+
+async def serve(args):
+    recording = load_recording(args.recording)
+    logging.info(f"Loaded {len(recording)} recorded notifications from {args.recording}.")
+    async with websockets.serve(make_handler(recording, args.delay, args.drop_after), args.host, args.port):
+        logging.info(f"Replaying on ws://{args.host}:{args.port}")
+        await asyncio.Future()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay recorded logsSubscribe notifications over a local WebSocket.")
+    parser.add_argument("recording", type=str, help="NDJSON file written by --record_stream.")
+    parser.add_argument("--host", type=str, default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8900)
+    parser.add_argument("--delay", type=float, default=0.05, help="Seconds between replayed notifications.")
+    parser.add_argument("--drop_after", type=int, default=0, help="Close the connection after this many notifications.")
+    args = parser.parse_args()
+    try:
+        asyncio.run(serve(args))
+    except KeyboardInterrupt:
+        logging.info("Replay server stopped.")
+
+
+if __name__ == "__main__":
+    main()